@@ -1,13 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from cryptography.fernet import Fernet
+from utils.stream_cipher import StreamCipher, DEFAULT_CHUNK_SIZE, HEADER_SIZE, is_stream_encrypted
+from utils.metrics import REGISTRY, diff, timed
 import os
+import tempfile
+import threading
+
+# Per-process agent used by bulk encryption in process-pool mode
+_worker_agent = None
+
+def _init_worker(key_path, chunk_size):
+    global _worker_agent
+    _worker_agent = EncryptionAgent(key_path=key_path, chunk_size=chunk_size)
+
+def _encrypt_in_worker(file_path, output_dir):
+    # Metrics recorded in the worker travel back with the manifest entry
+    before = REGISTRY.snapshot()
+    entry = _worker_agent._encrypt_with_manifest(file_path, output_dir)
+    entry["metrics"] = diff(REGISTRY.snapshot(), before)
+    return entry
 
 class EncryptionAgent:
-    def __init__(self, key_path="config/encryption.key"):
+    def __init__(self, key_path="config/encryption.key", chunk_size=DEFAULT_CHUNK_SIZE):
         """
         Initializes the Encryption Agent.
+        :param key_path: Path to the Fernet key file.
+        :param chunk_size: Plaintext bytes per authenticated chunk in the streaming format.
         """
         self.key = None
         self.key_path = key_path
+        self.chunk_size = chunk_size
+        self._ciphers = {}
+        self._cipher_lock = threading.Lock()
 
         # Load or generate encryption key
         if os.path.exists(self.key_path):
@@ -30,26 +54,99 @@ class EncryptionAgent:
         with open(self.key_path, "rb") as key_file:
             self.key = key_file.read()
 
+    def stream_cipher(self):
+        """
+        Returns the chunked cipher derived from the loaded key, reusing it across calls and threads.
+        """
+        return self._cipher(("stream", self.key, self.chunk_size),
+                            lambda: StreamCipher(self.key, chunk_size=self.chunk_size))
+
+    def fernet(self):
+        """
+        Returns the Fernet cipher for the loaded key, reusing it across calls and threads.
+        """
+        return self._cipher(("fernet", self.key), lambda: Fernet(self.key))
+
+    def _cipher(self, cache_key, factory):
+        with self._cipher_lock:
+            if cache_key not in self._ciphers:
+                self._ciphers[cache_key] = factory()
+            return self._ciphers[cache_key]
+
+    def _write_atomically(self, target_path, write):
+        """
+        Writes a file through a temporary sibling and renames it into place, so readers never see partial output.
+        :param target_path: Final path of the file.
+        :param write: Callable receiving the open temporary binary file.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target_path) or ".", prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                write(temp_file)
+            os.replace(temp_path, target_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
     def encrypt_file(self, file_path, output_dir="data/evidence/encrypted/"):
         """
         Encrypts a user-provided image file and saves the encrypted version.
+        The file is processed in fixed-size authenticated chunks, so memory use does not grow with file size.
         :param file_path: Path to the image file to be encrypted.
         :param output_dir: Directory to save the encrypted file.
         """
         os.makedirs(output_dir, exist_ok=True)
         encrypted_file_path = os.path.join(output_dir, os.path.basename(file_path) + ".enc")
 
-        with open(file_path, "rb") as file:
-            data = file.read()
-
-        fernet = Fernet(self.key)
-        encrypted_data = fernet.encrypt(data)
+        with timed("encryption", "encrypt") as timer, open(file_path, "rb") as file:
+            self._write_atomically(
+                encrypted_file_path,
+                lambda encrypted_file: self.stream_cipher().encrypt_stream(file, encrypted_file)
+            )
+            timer.bytes_in = os.path.getsize(file_path)
+            timer.bytes_out = os.path.getsize(encrypted_file_path)
 
-        with open(encrypted_file_path, "wb") as encrypted_file:
-            encrypted_file.write(encrypted_data)
-        
         return encrypted_file_path
 
+    def encrypt_files(self, file_paths, output_dir="data/evidence/encrypted/", max_workers=None, use_processes=False):
+        """
+        Encrypts many files in parallel.
+        :param file_paths: Paths of the files to encrypt.
+        :param output_dir: Directory to save the encrypted files.
+        :param max_workers: Size of the worker pool (defaults to the executor's own default).
+        :param use_processes: Use a process pool instead of a thread pool.
+        :return: Manifest with one dictionary per input file, in input order, holding
+                 "source", "encrypted", "bytes", "status" ("encrypted" or "failed") and "error".
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        if not file_paths:
+            return []
+
+        if use_processes:
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                           initargs=(self.key_path, self.chunk_size))
+            task = _encrypt_in_worker
+        else:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="encryption")
+            task = self._encrypt_with_manifest
+
+        with executor:
+            manifest = list(executor.map(task, file_paths, [output_dir] * len(file_paths)))
+        for entry in manifest:
+            if "metrics" in entry:
+                REGISTRY.merge(entry.pop("metrics"))
+        return manifest
+
+    def _encrypt_with_manifest(self, file_path, output_dir):
+        entry = {"source": file_path, "encrypted": None, "bytes": 0, "status": "failed", "error": None}
+        try:
+            entry["encrypted"] = self.encrypt_file(file_path, output_dir)
+            entry["bytes"] = os.path.getsize(file_path)
+            entry["status"] = "encrypted"
+        except Exception as e:
+            entry["error"] = str(e)
+        return entry
+
     def decrypt_file(self, encrypted_file_path, output_dir="data/evidence/decrypted/"):
         """
         Decrypts an encrypted image file and saves the decrypted version.
@@ -59,13 +156,73 @@ class EncryptionAgent:
         os.makedirs(output_dir, exist_ok=True)
         decrypted_file_path = os.path.join(output_dir, os.path.basename(encrypted_file_path).replace(".enc", ""))
 
-        with open(encrypted_file_path, "rb") as encrypted_file:
-            encrypted_data = encrypted_file.read()
+        with timed("encryption", "decrypt") as timer:
+            timer.bytes_in = os.path.getsize(encrypted_file_path)
+            with open(encrypted_file_path, "rb") as encrypted_file:
+                header = encrypted_file.read(HEADER_SIZE)
+                encrypted_file.seek(0)
+
+                if is_stream_encrypted(header):
+                    self._write_atomically(
+                        decrypted_file_path,
+                        lambda decrypted_file: self.stream_cipher().decrypt_stream(encrypted_file, decrypted_file)
+                    )
+                    timer.bytes_out = os.path.getsize(decrypted_file_path)
+                    return decrypted_file_path
 
-        fernet = Fernet(self.key)
-        decrypted_data = fernet.decrypt(encrypted_data)
+                # Files encrypted before the chunked format are single Fernet tokens
+                encrypted_data = encrypted_file.read()
 
-        with open(decrypted_file_path, "wb") as decrypted_file:
-            decrypted_file.write(decrypted_data)
+            decrypted_data = self.fernet().decrypt(encrypted_data)
+
+            with open(decrypted_file_path, "wb") as decrypted_file:
+                decrypted_file.write(decrypted_data)
+            timer.bytes_out = len(decrypted_data)
 
         return decrypted_file_path
+
+    def is_chunked(self, encrypted_file_path):
+        """
+        Tells whether an encrypted file uses the chunked format (as opposed to a legacy Fernet token).
+        :param encrypted_file_path: Path to the encrypted file.
+        :return: True for chunked files.
+        """
+        with open(encrypted_file_path, "rb") as encrypted_file:
+            return is_stream_encrypted(encrypted_file.read(HEADER_SIZE))
+
+    def plaintext_size(self, encrypted_file_path):
+        """
+        Returns the size of the decrypted content of an encrypted file.
+        :param encrypted_file_path: Path to the encrypted file.
+        :return: Plaintext size in bytes.
+        """
+        with open(encrypted_file_path, "rb") as encrypted_file:
+            if is_stream_encrypted(encrypted_file.read(HEADER_SIZE)):
+                encrypted_file.seek(0)
+                size, _ = self.stream_cipher().plaintext_size(encrypted_file, os.path.getsize(encrypted_file_path))
+                return size
+            encrypted_file.seek(0)
+            return len(self.fernet().decrypt(encrypted_file.read()))
+
+    def iter_decrypted_range(self, encrypted_file_path, start=0, stop=None):
+        """
+        Decrypts a byte range of an encrypted file without writing plaintext to disk.
+        Chunked files only decrypt the chunks covering the range; legacy Fernet files are decrypted in memory.
+        :param encrypted_file_path: Path to the encrypted file.
+        :param start: First plaintext byte offset (inclusive).
+        :param stop: Last plaintext byte offset (exclusive), or None for the end of the file.
+        :return: Generator of plaintext byte strings.
+        """
+        with open(encrypted_file_path, "rb") as encrypted_file:
+            header = encrypted_file.read(HEADER_SIZE)
+            encrypted_file.seek(0)
+
+            if is_stream_encrypted(header):
+                container_size = os.path.getsize(encrypted_file_path)
+                yield from self.stream_cipher().decrypt_range(
+                    encrypted_file, container_size, start, float("inf") if stop is None else stop
+                )
+                return
+
+            decrypted_data = self.fernet().decrypt(encrypted_file.read())
+            yield decrypted_data[start:stop]
@@ -1,24 +1,66 @@
-from openai import OpenAI
 from utils.config_loader import load_config
 from utils.env_loader import load_env
+from utils.clients import get_openai_client
+from utils.result_cache import ResultCache, hash_file, make_key
+from utils.image_preprocessor import ImagePreprocessor
+from utils.metrics import RETRIES, message_bytes, record_cache, record_usage, timed
+from utils.response_parser import ANALYSIS_SCHEMA, ResponseParseError, compile_schema, parse_json_object
+import openai
+import logging
 import os
 import base64
-import json
-import re
+import mimetypes
+
+# Findings returned when a response cannot be parsed
+FALLBACK_FINDINGS = {
+    "Scene Description": "Could not extract scene description.",
+    "Key Observations": "Could not extract observations.",
+    "Environmental Conditions": "Could not extract environmental conditions."
+}
+
+# Validators compiled once from the description_prompt JSON format
+validate_analysis = compile_schema(ANALYSIS_SCHEMA)
+validate_packed = compile_schema({"type": "object"})
 
 class ImageContentAnalysisAgent:
     def __init__(self):
         """
         Initializes the Image Content Analysis Agent using configurations and environment variables.
         """
-        # Load configurations and environment variables
-        self.config = load_config()
+        # Load environment variables
         load_env()
         self.api_key = os.getenv("OPENAI_API_KEY")
 
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = self.config["openai"]["model"]
+        # Shared, connection-pooled OpenAI client
+        self.client = get_openai_client()
+        self.json_mode_supported = True
+
+        # Downscaling and re-encoding of local images before upload
+        self.preprocessor = None
+        preprocessing = dict(load_config()["agents"]["image_analysis"].get("preprocessing", {}))
+        if preprocessing.pop("enabled", False):
+            self.preprocessor = ImagePreprocessor(**preprocessing)
+
+        # Persistent cache of parsed analyses, keyed by image content and model settings
+        self.cache = None
+        cache_config = self.config.get("cache", {})
+        if cache_config.get("enabled", False):
+            analysis_cache = cache_config.get("analysis", {})
+            self.cache = ResultCache(
+                "image_analysis",
+                db_path=cache_config.get("db_path", "data/cache/results.db"),
+                max_entries=analysis_cache.get("max_entries", 1000),
+                ttl_seconds=analysis_cache.get("ttl_seconds")
+            )
+
+    @property
+    def config(self):
+        """Current configuration snapshot; edits to config.yaml apply to the next request."""
+        return load_config()
+
+    @property
+    def model(self):
+        return self.config["openai"]["model"]
 
     def encode_image(self, image_path):
         """
@@ -26,18 +68,96 @@ class ImageContentAnalysisAgent:
         :param image_path: Path to the local image file.
         :return: Base64 encoded string of the image.
         """
+        payload = self.image_payload(image_path)
+        return payload[1] if payload else None
+
+    def image_payload(self, image_path):
+        """
+        Builds the upload payload of a local image: downscaled and re-encoded when preprocessing is
+        enabled (cached by source hash), otherwise the original file.
+        :param image_path: Path to the local image file.
+        :return: Tuple (mime_type, base64 string), or None if the image could not be read.
+        """
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode("utf-8")
+            if self.preprocessor is not None:
+                mime_type, data = self.preprocessor.prepare(image_path)
+            else:
+                mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+                with open(image_path, "rb") as image_file:
+                    data = image_file.read()
+            return mime_type, base64.b64encode(data).decode("utf-8")
         except Exception as e:
-            print(f"Error encoding image: {e}")
+            logging.error(f"Error encoding image: {e}")
             return None
 
-    def analyze_images(self, images):
+    def _image_content(self, image):
         """
-        Analyzes crime scene images and extracts forensic insights.
-        :param images: List of image paths (local) or URLs (remote) to analyze.
-        :return: Tuple containing findings (dict) and evidence data (list of dicts).
+        Builds the image_url content entry for a local image (base64) or a remote URL.
+        :param image: Image path (local) or URL (remote).
+        :return: Content entry dictionary, or None if the image could not be encoded.
+        """
+        if os.path.isfile(image):  # Local image
+            payload = self.image_payload(image)
+            if not payload:
+                return None
+            mime_type, base64_image = payload
+            return {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:{mime_type};base64,{base64_image}"
+                }
+            }
+        # Remote image URL
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": image
+            }
+        }
+
+    def cache_key(self, images):
+        """
+        Builds the analysis cache key for a list of images.
+        :param images: List of image paths (local) or URLs (remote).
+        :return: Cache key combining image content hashes with the model settings.
+        """
+        config = self.config
+        image_ids = [hash_file(image) if os.path.isfile(image) else image for image in images]
+        key_parts = [
+            image_ids,
+            config["openai"]["model"],
+            config["agents"]["image_analysis"]["description_prompt"],
+            config["openai"]["temperature"]
+        ]
+        # Analyses of differently preprocessed uploads are kept apart
+        if self.preprocessor is not None:
+            key_parts.append(self.preprocessor.settings)
+        return make_key(*key_parts)
+
+    def _cached_analysis(self, images):
+        """
+        Looks an analysis up in the cache.
+        :param images: List of image paths (local) or URLs (remote).
+        :return: Tuple (cache key, cached (findings, evidence_data) or None); the key is None without a cache.
+        """
+        if self.cache is None:
+            return None, None
+        try:
+            key = self.cache_key(images)
+            cached = self.cache.get(key)
+            record_cache("analysis", cached is not None)
+            if cached is not None:
+                return key, (cached["findings"], cached["evidence_data"])
+            return key, None
+        except Exception as e:
+            logging.warning(f"Error reading analysis cache: {e}")
+            return None, None
+
+    def _analysis_messages(self, images):
+        """
+        Builds the chat messages asking for the description_prompt analysis of the images.
+        :param images: List of image paths (local) or URLs (remote).
+        :return: Messages payload for the chat completion API.
         """
         # Prepare the content payload
         content_list = [
@@ -49,49 +169,285 @@ class ImageContentAnalysisAgent:
 
         # Append each image as base64 (local) or URL (remote)
         for image in images:
-            if os.path.isfile(image):  # Local image
-                base64_image = self.encode_image(image)
-                if base64_image:
-                    content_list.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    })
-            else:  # Remote image URL
-                content_list.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": image
-                    }
-                })
+            image_content = self._image_content(image)
+            if image_content:
+                content_list.append(image_content)
 
         # Define the messages payload
-        messages = [
+        return [
             {
                 "role": "user",
                 "content": content_list
             }
         ]
 
+    def _finish_analysis(self, key, response_content):
+        """
+        Parses a complete response and caches it when parsing succeeded.
+        :param key: Cache key from _cached_analysis(), or None.
+        :param response_content: Full response text.
+        :return: Tuple (findings, evidence_data).
+        """
+        findings, evidence_data = self._process_response(response_content)
+
+        # Only cache responses that were parsed successfully
+        if key is not None and findings != FALLBACK_FINDINGS:
+            try:
+                self.cache.set(key, {"findings": findings, "evidence_data": evidence_data})
+            except Exception as e:
+                logging.warning(f"Error writing analysis cache: {e}")
+
+        return findings, evidence_data
+
+    def analyze_images(self, images):
+        """
+        Analyzes crime scene images and extracts forensic insights.
+        Results are served from the analysis cache when the same images were already analyzed.
+        :param images: List of image paths (local) or URLs (remote) to analyze.
+        :return: Tuple containing findings (dict) and evidence data (list of dicts).
+        """
+        key, cached = self._cached_analysis(images)
+        if cached is not None:
+            return cached
+
         # Call OpenAI's chat completion API
+        openai_config = self.config["openai"]
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.config["openai"]["max_tokens"],
-                temperature=self.config["openai"]["temperature"]
-            )
+            with timed("image_analysis", "completion") as timer:
+                messages = self._analysis_messages(images)
+                timer.bytes_out = message_bytes(messages)
+                response = self._create_completion(
+                    messages=messages,
+                    model=openai_config["model"],
+                    max_tokens=openai_config["max_tokens"],
+                    temperature=openai_config["temperature"]
+                )
+                record_usage("image_analysis", openai_config["model"], response.usage)
 
-            # Extract content and process it
-            response_content = response.choices[0].message.content
-            findings, evidence_data = self._process_response(response_content)
-
-            return findings, evidence_data
+                # Extract content and process it
+                content = response.choices[0].message.content
+                timer.bytes_in = len(content or "")
+                return self._finish_analysis(key, content)
         except Exception as e:
-            print(f"Error analyzing images: {e}")
+            logging.error(f"Error analyzing images: {e}")
             return None, None
 
+    def analyze_images_stream(self, images):
+        """
+        Streaming variant of analyze_images(): the response is consumed as the model produces it.
+        Yields ("delta", text) for every content fragment, then ("result", (findings, evidence_data)).
+        A cached analysis is yielded as a result right away; on failure the result is (None, None).
+        :param images: List of image paths (local) or URLs (remote) to analyze.
+        """
+        key, cached = self._cached_analysis(images)
+        if cached is not None:
+            yield "result", cached
+            return
+
+        # One configuration snapshot for the whole stream
+        openai_config = self.config["openai"]
+        try:
+            with timed("image_analysis", "stream") as timer:
+                messages = self._analysis_messages(images)
+                timer.bytes_out = message_bytes(messages)
+                stream = self._create_completion(
+                    messages=messages,
+                    model=openai_config["model"],
+                    max_tokens=openai_config["max_tokens"],
+                    temperature=openai_config["temperature"],
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                parts = []
+                for chunk in stream:
+                    # The last chunk carries the token usage and no choices
+                    record_usage("image_analysis", openai_config["model"], getattr(chunk, "usage", None))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield "delta", delta
+                timer.bytes_in = sum(len(part) for part in parts)
+        except Exception as e:
+            logging.error(f"Error streaming image analysis: {e}")
+            yield "result", (None, None)
+            return
+
+        yield "result", self._finish_analysis(key, "".join(parts))
+
+    def pack_images(self, images):
+        """
+        Groups images into batches that fit in a single packed request.
+        Batches are bounded by packing.max_images and by packing.max_bytes of base64 payload.
+        :param images: List of image paths (local) or URLs (remote).
+        :return: List of image lists, one per request.
+        """
+        packing = self.config["agents"]["image_analysis"].get("packing", {})
+        max_images = packing.get("max_images", 4)
+        max_bytes = packing.get("max_bytes", 15 * 1024 * 1024)
+
+        batches, batch, batch_bytes = [], [], 0
+        for image in images:
+            # Base64 inflates local files by 4/3; remote URLs cost no upload bytes
+            image_bytes = self._upload_size(image) * 4 // 3 if os.path.isfile(image) else 0
+            if batch and (len(batch) >= max_images or batch_bytes + image_bytes > max_bytes):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(image)
+            batch_bytes += image_bytes
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _upload_size(self, image_path):
+        """Size in bytes of the payload uploaded for a local image (preprocessed payloads are cached)."""
+        if self.preprocessor is not None:
+            try:
+                return len(self.preprocessor.prepare(image_path)[1])
+            except Exception:
+                pass
+        return os.path.getsize(image_path)
+
+    def analyze_images_packed(self, images):
+        """
+        Analyzes several independent images with as few requests as possible.
+        Each request carries a batch from pack_images() and asks for a JSON object keyed by image label,
+        which is split back into per-image results. Cached images are not sent again, and images missing
+        from a packed response are retried individually.
+        :param images: List of image paths (local) or URLs (remote) to analyze.
+        :return: Dictionary mapping each image to its (findings, evidence_data) tuple.
+        """
+        results = {}
+        pending = []
+        for image in images:
+            cached = None
+            if self.cache is not None:
+                try:
+                    cached = self.cache.get(self.cache_key([image]))
+                    record_cache("analysis", cached is not None)
+                except Exception as e:
+                    logging.warning(f"Error reading analysis cache: {e}")
+            if cached is not None:
+                results[image] = (cached["findings"], cached["evidence_data"])
+            else:
+                pending.append(image)
+
+        for batch in self.pack_images(pending):
+            if len(batch) == 1:
+                results[batch[0]] = self.analyze_images(batch)
+                continue
+
+            packed_results = self._analyze_packed_batch(batch)
+            for image in batch:
+                if image in packed_results:
+                    findings, evidence_data = packed_results[image]
+                    results[image] = (findings, evidence_data)
+                    if self.cache is not None:
+                        try:
+                            self.cache.set(self.cache_key([image]), {"findings": findings, "evidence_data": evidence_data})
+                        except Exception as e:
+                            logging.warning(f"Error writing analysis cache: {e}")
+                else:
+                    results[image] = self.analyze_images([image])
+
+        return results
+
+    def _analyze_packed_batch(self, batch):
+        """
+        Sends one request containing every image of a batch, each preceded by its label.
+        :param batch: List of image paths (local) or URLs (remote).
+        :return: Dictionary mapping images to (findings, evidence_data) for every label found in the response.
+        """
+        config = self.config
+        image_config = config["agents"]["image_analysis"]
+        content_list = [
+            {
+                "type": "text",
+                "text": image_config["description_prompt"] + "\n" + image_config["packed_prompt"]
+            }
+        ]
+
+        labels = {}
+        for index, image in enumerate(batch, start=1):
+            image_content = self._image_content(image)
+            if not image_content:
+                continue
+            label = f"image_{index}"
+            labels[label] = image
+            content_list.append({"type": "text", "text": label})
+            content_list.append(image_content)
+
+        try:
+            with timed("image_analysis", "packed_completion") as timer:
+                messages = [{"role": "user", "content": content_list}]
+                timer.bytes_out = message_bytes(messages)
+                response = self._create_completion(
+                    messages=messages,
+                    model=config["openai"]["model"],
+                    max_tokens=config["openai"]["max_tokens"] * len(labels),
+                    temperature=config["openai"]["temperature"]
+                )
+                record_usage("image_analysis", config["openai"]["model"], response.usage)
+                content = response.choices[0].message.content
+                timer.bytes_in = len(content or "")
+                response_data = parse_json_object(content, validate_packed)
+        except Exception as e:
+            logging.error(f"Error analyzing packed images: {e}")
+            return {}
+
+        # Labels whose analysis is missing or does not match the schema are retried individually
+        results = {}
+        for label, image in labels.items():
+            try:
+                results[image] = self._extract_findings(validate_analysis(response_data[label]))
+            except (KeyError, ResponseParseError) as e:
+                logging.warning(f"Packed response has no valid analysis for {label}: {e}")
+        return results
+
+    def _create_completion(self, **kwargs):
+        """
+        Calls the chat completion API, asking for JSON mode when agents.image_analysis.response_format
+        is set. Models that reject the response_format parameter are retried without it, and it is
+        not sent again by this agent.
+        :return: The chat completion response.
+        """
+        config = self.config
+        kwargs.setdefault("model", config["openai"]["model"])
+        kwargs.setdefault("temperature", config["openai"]["temperature"])
+        response_format = config["agents"]["image_analysis"].get("response_format")
+        if response_format and self.json_mode_supported:
+            try:
+                return self.client.chat.completions.create(response_format={"type": response_format}, **kwargs)
+            except openai.BadRequestError as e:
+                # Only a rejection of the response_format parameter itself disables JSON mode
+                if e.param != "response_format":
+                    raise
+                logging.warning(f"Model {kwargs['model']} does not support JSON mode, parsing text output: {e}")
+                RETRIES.inc(component="image_analysis", reason="json_mode")
+                self.json_mode_supported = False
+        return self.client.chat.completions.create(**kwargs)
+
+    def _extract_findings(self, response_data):
+        """
+        Converts one parsed analysis object into findings and evidence data.
+        :param response_data: Dictionary following the description_prompt JSON format.
+        :return: Tuple (findings, evidence_data).
+        """
+        key_observations = response_data.get("key_observations", "No observations provided.")
+        # Models sometimes list the observations; the report and narrative expect one text
+        if isinstance(key_observations, list):
+            key_observations = "\n".join(key_observations)
+        findings = {
+            "Scene Description": response_data.get("scene_description", "No description provided."),
+            "Key Observations": key_observations,
+            "Environmental Conditions": response_data.get("environmental_conditions", "No conditions provided.")
+        }
+
+        evidence_data = response_data.get("evidence", [])
+        for evidence in evidence_data:
+            evidence["status"] = "unprocessed"  # Add default status
+
+        return findings, evidence_data
+
 
     def _process_response(self, response_content):
         """
@@ -100,38 +456,16 @@ class ImageContentAnalysisAgent:
         :return: Tuple (findings, evidence_data).
         """
         try:
-            # Extract JSON content from the first '{' to the last '}'
-            json_content = re.search(r"\{.*\}", response_content, re.DOTALL)
-            if not json_content:
-                raise ValueError("No valid JSON found in the response content.")
-
-            # Parse the extracted JSON string
-            response_data = json.loads(json_content.group(0))
-
-            # Extract findings and evidence data
-            findings = {
-                "Scene Description": response_data.get("scene_description", "No description provided."),
-                "Key Observations": response_data.get("key_observations", "No observations provided."),
-                "Environmental Conditions": response_data.get("environmental_conditions", "No conditions provided.")
-            }
-
-            evidence_data = response_data.get("evidence", [])
-            for evidence in evidence_data:
-                evidence["status"] = "unprocessed"  # Add default status
+            # JSON mode returns a bare object; otherwise the first balanced object matching the schema is used
+            response_data = parse_json_object(response_content, validate_analysis)
+            return self._extract_findings(response_data)
 
-            return findings, evidence_data
-
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Error processing response content: {e}")
-            print("Raw response content:")
-            print(response_content)
+        except ResponseParseError as e:
+            logging.warning(f"Error processing response content: {e}")
+            logging.debug(f"Raw response content: {response_content}")
 
             # Provide fallback outputs
-            findings = {
-                "Scene Description": "Could not extract scene description.",
-                "Key Observations": "Could not extract observations.",
-                "Environmental Conditions": "Could not extract environmental conditions."
-            }
+            findings = dict(FALLBACK_FINDINGS)
             evidence_data = []
 
             return findings, evidence_data
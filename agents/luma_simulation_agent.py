@@ -1,53 +1,166 @@
 import os
 import time
 import logging
-from lumaai import LumaAI
-import requests
-from utils.env_loader import load_env
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from utils.clients import get_http_session, get_luma_client
+from utils.config_loader import load_config
+from utils.downloader import RangedDownloader
+from utils.futures import chain, resolved
+from utils.generation_poller import GenerationPoller, GenerationFailed
+from utils.metrics import record_cache, timed
+from utils.result_cache import ResultCache
+from utils.single_flight import SingleFlight
 
 class LumaSimulationAgent:
-    def __init__(self, output_dir="data/simulations/"):
+    def __init__(self, output_dir="data/simulations/", store_path="data/cache/results.db"):
         """
         Initializes the Luma Simulation Agent.
-        :param api_key: Luma API Key.
         :param output_dir: Directory to save generated simulations.
+        :param store_path: SQLite database holding the simulation store metadata.
         """
-        load_env()
-        self.api_key = os.getenv("LUMAAI_API_KEY")
-        print(self.api_key)
-        self.client = LumaAI(auth_token=self.api_key)
-        print(self.client)
+        self.client = get_luma_client()
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def generate_video(self, prompt, video_name="crime_scene_simulation.mp4"):
+        # One background poller tracks every outstanding generation of this agent
+        luma_config = load_config().get("luma", {})
+        self.poller = GenerationPoller(self.client, **luma_config.get("polling", {}))
+        self.downloader = RangedDownloader(session=get_http_session(), **luma_config.get("download", {}))
+        # Finished generations are downloaded here, so neither the poller nor a caller's thread waits on them
+        self.download_pool = ThreadPoolExecutor(
+            max_workers=luma_config.get("download_workers", 2), thread_name_prefix="luma-download"
+        )
+
+        # Content-addressed simulation store: prompt hash -> generation metadata and video file
+        self.store = ResultCache("simulations", db_path=store_path, max_entries=None, ttl_seconds=None)
+        self.in_flight = SingleFlight()
+
+    def prompt_key(self, prompt):
         """
-        Generates a video based on the provided prompt using Luma Dream Machine API.
+        Computes the content address of a prompt.
         :param prompt: Textual prompt describing the crime scene.
-        :param video_name: Name of the output video file.
+        :return: Hex SHA-256 digest of the whitespace-normalized prompt.
+        """
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def generate_video(self, prompt, video_name=None):
+        """
+        Generates a video based on the provided prompt using Luma Dream Machine API, and waits for it.
+        :param prompt: Textual prompt describing the crime scene.
+        :param video_name: Name of the output video file (defaults to the prompt hash).
         :return: Path to the generated video or None if failed.
         """
+        return self.generate_video_async(prompt, video_name).result()
+
+    def generate_video_async(self, prompt, video_name=None):
+        """
+        Starts generating a video without waiting for it: the shared poller tracks the generation and its
+        completion callback downloads the video, so outstanding generations hold no threads.
+        Videos are stored by prompt hash: a repeated prompt returns the stored video without a new generation,
+        and concurrent requests for the same prompt share one generation.
+        :param prompt: Textual prompt describing the crime scene.
+        :param video_name: Name of the output video file (defaults to the prompt hash).
+        :return: Future resolved with the path to the generated video, or None if failed.
+        """
+        key = self.prompt_key(prompt)
+        video_name = video_name or f"{key[:32]}.mp4"
+
         try:
-            logging.info("Sending request to generate video...")
-            generation = self.client.generations.create(prompt=prompt)
+            stored = self.store.get(key)
+        except Exception as e:
+            logging.error(f"Error reading the simulation store: {e}")
+            stored = None
+        reusable = bool(stored and stored.get("video_path") and os.path.isfile(stored["video_path"]))
+        record_cache("simulations", reusable)
+        if reusable:
+            logging.info(f"Reusing stored simulation for prompt {key[:12]}: {stored['video_path']}")
+            return resolved(stored["video_path"])
+
+        timer = timed("luma", "generation").start()
+        timer.bytes_out = len(prompt)
+
+        def finish(video_path):
+            timer.stop("ok" if video_path else "error")
+            return video_path
+
+        return chain(self.in_flight.do_async(key, self._generate, key, prompt, video_name, stored), finish)
+
+    def _generate(self, key, prompt, video_name, stored):
+        """
+        Starts (or resumes) a generation and hands it to the poller.
+        :param key: Prompt hash.
+        :param prompt: Textual prompt describing the crime scene.
+        :param video_name: Name of the output video file.
+        :param stored: Existing store record for the prompt, if any.
+        :return: Future resolved with the path to the generated video, or None if failed.
+        """
+        record = {"prompt": prompt, "generation_id": None, "video_path": None,
+                  "created_at": time.time(), "completed_at": None}
+        # Resume a generation that was started but never downloaded (e.g. after a restart). A completed one
+        # whose video file is gone is generated again: the URL of its video may have expired.
+        if stored and stored.get("generation_id") and not stored.get("failed") and not stored.get("completed_at"):
+            record.update(stored)
+            logging.info(f"Resuming generation with ID: {record['generation_id']}")
+        else:
+            try:
+                logging.info("Sending request to generate video...")
+                generation = self.client.generations.create(prompt=prompt)
+            except Exception as e:
+                logging.error(f"An error occurred while generating video: {e}")
+                return resolved(None)
+            record["generation_id"] = generation.id
             logging.info(f"Generation initiated with ID: {generation.id}")
+            try:
+                self.store.set(key, record)
+            except Exception as e:
+                logging.error(f"Error recording generation {generation.id}: {e}")
+
+        video = Future()
+
+        def on_finished(generation_future):
+            # Runs on the poller thread, which must keep polling: the download is handed off
+            try:
+                self.download_pool.submit(self._complete, key, record, video_name, generation_future, video)
+            except RuntimeError as e:
+                logging.error(f"Could not download generation {record['generation_id']}: {e}")
+                video.set_result(None)
+
+        logging.info("Generation in progress...")
+        self.poller.track(record["generation_id"], callback=on_finished)
+        return video
 
-            # Polling for status
-            while True:
-                generation = self.client.generations.get(id=generation.id)
-                if generation.state == "completed":
-                    video_url = generation.assets.video
-                    logging.info(f"Video generation completed. Downloading from {video_url}")
-                    return self._download_video(video_url, video_name)
-                elif generation.state == "failed":
-                    logging.error(f"Generation failed: {generation.failure_reason}")
-                    return None
-                else:
-                    logging.info("Generation in progress...")
-                    time.sleep(5)
+    def _complete(self, key, record, video_name, generation_future, video):
+        """
+        Downloads a finished generation, records it in the simulation store and resolves its future.
+        :param key: Prompt hash.
+        :param record: Store record of the generation.
+        :param video_name: Name of the output video file.
+        :param generation_future: Poller future of the generation.
+        :param video: Future resolved with the path to the video, or None if failed.
+        """
+        video_path = None
+        try:
+            generation = generation_future.result()
+            video_url = generation.assets.video
+            logging.info(f"Video generation completed. Downloading from {video_url}")
+            video_path = self._download_video(video_url, video_name)
+        except GenerationFailed as e:
+            logging.error(f"Generation failed: {e}")
         except Exception as e:
             logging.error(f"An error occurred while generating video: {e}")
-            return None
+
+        if video_path:
+            record.update(video_path=video_path, completed_at=time.time())
+        else:
+            # Do not keep resuming a generation that errors out
+            record["failed"] = True
+        try:
+            self.store.set(key, record)
+        except Exception as e:
+            logging.error(f"Error recording generation {record['generation_id']}: {e}")
+        video.set_result(video_path)
 
     def _download_video(self, url, file_name):
         """
@@ -57,11 +170,9 @@ class LumaSimulationAgent:
         :return: Path to the saved video.
         """
         try:
-            video_response = requests.get(url, stream=True)
-            video_path = os.path.join(self.output_dir, file_name)
-            with open(video_path, 'wb') as file:
-                for chunk in video_response.iter_content(chunk_size=8192):
-                    file.write(chunk)
+            with timed("luma", "download") as timer:
+                video_path = self.downloader.download(url, os.path.join(self.output_dir, file_name))
+                timer.bytes_in = os.path.getsize(video_path)
             logging.info(f"Video saved at: {video_path}")
             return video_path
         except Exception as e:
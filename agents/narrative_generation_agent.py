@@ -1,22 +1,45 @@
-from openai import OpenAI
 import logging
 import os
 from utils.config_loader import load_config
 from utils.env_loader import load_env
+from utils.clients import get_openai_client
+from utils.metrics import message_bytes, record_cache, record_usage, timed
+from utils.result_cache import ResultCache, make_key
+from utils.single_flight import SingleFlight
 
 class NarrativeGenerationAgent:
     def __init__(self):
         """
         Initializes the Image Content Analysis Agent using configurations and environment variables.
         """
-        # Load configurations and environment variables
-        self.config = load_config()
+        # Load environment variables
         load_env()
         self.api_key = os.getenv("OPENAI_API_KEY")
 
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = self.config["openai"]["model"]
+        # Shared, connection-pooled OpenAI client
+        self.client = get_openai_client()
+
+        # Persistent narrative cache and deduplication of identical in-flight requests
+        self.in_flight = SingleFlight()
+        self.cache = None
+        cache_config = self.config.get("cache", {})
+        if cache_config.get("enabled", False):
+            narrative_cache = cache_config.get("narrative", {})
+            self.cache = ResultCache(
+                "narratives",
+                db_path=cache_config.get("db_path", "data/cache/results.db"),
+                max_entries=narrative_cache.get("max_entries", 1000),
+                ttl_seconds=narrative_cache.get("ttl_seconds")
+            )
+
+    @property
+    def config(self):
+        """Current configuration snapshot; edits to config.yaml apply to the next request."""
+        return load_config()
+
+    @property
+    def model(self):
+        return self.config["openai"]["model"]
 
     def generate_narrative(self, findings, evidence_data):
         """
@@ -28,24 +51,118 @@ class NarrativeGenerationAgent:
         """
         # Construct a prompt to send to GPT
         prompt = self.create_prompt(findings, evidence_data)
+        key, cached = self._cached_narrative(prompt)
+        if cached is not None:
+            return cached
+
+        # Concurrent requests for the same prompt share a single API call
+        return self.in_flight.do(key, self._request_narrative, key, prompt)
+
+    def generate_narrative_stream(self, findings, evidence_data):
+        """
+        Streaming variant of generate_narrative(): yields the narrative in text fragments as the model
+        produces them. A cached narrative is yielded as a single fragment; the complete narrative is
+        cached once the stream ends.
+        :param findings: Crime scene findings (descriptions, observations)
+        :param evidence_data: Collected evidence data (location, type, etc.)
+        """
+        prompt = self.create_prompt(findings, evidence_data)
+        key, cached = self._cached_narrative(prompt)
+        if cached is not None:
+            yield cached
+            return
+
+        # One configuration snapshot for the whole stream
+        openai_config = self.config["openai"]
+        with timed("narrative", "stream") as timer:
+            messages = [{"role": "user", "content": prompt}]
+            timer.bytes_out = message_bytes(messages)
+            stream = self.client.chat.completions.create(
+                model=openai_config["model"],
+                messages=messages,
+                max_tokens=openai_config["max_tokens"],
+                temperature=openai_config["temperature"],
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            parts = []
+            for chunk in stream:
+                # The last chunk carries the token usage and no choices
+                record_usage("narrative", openai_config["model"], getattr(chunk, "usage", None))
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            timer.bytes_in = sum(len(part) for part in parts)
+
+        narrative = "".join(parts)
+        logging.info("Generated narrative: " + narrative)
+        self._store_narrative(key, narrative)
+
+    def _cached_narrative(self, prompt):
+        """
+        Looks a narrative up in the cache.
+        :param prompt: Prompt built by create_prompt().
+        :return: Tuple (cache key, cached narrative or None).
+        """
+        openai_config = self.config["openai"]
+        key = make_key(
+            prompt,
+            openai_config["model"],
+            openai_config["max_tokens"],
+            openai_config["temperature"]
+        )
+
+        if self.cache is not None:
+            try:
+                cached = self.cache.get(key)
+                record_cache("narrative", cached is not None)
+                if cached is not None:
+                    logging.info("Narrative served from cache")
+                    return key, cached["narrative"]
+            except Exception as e:
+                logging.error(f"Error reading narrative cache: {e}")
+        return key, None
+
+    def _store_narrative(self, key, narrative):
+        """Caches a generated narrative; cache errors are logged and ignored."""
+        if self.cache is not None and narrative:
+            try:
+                self.cache.set(key, {"narrative": narrative})
+            except Exception as e:
+                logging.error(f"Error writing narrative cache: {e}")
+
+    def _request_narrative(self, key, prompt):
+        """
+        Calls the chat API for a narrative and stores successful results in the cache.
+        :param key: Cache key of the prompt and model parameters.
+        :param prompt: Prompt built by create_prompt().
+        :return: The generated narrative, or None on failure.
+        """
         messages = [
             {
                 "role": "user",
                 "content": prompt
             }
         ]
+        openai_config = self.config["openai"]
         
         try:
             # Use the OpenAI API to generate a narrative
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.config["openai"]["max_tokens"],
-                temperature=self.config["openai"]["temperature"]
-            )
+            with timed("narrative", "completion") as timer:
+                timer.bytes_out = message_bytes(messages)
+                response = self.client.chat.completions.create(
+                    model=openai_config["model"],
+                    messages=messages,
+                    max_tokens=openai_config["max_tokens"],
+                    temperature=openai_config["temperature"]
+                )
+                record_usage("narrative", openai_config["model"], response.usage)
 
-            narrative = response.choices[0].message.content
+                narrative = response.choices[0].message.content
+                timer.bytes_in = len(narrative or "")
             logging.info("Generated narrative: " + narrative)
+            self._store_narrative(key, narrative)
             return narrative
         except Exception as e:
             logging.error(f"Error generating narrative: {e}")
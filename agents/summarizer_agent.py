@@ -1,43 +1,88 @@
 import os
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg') 
 import json
+import textwrap
+from utils.chart_renderer import ChartRenderer, draw_bar_chart
+from utils.evidence_stats import aggregate_evidence
+from utils.metrics import timed
+
+REPORT_NAME = "crime_scene_report"
+GRAPH_NAME = "evidence_distribution"
+
+# Lines of report text per PDF page (A4 portrait at 9 pt)
+PDF_LINES_PER_PAGE = 60
 
 class SummarizerAgent:
-    def __init__(self, report_dir="data/reports/"):
+    def __init__(self, report_dir="data/reports/", formats=("txt", "png", "pdf")):
         """
         Initializes the Summarizer Agent.
         :param report_dir: Directory to save generated reports and graphs.
+        :param formats: Outputs to produce: "txt" report, "png" graph and/or "pdf" report with the graph.
         """
         self.report_dir = report_dir
+        self.formats = tuple(formats)
         os.makedirs(self.report_dir, exist_ok=True)
+        self.renderer = ChartRenderer()
+
+    def output_path(self, name, extension, case_id=None):
+        """
+        Builds the path of a report output. Outputs of a case are prefixed with its ID, so concurrent
+        cases never overwrite each other; without a case ID the original shared names are used.
+        :param name: Base name of the output (REPORT_NAME or GRAPH_NAME).
+        :param extension: File extension without the dot.
+        :param case_id: Optional case identifier.
+        :return: Path inside the report directory.
+        """
+        prefix = f"{case_id}-" if case_id else ""
+        return os.path.join(self.report_dir, f"{prefix}{name}.{extension}")
+
+    def report_lines(self, findings, evidence_summary, stats=None):
+        """
+        Builds the text of a report.
+        :param findings: Summarized outputs from other agents.
+        :param evidence_summary: Details about the collected evidence.
+        :param stats: Optional EvidenceStats added as an evidence statistics section.
+        :return: List of report lines.
+        """
+        # Title
+        lines = ["Crime Scene Report", "===================", ""]
+
+        # Findings Section
+        lines.append("Findings:")
+        for key, value in findings.items():
+            lines.append(f"- {key}: {value}")
+        lines.append("")
+
+        # Evidence Summary Section
+        lines.append("Evidence Summary:")
+        for evidence in evidence_summary:
+            lines.append(f"- {evidence}")
+
+        # Evidence Statistics Section
+        if stats is not None and stats.total:
+            lines.extend(["", "Evidence Statistics:"])
+            crosstab = stats.location_crosstab()
+            for etype, count in stats.counts().items():
+                locations = ", ".join(f"{location} ({n})" for location, n in crosstab[etype].items())
+                lines.append(f"- {etype}: {count} ({locations})")
+
+        return lines
 
-    def generate_report(self, findings, evidence_summary):
+    def generate_report(self, findings, evidence_summary, stats=None, case_id=None):
         """
         Generates a structured report based on findings and evidence.
         :param findings: Summarized outputs from other agents.
         :param evidence_summary: Details about the collected evidence.
+        :param stats: Optional EvidenceStats added as an evidence statistics section.
+        :param case_id: Optional case identifier used to namespace the report file.
         :return: Path to the generated report.
         """
-        report_path = os.path.join(self.report_dir, "crime_scene_report.txt")
-        
+        report_path = self.output_path(REPORT_NAME, "txt", case_id)
+
         try:
-            with open(report_path, "w") as report_file:
-                # Title
-                report_file.write("Crime Scene Report\n")
-                report_file.write("===================\n\n")
-
-                # Findings Section
-                report_file.write("Findings:\n")
-                for key, value in findings.items():
-                    report_file.write(f"- {key}: {value}\n")
-                report_file.write("\n")
-
-                # Evidence Summary Section
-                report_file.write("Evidence Summary:\n")
-                for evidence in evidence_summary:
-                    report_file.write(f"- {evidence}\n")
+            with timed("summarizer", "report") as timer, open(report_path, "w") as report_file:
+                for line in self.report_lines(findings, evidence_summary, stats):
+                    report_file.write(line + "\n")
+                timer.bytes_out = report_file.tell()
 
             print(f"Report generated at: {report_path}")
             return report_path
@@ -45,27 +90,25 @@ class SummarizerAgent:
             print(f"Error generating report: {e}")
             return None
 
-    def create_graphs(self, evidence_data):
+    def create_graphs(self, evidence_data, stats=None, case_id=None):
         """
         Generates graphs based on evidence data.
         :param evidence_data: Data about evidence to visualize.
+        :param stats: Optional EvidenceStats already computed for evidence_data.
+        :param case_id: Optional case identifier used to namespace the graph file.
         :return: List of paths to generated graphs.
         """
         graph_path = ''
         try:
             # Generate Evidence Distribution Graph
-            evidence_types = [item["type"] for item in evidence_data]
-            evidence_counts = {etype: evidence_types.count(etype) for etype in set(evidence_types)}
-
-            plt.figure()
-            plt.bar(evidence_counts.keys(), evidence_counts.values(), color="blue", alpha=0.7)
-            plt.title("Evidence Distribution")
-            plt.xlabel("Evidence Type")
-            plt.ylabel("Count")
-            plt.xticks(rotation=45)
-            graph_path = os.path.join(self.report_dir, "evidence_distribution.png")
-            plt.savefig(graph_path)  # Save the graph to a file
-            plt.close()
+            stats = stats if stats is not None else aggregate_evidence(evidence_data)
+            graph_path = self.output_path(GRAPH_NAME, "png", case_id)
+            with timed("summarizer", "chart") as timer:
+                self.renderer.bar_chart(
+                    stats.types, stats.type_counts, graph_path,
+                    title="Evidence Distribution", xlabel="Evidence Type", ylabel="Count"
+                )
+                timer.bytes_out = os.path.getsize(graph_path)
 
             print(f"Graph generated at: {graph_path}")
         except Exception as e:
@@ -73,27 +116,81 @@ class SummarizerAgent:
 
         return graph_path
 
+    def generate_pdf(self, findings, evidence_summary, stats, case_id=None):
+        """
+        Generates a PDF report: the report text followed by the evidence distribution chart (as vectors).
+        :param findings: Summarized outputs from other agents.
+        :param evidence_summary: Details about the collected evidence.
+        :param stats: EvidenceStats of the evidence.
+        :param case_id: Optional case identifier used to namespace the PDF file.
+        :return: Path to the generated PDF, or None on failure.
+        """
+        from matplotlib.backends.backend_pdf import PdfPages
+        from matplotlib.figure import Figure
+
+        pdf_path = self.output_path(REPORT_NAME, "pdf", case_id)
+        try:
+            lines = []
+            for line in self.report_lines(findings, evidence_summary, stats):
+                lines.extend(textwrap.wrap(line, width=100, subsequent_indent="  ") or [""])
+
+            with timed("summarizer", "pdf") as timer:
+                with PdfPages(pdf_path) as pdf:
+                    for start in range(0, len(lines), PDF_LINES_PER_PAGE):
+                        page = Figure(figsize=(8.27, 11.69))
+                        page.text(0.06, 0.96, "\n".join(lines[start:start + PDF_LINES_PER_PAGE]),
+                                  va="top", family="monospace", fontsize=9)
+                        pdf.savefig(page)
+
+                    if stats.total:
+                        page = Figure(figsize=(8.27, 5.85))
+                        draw_bar_chart(page.add_subplot(), stats.types, stats.type_counts,
+                                       title="Evidence Distribution", xlabel="Evidence Type", ylabel="Count")
+                        page.subplots_adjust(bottom=0.25)
+                        pdf.savefig(page)
 
-    def summarize(self, findings, evidence_data):
+                timer.bytes_out = os.path.getsize(pdf_path)
+            print(f"PDF report generated at: {pdf_path}")
+            return pdf_path
+        except Exception as e:
+            print(f"Error generating PDF report: {e}")
+            return None
+
+    def summarize(self, findings, evidence_data, case_id=None):
         """
         Aggregates findings and evidence into a report and graphs.
         :param findings: Summarized outputs from other agents.
         :param evidence_data: Data about evidence.
-        :return: Dictionary with paths to the report and graphs.
+        :param case_id: Optional case identifier; outputs of different cases never share a file.
+        :return: Dictionary with paths to the report, graphs and PDF (None for formats not produced).
         """
         try:
             # Prepare Evidence Summary
             evidence_summary = [f"{e['type']} found at {e['location']}" for e in evidence_data]
 
+            # Aggregate the evidence once for the report, the graphs and the PDF
+            stats = aggregate_evidence(evidence_data)
+
             # Generate Report
-            report_path = self.generate_report(findings, evidence_summary)
+            report_path = None
+            if "txt" in self.formats:
+                report_path = self.generate_report(findings, evidence_summary, stats, case_id)
 
             # Generate Graphs
-            graph_paths = self.create_graphs(evidence_data)
+            graph_paths = None
+            if "png" in self.formats:
+                graph_paths = self.create_graphs(evidence_data, stats, case_id)
+
+            # Generate PDF
+            pdf_path = None
+            if "pdf" in self.formats:
+                pdf_path = self.generate_pdf(findings, evidence_summary, stats, case_id)
 
             return {
+                "case_id": case_id,
                 "report": report_path,
-                "graphs": graph_paths
+                "graphs": graph_paths,
+                "pdf": pdf_path
             }
         except Exception as e:
             print(f"Error during summarization: {e}")
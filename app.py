@@ -1,35 +1,77 @@
-from flask import Flask, request, render_template, redirect, send_from_directory, url_for, jsonify
+from flask import Flask, Response, request, render_template, redirect, send_from_directory, url_for, jsonify, abort, stream_with_context
+from werkzeug.security import safe_join
 import os
+import json
 import logging
-from agents.image_analysis_agent import ImageContentAnalysisAgent
-from agents.summarizer_agent import SummarizerAgent
-from agents.encryption_agent import EncryptionAgent
-from agents.narrative_generation_agent import NarrativeGenerationAgent
-from agents.luma_simulation_agent import LumaSimulationAgent
+import mimetypes
+import threading
+from utils.config_loader import load_config
+from utils.job_queue import JobQueue, COMPLETED, FAILED
+from utils.lazy import lazy_property
+from utils.plaintext_cache import PlaintextCache
+from utils.evidence_index import EvidenceIndex, INPUT, ENCRYPTED, REPORT, GRAPH, NARRATIVE, VIDEO
+from utils.result_cache import hash_file
+from utils.futures import chain
+from utils.metrics import REGISTRY
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Set up logging
-log_directory = "logs/"
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
-
-log_file = os.path.join(log_directory, "pipeline_logs.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_file),  # Log to a file
-        logging.StreamHandler()         # Also log to console
-    ]
-)
+def setup_logging():
+    """Logs to both console and file."""
+    log_directory = "logs/"
+    if not os.path.exists(log_directory):
+        os.makedirs(log_directory)
+
+    log_file = os.path.join(log_directory, "pipeline_logs.log")
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(log_file),  # Log to a file
+            logging.StreamHandler()         # Also log to console
+        ]
+    )
 
 def get_absolute_path(relative_path):
     """Convert a relative path to an absolute path."""
     base_dir = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base_dir, relative_path)
 
+def record_artifact(kind, path, sha256=None, parent=None):
+    """Records an artifact in the evidence index without letting index errors break a request."""
+    try:
+        return evidence_index.record(kind, path, sha256=sha256, parent=parent)
+    except Exception as e:
+        logging.error(f"Error recording {kind} artifact {path}: {e}")
+        return None
+
+def latest_input_image():
+    """Returns the most recently recorded input image that is still on disk."""
+    for artifact in evidence_index.list(INPUT, limit=20):
+        if not os.path.isfile(artifact["path"]):
+            evidence_index.mark_deleted(artifact["path"])
+        elif artifact["path"].endswith(('.jpg', '.png')):
+            return artifact["path"]
+    return None
+
+def list_encrypted_evidence():
+    """Lists encrypted evidence metadata from the evidence index without decrypting anything."""
+    evidence_dir = get_absolute_path("data/evidence/encrypted")
+    evidence = []
+    for artifact in evidence_index.list(ENCRYPTED):
+        if os.path.dirname(artifact["path"]) != evidence_dir or not artifact["path"].endswith('.enc'):
+            continue
+        name = os.path.basename(artifact["path"])[:-len('.enc')]
+        evidence.append({
+            "name": name,
+            "url": f"/evidence/{name}",
+            "mimetype": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "size": artifact["size"],
+            "modified": artifact["updated_at"]
+        })
+    return evidence
+
 def clean_decrypted_directory():
     """Deletes all files in the decrypted directory."""
     decrypted_dir = "data/evidence/decrypted/"
@@ -44,20 +86,47 @@ def clean_decrypted_directory():
 
 
 class MainAgent:
-    def __init__(self):
-        self.image_agent = ImageContentAnalysisAgent()
-        self.summarizer = SummarizerAgent()
-        self.encryption_agent = EncryptionAgent()
-        self.narrative_agent = NarrativeGenerationAgent()
-        self.luma_agent = LumaSimulationAgent()
+    # Agents (and the API clients, matplotlib and key file behind them) are created on first use,
+    # so importing the app and booting a worker stay cheap
+
+    @lazy_property
+    def image_agent(self):
+        from agents.image_analysis_agent import ImageContentAnalysisAgent
+        return ImageContentAnalysisAgent()
+
+    @lazy_property
+    def report_service(self):
+        from utils.report_service import ReportService
+        reports_config = load_config().get("reports", {})
+        return ReportService(
+            report_dir=reports_config.get("dir", "data/reports/"),
+            formats=reports_config.get("formats", ("txt", "png", "pdf")),
+            max_workers=reports_config.get("workers")
+        )
+
+    @lazy_property
+    def encryption_agent(self):
+        from agents.encryption_agent import EncryptionAgent
+        return EncryptionAgent()
+
+    @lazy_property
+    def narrative_agent(self):
+        from agents.narrative_generation_agent import NarrativeGenerationAgent
+        return NarrativeGenerationAgent()
+
+    @lazy_property
+    def luma_agent(self):
+        from agents.luma_simulation_agent import LumaSimulationAgent
+        return LumaSimulationAgent()
 
     def analyze_image(self, image_path):
         logging.info(f"Analyzing image: {image_path}")
         return self.image_agent.analyze_images([image_path])
 
-    def summarize_findings(self, findings, evidence_data):
+    def summarize_findings(self, findings, evidence_data, case_id=None):
+        """Starts rendering a report in the report worker processes; returns a future of the summarize() result."""
         logging.info("Summarizing findings...")
-        return self.summarizer.summarize(findings, evidence_data)
+        return self.report_service.submit(case_id, findings, evidence_data)
 
     def encrypt_file(self, file_path):
         logging.info(f"Encrypting file: {file_path}")
@@ -76,32 +145,201 @@ class MainAgent:
         except Exception as e:
             logging.error(f"Error deleting file {file_path}: {e}")
 
+    def analyze_image_stream(self, image_path):
+        logging.info(f"Streaming analysis of image: {image_path}")
+        return self.image_agent.analyze_images_stream([image_path])
+
+    def write_2d_prompt(self, narrative):
+        """Writes a narrative to the 2D prompt file and returns its path."""
+        prompt_folder = "data/prompts/"
+        if not os.path.exists(prompt_folder):
+            os.makedirs(prompt_folder)
+
+        prompt_path = os.path.join(prompt_folder, "2D_Prompt.txt")
+        with open(prompt_path, "w") as prompt_file:
+            prompt_file.write("=== 2D Prompt for Visualization ===\n")
+            prompt_file.write(f"Reconstructed Narrative:\n{narrative}\n")
+
+        logging.info(f"2D Prompt generated at: {prompt_path}")
+        return prompt_path
+
     def generate_2d_prompt(self, findings, evidence_data):
         """Generates a narrative-based 2D prompt for visualization."""
         try:
             narrative = self.narrative_agent.generate_narrative(findings, evidence_data)
-            prompt_folder = "data/prompts/"
-            if not os.path.exists(prompt_folder):
-                os.makedirs(prompt_folder)
-
-            prompt_path = os.path.join(prompt_folder, "2D_Prompt.txt")
-            with open(prompt_path, "w") as prompt_file:
-                prompt_file.write("=== 2D Prompt for Visualization ===\n")
-                prompt_file.write(f"Reconstructed Narrative:\n{narrative}\n")
-
-            logging.info(f"2D Prompt generated at: {prompt_path}")
+            self.write_2d_prompt(narrative)
             return narrative
         except Exception as e:
             logging.error(f"Error generating 2D prompt: {e}")
             raise
 
+    def generate_2d_prompt_stream(self, findings, evidence_data):
+        """Streams the narrative fragments; the 2D prompt file is written once the narrative is complete."""
+        parts = []
+        for fragment in self.narrative_agent.generate_narrative_stream(findings, evidence_data):
+            parts.append(fragment)
+            yield fragment
+        self.write_2d_prompt("".join(parts))
+
     def simulate_video(self, narrative):
+        """Starts the video simulation; returns a future of the video path (None if it failed)."""
         logging.info("Simulating video from narrative...")
-        return self.luma_agent.generate_video(prompt=narrative)
+        return self.luma_agent.generate_video_async(prompt=narrative)
 
 
 main_agent = MainAgent()
 
+# Services used by the routes. They are created by setup_services(), not on import: spawned report
+# workers re-import the script that started them, and must not set up logging, queues or scan the index.
+job_queue = None
+evidence_index = None
+plaintext_cache = None
+_setup_lock = threading.Lock()
+
+def setup_services():
+    """Sets up logging and the services used by the routes, once."""
+    global job_queue, evidence_index, plaintext_cache
+    if job_queue is not None:
+        return
+    with _setup_lock:
+        if job_queue is not None:
+            return
+        setup_logging()
+
+        # Persistent index of every artifact, so routes do not rescan the data directories
+        evidence_index = EvidenceIndex(db_path=load_config().get("index", {}).get("db_path", "data/evidence/index.db"))
+
+        # Record files that were added while the app was not running
+        evidence_index.sync_directory(INPUT, get_absolute_path("data/input"), ('.jpg', '.png', '.jpeg'))
+        evidence_index.sync_directory(ENCRYPTED, get_absolute_path("data/evidence/encrypted"), ('.enc',))
+        evidence_index.sync_directory(VIDEO, get_absolute_path("data/simulations"), ('.mp4',))
+
+        # In-memory cache of decrypted evidence served by /evidence
+        evidence_cache_config = load_config().get("evidence_cache", {})
+        plaintext_cache = PlaintextCache(
+            max_bytes=evidence_cache_config.get("max_bytes", 256 * 1024 * 1024),
+            max_item_bytes=evidence_cache_config.get("max_item_bytes", 32 * 1024 * 1024)
+        )
+
+        # Background worker pool for the analyze -> summarize -> simulate pipeline stages
+        jobs_config = load_config().get("jobs", {})
+        job_queue = JobQueue(
+            max_workers=jobs_config.get("max_workers", 4),
+            retention_seconds=jobs_config.get("retention_seconds", 3600)
+        )
+
+def create_app():
+    """Application factory: sets up the services and returns the Flask app."""
+    setup_services()
+    return app
+
+# Servers that import `app` directly (flask run, WSGI servers) get the services on the first request
+app.before_request(setup_services)
+
+# Background jobs
+
+def run_analysis_job(file_path):
+    """Analyzes an uploaded image in a worker thread."""
+    findings, evidence_data = main_agent.analyze_image(file_path)
+    if findings is None:
+        raise RuntimeError(f"Image analysis failed for {file_path}")
+    return {"findings": findings, "evidence_data": evidence_data}
+
+def run_video_job(narrative, source=None):
+    """
+    Starts a video simulation from a narrative. The job finishes from the generation's completion,
+    so pending generations do not hold job workers.
+    """
+    def finish(video_path):
+        if not video_path:
+            raise RuntimeError("Failed to generate video simulation. Please check your inputs or try again later.")
+        record_artifact(VIDEO, video_path, parent=source)
+        return {"narrative": narrative, "video_url": f"/simulations/{os.path.basename(video_path)}"}
+
+    return chain(main_agent.simulate_video(narrative), finish)
+
+def run_simulation_job(file_path):
+    """Runs analysis, narrative generation and video simulation for an image in a worker thread."""
+    analysis = run_analysis_job(file_path)
+    narrative = main_agent.generate_2d_prompt(analysis["findings"], analysis["evidence_data"])
+    if not narrative:
+        raise RuntimeError("Failed to generate narrative for simulation.")
+    record_artifact(NARRATIVE, "data/prompts/2D_Prompt.txt", parent=file_path)
+    return run_video_job(narrative, source=file_path)
+
+def run_summary_job(file_path):
+    """
+    Analyzes an image and renders its report, chart and PDF in the report workers. Once rendered, the
+    outputs are encrypted in a job worker; no worker waits for the render itself.
+    """
+    analysis = run_analysis_job(file_path)
+
+    def finish(summary):
+        if not summary:
+            raise RuntimeError("Failed to generate the report.")
+        report_path = summary["report"]
+        graph_path = summary["graphs"]
+        pdf_path = summary.get("pdf")
+        outputs = [(REPORT, report_path), (GRAPH, graph_path), (REPORT, pdf_path)]
+        outputs = [(kind, path) for kind, path in outputs if path]
+        for kind, output_path in outputs:
+            record_artifact(kind, output_path, parent=file_path)
+
+        # Encrypt the report, graph and PDF
+        encryption_agent = main_agent.encryption_agent
+        for _, output_path in outputs:
+            encrypted_output_path = encryption_agent.encrypt_file(output_path)
+            if not encrypted_output_path:
+                raise RuntimeError(f"Failed to encrypt the report: {output_path}")
+            record_artifact(ENCRYPTED, encrypted_output_path, parent=output_path)
+
+        # Delete the original report after encryption
+        try:
+            for _, output_path in outputs:
+                os.remove(output_path)
+                evidence_index.mark_deleted(output_path)
+            logging.info(f"Deleted original report: {report_path}")
+        except Exception as e:
+            logging.error(f"Failed to delete the original report: {report_path}. Error: {e}")
+
+        # The report and graph are served straight from the encrypted files, without writing plaintext to disk
+        return {
+            "report": f"/evidence/{os.path.basename(report_path)}" if report_path else None,
+            "pdf": f"/evidence/{os.path.basename(pdf_path)}" if pdf_path else None,
+            "graphs": [f"/evidence/{os.path.basename(graph_path)}"] if graph_path else []
+        }
+
+    # Outputs are namespaced by the image's case ID
+    summary = main_agent.summarize_findings(analysis["findings"], analysis["evidence_data"],
+                                            case_id=hash_file(file_path)[:16])
+    return chain(summary, finish, executor=job_queue.executor)
+
+def encrypt_evidence(file_path):
+    """Encrypts an analyzed evidence file and records it; returns the encrypted path or None."""
+    encrypted_file_path = main_agent.encryption_agent.encrypt_file(file_path)
+    if not encrypted_file_path:
+        logging.error(f"Failed to encrypt evidence file: {file_path}")
+        return None
+
+    record_artifact(ENCRYPTED, encrypted_file_path, parent=file_path)
+    logging.info(f"Evidence file encrypted and saved: {encrypted_file_path}")
+    return encrypted_file_path
+
+def streaming_enabled():
+    return load_config().get("streaming", {}).get("enabled", False)
+
+def sse_event(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Streams server-sent events without buffering in Flask or a fronting proxy."""
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Flask routes
 
 @app.route('/')
@@ -115,19 +353,50 @@ def upload_file():
     file = request.files.get('file')
     if not file:
         return "No file uploaded", 400
-    file_path = os.path.join("data/input/", file.filename)
+    # Resolved like sync_directory and the lookups, so the file is indexed under one path whatever the cwd
+    file_path = os.path.join(get_absolute_path("data/input"), file.filename)
     file.save(file_path)
+    record_artifact(INPUT, file_path, sha256=hash_file(file_path))
+
+    # Queue the analysis in the background; the result is cached for the menu sections
+    job_id = job_queue.submit("analysis", run_analysis_job, file_path, key=("analysis", file_path))
 
-    # Trigger analysis (this happens in the backend; user doesn't see it immediately)
-    main_agent.analyze_image(file_path)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job_id}), 202
 
     # Redirect to the navigation menu
-    return redirect(url_for('menu'))
+    return redirect(url_for('menu', job_id=job_id))
 
 @app.route('/menu')
 def menu():
     """Display the navigation menu."""
-    return render_template('navigation.html')
+    return render_template('navigation.html', job_id=request.args.get('job_id'))
+
+@app.route('/jobs/<string:job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the status of a background job."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    job.pop("result")
+    return jsonify(job)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose latency, throughput, token, cache and retry metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/jobs/<string:job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Return the result of a background job once it has finished."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] == FAILED:
+        return jsonify({"status": job["status"], "error": job["error"]}), 500
+    if job["status"] != COMPLETED:
+        return jsonify({"status": job["status"]}), 202
+    return jsonify({"status": job["status"], "result": job["result"]})
 
 @app.route('/analyze-image')
 def analyze_image():
@@ -186,26 +455,15 @@ def simulate_video():
     if not narrative:
         return "No narrative provided", 400
 
-    video_path = main_agent.simulate_video(narrative)
-
-    return render_template(
-        'video_simulation.html',
-        video_path=video_path
-    )
+    job_id = job_queue.submit("simulation", run_video_job, narrative, key=("video", narrative))
+    return jsonify({"job_id": job_id}), 202
 
 @app.route('/evidenceCollected', methods=['GET'])
 def evidence_collected():
     """Evidence Collection Route"""
-    decrypted_evidence = []
-    evidence_dir = "data/evidence/encrypted/"
-    for filename in os.listdir(evidence_dir):
-        if filename.endswith('.enc'):
-            decrypted_file = main_agent.decrypt_file(os.path.join(evidence_dir, filename))
-            decrypted_evidence.append(decrypted_file)
-
     return render_template(
         'evidence_collected.html',
-        evidence=decrypted_evidence
+        evidence=list_encrypted_evidence()
     )
 
 @app.route('/encrypt-reports', methods=['POST'])
@@ -215,15 +473,19 @@ def encrypt_reports():
         report_dir = "data/reports/"
         encryption_agent = main_agent.encryption_agent
 
-        # Encrypt each file in the reports directory
-        encrypted_files = []
-        for file_name in os.listdir(report_dir):
-            file_path = os.path.join(report_dir, file_name)
-            if os.path.isfile(file_path):  # Ensure it's a file
-                encrypted_file_path = encryption_agent.encrypt_file(file_path)
-                encrypted_files.append(encrypted_file_path)
-
-        return jsonify({"encrypted_files": encrypted_files})
+        # Encrypt every file in the reports directory in parallel
+        file_paths = [
+            os.path.join(report_dir, file_name)
+            for file_name in os.listdir(report_dir)
+            if os.path.isfile(os.path.join(report_dir, file_name))  # Ensure it's a file
+        ]
+        manifest = encryption_agent.encrypt_files(file_paths)
+        encrypted_files = [entry["encrypted"] for entry in manifest if entry["status"] == "encrypted"]
+        for entry in manifest:
+            if entry["status"] == "encrypted":
+                record_artifact(ENCRYPTED, entry["encrypted"], parent=entry["source"])
+
+        return jsonify({"encrypted_files": encrypted_files, "manifest": manifest})
     
     except Exception as e:
         logging.error(f"Error encrypting reports: {e}")
@@ -237,11 +499,14 @@ def load_section(section):
     try:
         if section == "analyze-image":
             # Dynamically fetch evidence file for analysis
-            input_dir = get_absolute_path("data/input/")
-            file_path = next((os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(('.jpg', '.png'))), None)
+            file_path = latest_input_image()
             if not file_path:
                 return jsonify({"error": "No image file found for analysis."}), 404
 
+            # Render right away and stream the analysis into the page as it is generated
+            if streaming_enabled():
+                return render_template('image_analysis.html', stream_url=url_for('stream_analysis'))
+
             # Analyze the image
             analysis_results = main_agent.analyze_image(file_path)
             if isinstance(analysis_results, tuple):
@@ -251,144 +516,61 @@ def load_section(section):
                 evidence_data = analysis_results.get('evidence_data', [])
 
             # Encrypt the evidence file after analysis
-            encryption_agent = main_agent.encryption_agent
-            encrypted_file_path = encryption_agent.encrypt_file(file_path)
-            if not encrypted_file_path:
-                logging.error(f"Failed to encrypt evidence file: {file_path}")
+            if not encrypt_evidence(file_path):
                 return jsonify({"error": "Failed to encrypt evidence file."}), 500
 
-            logging.info(f"Evidence file encrypted and saved: {encrypted_file_path}")
-
             # Render analysis results
             return render_template('image_analysis.html', findings=findings, evidence_data=evidence_data)
 
         elif section == "summarize":
 
             # Dynamically fetch input file for simulation
-            input_dir = get_absolute_path("data/input/")
-            file_path = next((os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(('.jpg', '.png'))), None)
+            file_path = latest_input_image()
             if not file_path:
                 return jsonify({"error": "No image file found for simulation."}), 404
 
-            # Analyze the image
-            analysis_results = main_agent.analyze_image(file_path)
-            if isinstance(analysis_results, tuple):
-                findings, evidence_data = analysis_results
-            else:
-                findings = analysis_results.get('findings', {})
-                evidence_data = analysis_results.get('evidence_data', [])
-
-            # Summarize the findings and generate a report
-            report_path = main_agent.summarize_findings(findings, evidence_data)["report"]
-            graph_path = main_agent.summarize_findings(findings, evidence_data)["graphs"]
-
-            # Encrypt the report
-            encryption_agent = main_agent.encryption_agent
-            encrypted_report_path = encryption_agent.encrypt_file(report_path)
-            encrypted_graph_path = encryption_agent.encrypt_file(graph_path)
-
-            if not encrypted_report_path:
-                logging.error(f"Failed to encrypt the report: {report_path}")
-                return jsonify({"error": "Failed to encrypt the report."}), 500
-
-            # Delete the original report after encryption
-            try:
-                os.remove(report_path)
-                os.remove(graph_path)
-                logging.info(f"Deleted original report: {report_path}")
-            except Exception as e:
-                logging.error(f"Failed to delete the original report: {report_path}. Error: {e}")
-
-
-            encrypted_report_path = get_absolute_path("data/evidence/encrypted/crime_scene_report.txt.enc")
-            encrypted_graph_path = get_absolute_path("data/evidence/encrypted/evidence_distribution.png.enc")
-
-            # Decrypt files using the Encryption Agent
-            encryption_agent = main_agent.encryption_agent
-            report_path = encryption_agent.decrypt_file(encrypted_report_path)
-            graph_path = encryption_agent.decrypt_file(encrypted_graph_path)
-
-            if not report_path or not graph_path:
-                logging.error("Decryption failed for report or graph.")
-                return jsonify({"error": "Failed to decrypt the report or graph."}), 500
-
-            # Generate accessible URLs for the frontend
-            report_url = f"/decrypted/{os.path.basename(report_path)}"
-            graph_url = f"/decrypted/{os.path.basename(graph_path)}"
-
-            logging.info(f"Report URL: {report_url}")
-            logging.info(f"Graph URL: {graph_url}")
+            # Analyze, summarize and encrypt in the background; the page polls for the report links
+            job_id = job_queue.submit("summary", run_summary_job, file_path, key=("summary", file_path))
 
             # Render the Analysis Report page
-            return render_template(
-                'analysed_report.html',
-                report=report_url,
-                graphs=[graph_url]
-            )
+            return render_template('analysed_report.html', job_id=job_id)
 
         elif section == "simulate-video":
             # Clean decrypted directory before processing
             clean_decrypted_directory()
 
             # Dynamically fetch input file for simulation
-            input_dir = get_absolute_path("data/input/")
-            file_path = next((os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(('.jpg', '.png'))), None)
+            file_path = latest_input_image()
             if not file_path:
                 return jsonify({"error": "No image file found for simulation."}), 404
 
-            # Perform analysis
-            analysis_results = main_agent.analyze_image(file_path)
-            if isinstance(analysis_results, tuple):
-                findings, evidence_data = analysis_results
-            else:
-                findings = analysis_results.get('findings', {})
-                evidence_data = analysis_results.get('evidence_data', [])
-
-            # Generate narrative
-            narrative = main_agent.generate_2d_prompt(findings, evidence_data)
-            if not narrative:
-                error_message = "Failed to generate narrative for simulation."
-                return render_template('video_simulation.html', error=error_message)
-
-            # Simulate video
-            video_path = main_agent.simulate_video(narrative)
-            if not video_path:
-                error_message = "Failed to generate video simulation. Please check your inputs or try again later."
-                return render_template('video_simulation.html', error=error_message)
-            # Generate accessible URL for the video stored in `data/simulations`
-            video_url = f"/simulations/{os.path.basename(video_path)}"
+            # Stream the narrative into the page; the stream then queues the video job
+            if streaming_enabled():
+                return render_template('video_simulation.html', stream_url=url_for('stream_narrative'))
 
-            # Render the video simulation template
-            return render_template('video_simulation.html', video_path=video_url)
+            # Run analysis, narrative and simulation in the background; the page polls for the result
+            job_id = job_queue.submit(
+                "simulation", run_simulation_job, file_path, key=("simulation", file_path)
+            )
+            return render_template('video_simulation.html', job_id=job_id)
 
 
         elif section == "evidence-collected":
-            # Decrypt and display evidence
-            evidence_dir = get_absolute_path("data/evidence/encrypted/")
-            decrypted_evidence = []
-
-            for filename in os.listdir(evidence_dir):
-                if filename.endswith('.enc'):
-                    decrypted_file = main_agent.decrypt_file(os.path.join(evidence_dir, filename))
-                    if decrypted_file:
-                        # Generate accessible URL for the decrypted file
-                        evidence_url = f"/decrypted/{os.path.basename(decrypted_file)}"
-                        decrypted_evidence.append(evidence_url)
-
-            if not decrypted_evidence:
-                logging.error("No evidence files found after decryption.")
+            # List evidence metadata only; items are decrypted on demand through /evidence
+            evidence = list_encrypted_evidence()
+
+            if not evidence:
+                logging.error("No encrypted evidence files found.")
                 return jsonify({"error": "No decrypted evidence available."}), 404
 
             # Render the Evidence Collected page
-            return render_template('evidence_collected.html', evidence=decrypted_evidence)
+            return render_template('evidence_collected.html', evidence=evidence)
         
         elif section == "previous-generations":
-            # Fetch all video files from the simulations directory
-            simulations_dir = get_absolute_path("data/simulations/")
+            # Fetch all recorded video simulations from the evidence index
             video_files = [
-                f"/simulations/{filename}"
-                for filename in os.listdir(simulations_dir)
-                if filename.endswith('.mp4')
+                f"/simulations/{os.path.basename(artifact['path'])}"
+                for artifact in evidence_index.list(VIDEO)
             ]
 
             if not video_files:
@@ -406,6 +588,65 @@ def load_section(section):
         logging.error(f"Error loading section {section}: {e}")
         return jsonify({"error": str(e)}), 500
     
+# Streaming endpoints (server-sent events)
+
+@app.route('/stream/analysis', methods=['GET'])
+def stream_analysis():
+    """Streams the analysis of the latest input image: delta events, then a result (or error) event."""
+    file_path = latest_input_image()
+    if not file_path:
+        return jsonify({"error": "No image file found for analysis."}), 404
+
+    def events():
+        try:
+            for kind, payload in main_agent.analyze_image_stream(file_path):
+                if kind == "delta":
+                    yield sse_event("delta", {"text": payload})
+                    continue
+                findings, evidence_data = payload
+                if findings is None:
+                    yield sse_event("error", {"error": "Image analysis failed."})
+                    return
+                yield sse_event("result", {"findings": findings, "evidence_data": evidence_data})
+
+            # Encrypt the evidence file after analysis
+            if not encrypt_evidence(file_path):
+                yield sse_event("error", {"error": "Failed to encrypt evidence file."})
+        except Exception as e:
+            logging.error(f"Error streaming analysis for {file_path}: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+    return sse_response(events())
+
+@app.route('/stream/narrative', methods=['GET'])
+def stream_narrative():
+    """Streams the narrative for the latest input image, then queues its video simulation (job event)."""
+    file_path = latest_input_image()
+    if not file_path:
+        return jsonify({"error": "No image file found for simulation."}), 404
+
+    def events():
+        try:
+            analysis = run_analysis_job(file_path)
+            parts = []
+            for fragment in main_agent.generate_2d_prompt_stream(analysis["findings"], analysis["evidence_data"]):
+                parts.append(fragment)
+                yield sse_event("delta", {"text": fragment})
+
+            narrative = "".join(parts)
+            if not narrative:
+                yield sse_event("error", {"error": "Failed to generate narrative for simulation."})
+                return
+            record_artifact(NARRATIVE, "data/prompts/2D_Prompt.txt", parent=file_path)
+
+            job_id = job_queue.submit("video", run_video_job, narrative, source=file_path, key=("video", file_path))
+            yield sse_event("job", {"job_id": job_id})
+        except Exception as e:
+            logging.error(f"Error streaming narrative for {file_path}: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+    return sse_response(events())
+
 # File Servers
     
 @app.route('/decrypted/<path:filename>')
@@ -420,6 +661,47 @@ def serve_simulation_file(filename):
     simulations_dir = get_absolute_path("data/simulations")
     return send_from_directory(simulations_dir, filename)
 
+@app.route('/evidence/<path:filename>')
+def serve_encrypted_evidence(filename):
+    """Stream decrypted bytes of an encrypted evidence file, honoring HTTP Range requests."""
+    encrypted_path = safe_join(get_absolute_path("data/evidence/encrypted"), filename + ".enc")
+    if not encrypted_path or not os.path.isfile(encrypted_path):
+        abort(404)
+
+    encryption_agent = main_agent.encryption_agent
+    stat = os.stat(encrypted_path)
+    cache_key = (encrypted_path, stat.st_mtime_ns, stat.st_size)
+    data = plaintext_cache.get(cache_key)
+    if data is None and not encryption_agent.is_chunked(encrypted_path):
+        # Legacy Fernet files can only be decrypted whole: decrypt once for both the size and the body
+        data = b"".join(encryption_agent.iter_decrypted_range(encrypted_path))
+        if plaintext_cache.accepts(len(data)):
+            plaintext_cache.put(cache_key, data)
+    size = len(data) if data is not None else encryption_agent.plaintext_size(encrypted_path)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {"Accept-Ranges": "bytes"}
+
+    start, stop, status = 0, size, 200
+    if request.range:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, stop = byte_range
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+
+    headers["Content-Length"] = str(stop - start)
+    if data is None and plaintext_cache.accepts(size):
+        # Small items are decrypted once and then served from memory
+        data = b"".join(encryption_agent.iter_decrypted_range(encrypted_path))
+        plaintext_cache.put(cache_key, data)
+    if data is not None:
+        body = [data[start:stop]]
+    else:
+        body = encryption_agent.iter_decrypted_range(encrypted_path, start, stop)
+    return Response(body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True)
+
 @app.route('/clear-encrypted-data', methods=['POST', 'GET'])
 def clear_all_data():
     """Clear all encrypted, input, and decrypted data and redirect to the main page."""
@@ -427,7 +709,8 @@ def clear_all_data():
     directories_to_clear = [
         get_absolute_path("data/evidence/encrypted"),  # Encrypted files
         get_absolute_path("data/evidence/decrypted"),  # Decrypted files
-        get_absolute_path("data/input")               # Input files
+        get_absolute_path("data/input"),              # Input files
+        get_absolute_path("data/cache/images")        # Preprocessed copies of inputs left by older versions
     ]
 
     try:
@@ -438,6 +721,11 @@ def clear_all_data():
                     if os.path.isfile(file_path):
                         os.remove(file_path)
                 logging.info(f"Cleared all files in directory: {directory}")
+        plaintext_cache.clear()
+        if "image_agent" in main_agent.__dict__ and main_agent.image_agent.preprocessor is not None:
+            main_agent.image_agent.preprocessor.cache.clear()
+        evidence_index.mark_kind_deleted(INPUT)
+        evidence_index.mark_kind_deleted(ENCRYPTED)
     except Exception as e:
         logging.error(f"Error clearing data: {e}")
         return jsonify({"error": "Failed to clear all data"}), 500
@@ -448,4 +736,4 @@ def clear_all_data():
 
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0')
+    create_app().run(debug=True, host='0.0.0.0')
@@ -0,0 +1,72 @@
+"""
+Measures what image preprocessing saves on vision uploads: base64 payload bytes of the original
+files against the downscaled, re-encoded payloads, the cost of deriving them (cold) and of reading
+them back from the cache (warm), and the upload time this implies at a given bandwidth.
+
+Usage (from the repository root):
+    python benchmarks/image_preprocessing.py --mbps 20 --format JPEG
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_preprocessor import ImagePreprocessor
+
+
+def make_images(directory, seed=7):
+    """Writes a large camera-style JPEG and a screenshot-style PNG with photographic noise."""
+    rng = np.random.default_rng(seed)
+    images = []
+    for name, (width, height) in (("camera.jpg", (6000, 4000)), ("capture.png", (2560, 1600))):
+        gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+        pixels = gradient + rng.normal(0, 24, (height, width, 3)).astype(np.float32)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+        path = os.path.join(directory, name)
+        image.save(path, quality=92) if name.endswith(".jpg") else image.save(path)
+        images.append(path)
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing before vision upload.")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Upload bandwidth in megabits per second.")
+    parser.add_argument("--format", default="JPEG", help="Output format: JPEG or WEBP.")
+    parser.add_argument("--quality", type=int, default=85, help="Encoder quality.")
+    args = parser.parse_args()
+
+    def upload_seconds(size):
+        return size * 8 / (args.mbps * 1_000_000)
+
+    with tempfile.TemporaryDirectory() as image_dir:
+        preprocessor = ImagePreprocessor(format=args.format, quality=args.quality)
+        for path in make_images(image_dir):
+            with open(path, "rb") as image_file:
+                raw = len(base64.b64encode(image_file.read()))
+
+            start = time.perf_counter()
+            mime_type, payload = preprocessor.prepare(path)
+            cold = time.perf_counter() - start
+
+            start = time.perf_counter()
+            preprocessor.prepare(path)
+            warm = time.perf_counter() - start
+
+            prepared = len(base64.b64encode(payload))
+            with Image.open(path) as image:
+                size = image.size
+            print(f"{os.path.basename(path)} {size[0]}x{size[1]} -> {mime_type}: "
+                  f"{raw / 1e6:.2f} MB -> {prepared / 1e6:.2f} MB base64 ({raw / prepared:.1f}x smaller)")
+            print(f"  prepare cold {cold * 1000:.0f} ms, warm {warm * 1000:.1f} ms; "
+                  f"upload at {args.mbps:g} Mbit/s {upload_seconds(raw):.2f} s -> {upload_seconds(prepared):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures case report throughput: a single in-process SummarizerAgent against the ReportService
+process pool, rendering text, chart and PDF outputs for hundreds of synthetic cases.
+
+Usage (from the repository root):
+    python benchmarks/report_throughput.py --cases 200 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.summarizer_agent import SummarizerAgent
+from utils.report_service import ReportService
+
+EVIDENCE_TYPES = ["Bloodstain", "Footprint", "Weapon", "Fingerprint", "Fiber", "Glass", "Casing"]
+LOCATIONS = ["floor", "north wall", "doorway", "kitchen counter", "window sill", "stairs"]
+
+
+def make_cases(count, seed=7):
+    rng = random.Random(seed)
+    cases = []
+    for index in range(count):
+        findings = {
+            "Scene Description": f"Synthetic scene {index} with an overturned chair.",
+            "Key Observations": "Broken glass near the entrance; partial shoe print.",
+            "Environmental Conditions": "Night, artificial lighting."
+        }
+        evidence = [
+            {"type": rng.choice(EVIDENCE_TYPES), "location": rng.choice(LOCATIONS)}
+            for _ in range(rng.randint(3, 25))
+        ]
+        cases.append((f"case{index:05d}", findings, evidence))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark case report rendering throughput.")
+    parser.add_argument("--cases", type=int, default=200, help="Number of synthetic cases.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Render processes.")
+    parser.add_argument("--formats", default="txt,png,pdf", help="Comma-separated outputs to render.")
+    args = parser.parse_args()
+
+    formats = tuple(args.formats.split(","))
+    cases = make_cases(args.cases)
+
+    with tempfile.TemporaryDirectory() as serial_dir, tempfile.TemporaryDirectory() as pool_dir:
+        agent = SummarizerAgent(report_dir=serial_dir, formats=formats)
+        start = time.perf_counter()
+        for case_id, findings, evidence in cases:
+            agent.summarize(findings, evidence, case_id=case_id)
+        serial = time.perf_counter() - start
+
+        service = ReportService(report_dir=pool_dir, formats=formats, max_workers=args.workers)
+        start = time.perf_counter()
+        service.render_batch(cases[:args.workers])  # Start the workers (spawn + matplotlib import)
+        warmup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = service.render_batch(cases)
+        pooled = time.perf_counter() - start
+        service.shutdown()
+
+        failed = sum(1 for result in results.values() if not result)
+        outputs = len(os.listdir(pool_dir))
+
+    print(f"{args.cases} cases, formats {', '.join(formats)}")
+    print(f"in-process summarizer: {serial:.2f} s ({args.cases / serial:.1f} cases/s)")
+    print(f"report service, {args.workers} workers: {pooled:.2f} s ({args.cases / pooled:.1f} cases/s), "
+          f"worker start-up {warmup:.2f} s, {failed} failed, {outputs} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares the legacy greedy-regex response parsing with utils.response_parser on clean, wrapped,
+large and malformed vision responses. The legacy parser does no schema validation, so on large valid
+objects it is expected to be somewhat faster; the malformed cases show what it cannot recover.
+
+Usage (from the repository root):
+    python benchmarks/response_parsing.py --number 200
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.response_parser import ANALYSIS_SCHEMA, compile_schema, parse_json_object
+
+validate_analysis = compile_schema(ANALYSIS_SCHEMA)
+
+
+def legacy_parse(text):
+    """The parsing previously done by ImageContentAnalysisAgent._process_response."""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("No valid JSON found in the response content.")
+    return json.loads(match.group(0))
+
+
+def analysis(evidence_count):
+    return json.dumps({
+        "scene_description": "A dimly lit kitchen with an overturned chair {near the door}.",
+        "key_observations": "Broken glass, a partial shoe print and a knife on the counter.",
+        "environmental_conditions": "Night, artificial lighting, dry floor.",
+        "evidence": [
+            {"type": f"Item {index}", "location": f"Grid cell {index % 40}, \"north\" wall"}
+            for index in range(evidence_count)
+        ],
+    })
+
+
+def responses():
+    small = analysis(5)
+    large = analysis(20000)
+    prose = "Here is the analysis of the scene. Note the brace } in this sentence. " * 2000
+    return {
+        "json mode (bare object)": small,
+        "wrapped in prose and code fence": f"Sure! Here it is:\n```json\n{small}\n```\nLet me know {{if needed.",
+        "large (~1.3 MB object)": large,
+        "large prose + object": f"{prose}\n{small}\n{prose}",
+        "malformed: stray brace before object": "Observed marks like { on the wall.\n" + small,
+        "malformed: truncated object": small[:-40],
+    }
+
+
+def measure(func, text, number):
+    try:
+        func(text)
+        outcome = "ok"
+    except ValueError as e:
+        outcome = f"error: {type(e).__name__}"
+    seconds = timeit.timeit(lambda: _swallow(func, text), number=number) / number
+    return seconds, outcome
+
+
+def _swallow(func, text):
+    try:
+        func(text)
+    except ValueError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vision response parsing.")
+    parser.add_argument("--number", type=int, default=100, help="Iterations per case.")
+    args = parser.parse_args()
+
+    parsers = {
+        "legacy regex": legacy_parse,
+        "response_parser": lambda text: parse_json_object(text, validate_analysis),
+    }
+    print(f"{'case':40} {'parser':16} {'time/call':>12}  outcome")
+    for case, text in responses().items():
+        for name, func in parsers.items():
+            seconds, outcome = measure(func, text, args.number)
+            print(f"{case:40} {name:16} {seconds * 1e6:10.1f}us  {outcome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measures cold-start cost of the web app: how long a fresh interpreter takes to import app.py,
+and which heavy modules that import pulls in.
+
+Usage (from the repository root):
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be loaded once a request actually needs them
+HEAVY_MODULES = ["openai", "lumaai", "matplotlib", "crewai", "cryptography.fernet", "httpx"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed)
+print(",".join(loaded))
+app.job_queue.shutdown()
+"""
+
+
+def run_once():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed, loaded = result.stdout.splitlines()[-2:]
+    return float(elapsed), [name for name in loaded.split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app.py import time in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time.")
+    args = parser.parse_args()
+
+    timings = []
+    loaded = []
+    for _ in range(args.runs):
+        elapsed, loaded = run_once()
+        timings.append(elapsed)
+
+    print(f"import app: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms over {args.runs} runs")
+    print(f"heavy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
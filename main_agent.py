@@ -1,37 +1,104 @@
+import argparse
+import json
 import logging
 import os
-from crewai import Agent, Task
-from agents.image_analysis_agent import ImageContentAnalysisAgent
-from agents.summarizer_agent import SummarizerAgent
-from agents.encryption_agent import EncryptionAgent
-from agents.narrative_generation_agent import NarrativeGenerationAgent
-from agents.luma_simulation_agent import LumaSimulationAgent
-
-# Set up logging to both console and file
-log_directory = "logs/"
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
-
-log_file = os.path.join(log_directory, "pipeline_logs.log")
-
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.FileHandler(log_file),  # Log to a file
-                        logging.StreamHandler()         # Also log to console
-                    ])
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.config_loader import load_config
+from utils.futures import chain
+from utils.evidence_index import EvidenceIndex, INPUT, ENCRYPTED, REPORT, GRAPH, NARRATIVE, VIDEO
+from utils.lazy import lazy_property
+from utils.metrics import REGISTRY, diff, run_summary
+from utils.result_cache import ResultCache, hash_file, make_key
+from utils.stage_graph import StageGraph
+
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg')
+
+def setup_logging():
+    """Logs to both console and file; called by the entry points, never on import (spawned workers re-import this module)."""
+    log_directory = "logs/"
+    if not os.path.exists(log_directory):
+        os.makedirs(log_directory)
+
+    log_file = os.path.join(log_directory, "pipeline_logs.log")
+
+    logging.basicConfig(level=logging.INFO, 
+                        format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[
+                            logging.FileHandler(log_file),  # Log to a file
+                            logging.StreamHandler()         # Also log to console
+                        ])
 
 class MainAgent:
     def __init__(self):
-        # Initialize agents
-        self.image_agent = ImageContentAnalysisAgent()
-        self.summarizer = SummarizerAgent()
-        self.encryption_agent = EncryptionAgent()
-        self.narrative_agent = NarrativeGenerationAgent()
-        self.luma_agent = LumaSimulationAgent()
-
-        # Setup CrewAI agents for orchestration
-        self.agent = Agent(
+        self.pipeline_config = load_config().get("pipeline", {})
+        self.evidence_index = EvidenceIndex(
+            db_path=load_config().get("index", {}).get("db_path", "data/evidence/index.db")
+        )
+
+    # Agents are created on first use, so a run only pays for the stages it reaches
+
+    @lazy_property
+    def image_agent(self):
+        from agents.image_analysis_agent import ImageContentAnalysisAgent
+        return ImageContentAnalysisAgent()
+
+    @lazy_property
+    def report_service(self):
+        from utils.report_service import ReportService
+        reports_config = load_config().get("reports", {})
+        return ReportService(
+            report_dir=reports_config.get("dir", "data/reports/"),
+            formats=reports_config.get("formats", ("txt", "png", "pdf")),
+            max_workers=reports_config.get("workers")
+        )
+
+    @lazy_property
+    def report_pool(self):
+        # Threads recording and encrypting rendered reports, off the report service's result thread
+        return ThreadPoolExecutor(
+            max_workers=self.pipeline_config.get("max_concurrency", 4), thread_name_prefix="report-encryption"
+        )
+
+    @lazy_property
+    def duplicate_detector(self):
+        duplicates_config = dict(self.pipeline_config.get("near_duplicates", {}))
+        if not duplicates_config.pop("enabled", False):
+            return None
+        from utils.perceptual_hash import DuplicateDetector
+        detector = DuplicateDetector(**duplicates_config)
+        # New images are also matched against the representatives of the cases processed earlier
+        try:
+            for fingerprint, artifact_id in self.evidence_index.processed_fingerprints():
+                value = detector.decode(fingerprint)
+                if value is not None:
+                    detector.remember(value, artifact_id)
+        except Exception as e:
+            logging.error(f"Error loading the fingerprints of processed images: {e}")
+        return detector
+
+    @lazy_property
+    def encryption_agent(self):
+        from agents.encryption_agent import EncryptionAgent
+        return EncryptionAgent()
+
+    @lazy_property
+    def narrative_agent(self):
+        from agents.narrative_generation_agent import NarrativeGenerationAgent
+        return NarrativeGenerationAgent()
+
+    @lazy_property
+    def luma_agent(self):
+        from agents.luma_simulation_agent import LumaSimulationAgent
+        return LumaSimulationAgent()
+
+    @lazy_property
+    def agent(self):
+        """CrewAI agent describing the orchestrator; crewai is only imported if it is asked for."""
+        from crewai import Agent
+        return Agent(
             name="MainAgent",  # Name of the agent
             role="Orchestrator",  # Role of the agent
             goal="Process images, summarize findings, and encrypt reports.",  # Goal of the agent
@@ -44,11 +111,81 @@ class MainAgent:
         results = self.image_agent.analyze_images([image_path])
         return results
 
-    def summarization_task(self, findings, evidence_data):
-        """Task for summarizing the findings."""
+    def batch_image_analysis_task(self, image_paths, max_workers=None):
+        """
+        Analyzes several images concurrently.
+        :param image_paths: Paths of the images to analyze.
+        :param max_workers: Maximum number of concurrent API calls (defaults to pipeline.max_concurrency).
+        :return: Generator of (image_path, results) tuples in completion order.
+        """
+        max_workers = max_workers or self.pipeline_config.get("max_concurrency", 4)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-analysis") as pool:
+            if self.pipeline_config.get("pack_images", False):
+                # Several images per request; each batch is split back into per-image results
+                futures = {
+                    pool.submit(self.packed_image_analysis_task, batch): batch
+                    for batch in self.image_agent.pack_images(image_paths)
+                }
+            else:
+                futures = {pool.submit(self.image_analysis_task, path): [path] for path in image_paths}
+
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    results = future.result()
+                    if len(batch) == 1 and not isinstance(results, dict):
+                        results = {batch[0]: results}
+                except Exception as e:
+                    logging.error(f"Image analysis failed for {batch}: {e}")
+                    results = {}
+                for image_path in batch:
+                    yield image_path, results.get(image_path, (None, None))
+
+    def packed_image_analysis_task(self, image_paths):
+        """Task for analyzing a batch of images in a single request."""
+        logging.info(f"Processing packed images: {image_paths}")
+        return self.image_agent.analyze_images_packed(image_paths)
+
+    def near_duplicate_task(self, image_paths):
+        """
+        Groups near-duplicate images so each cluster is analyzed and summarized once. Images matching the
+        representative of a case processed earlier (in an earlier batch or run) join that case.
+        :param image_paths: Paths of the images.
+        :return: Tuple (clusters, fingerprints). Clusters map each representative to its members: an image of
+                 the batch comes first among its members, while a case processed earlier is represented by
+                 the artifact ID of its input and has only new members. Fingerprints map images to their
+                 encoded perceptual hash.
+        """
+        if self.duplicate_detector is None:
+            return {image_path: [image_path] for image_path in image_paths}, {}
+
+        # Larger files go first, so the best-quality frame of a cluster represents it
+        image_paths = sorted(image_paths, key=os.path.getsize, reverse=True)
+        values = self.duplicate_detector.fingerprints(image_paths)
+        clusters = self.duplicate_detector.group(image_paths, fingerprints=values)
+        fingerprints = {
+            image_path: self.duplicate_detector.encode(value)
+            for image_path, value in zip(image_paths, values) if value is not None
+        }
+
+        batch = set(image_paths)
+        duplicates = len(image_paths) - sum(1 for representative in clusters if representative in batch)
+        if duplicates:
+            logging.info(f"Found {duplicates} near-duplicate images in {len(clusters)} clusters")
+            for representative, members in clusters.items():
+                if representative not in batch:
+                    logging.info(f"Adding {members} to the case processed earlier from input {representative}")
+                elif len(members) > 1:
+                    logging.info(f"Reusing the analysis of {representative} for {members[1:]}")
+        return clusters, fingerprints
+
+    def summarization_task(self, findings, evidence_data, case_id=None):
+        """
+        Task for summarizing the findings, rendered by the report worker processes.
+        :return: Future resolved with the summarize() result dictionary.
+        """
         logging.info("Summarizing findings...")
-        summarized_results = self.summarizer.summarize(findings, evidence_data)
-        return summarized_results
+        return self.report_service.submit(case_id, findings, evidence_data)
 
     def encryption_task(self, file_path):
         """Task for encrypting the file."""
@@ -62,21 +199,44 @@ class MainAgent:
         
         return encrypted_files
 
+    def bulk_encryption_task(self, file_paths):
+        """Task for encrypting many files in parallel."""
+        logging.info(f"Encrypting {len(file_paths)} files")
+        manifest = self.encryption_agent.encrypt_files(
+            file_paths, max_workers=self.pipeline_config.get("encryption_workers", 4)
+        )
+        logging.info(f"Encryption manifest: {manifest}")
+        return manifest
+
     def decrypt_file(self, encrypted_file_path):
         """Decrypt a file when it needs to be accessed."""
         logging.info(f"Decrypting file: {encrypted_file_path}")
         decrypted_file = self.encryption_agent.decrypt_file(encrypted_file_path)
         return decrypted_file
 
+    def record_artifact(self, kind, path, sha256=None, parent=None, fingerprint=None):
+        """Record an artifact in the evidence index; index errors never stop the pipeline."""
+        try:
+            return self.evidence_index.record(kind, path, sha256=sha256, parent=parent, fingerprint=fingerprint)
+        except Exception as e:
+            logging.error(f"Error recording {kind} artifact {path}: {e}")
+            return None
+
     def delete_file(self, file_path):
         """Delete a file after use."""
         try:
             os.remove(file_path)
+            self.evidence_index.mark_deleted(file_path)
             logging.info(f"File deleted: {file_path}")
         except Exception as e:
             logging.error(f"Error deleting file {file_path}: {e}")
     
-    def generate_2d_prompt(self, findings, evidence_data):
+    def prompt_path(self, case_id=None):
+        """Path of the 2D prompt file of a case (the shared 2D_Prompt.txt without a case ID)."""
+        prefix = f"{case_id}-" if case_id else ""
+        return os.path.join("data/prompts/", f"{prefix}2D_Prompt.txt")
+
+    def generate_2d_prompt(self, findings, evidence_data, case_id=None):
         """Generate a predictive 2D prompt based on findings and summarized results."""
         try:
             # Call the narrative generation agent to generate the story-like prediction
@@ -86,7 +246,7 @@ class MainAgent:
             if not os.path.exists(prompt_folder):
                 os.makedirs(prompt_folder)
 
-            prompt_path = os.path.join(prompt_folder, "2D_Prompt.txt")
+            prompt_path = self.prompt_path(case_id)
             with open(prompt_path, "w") as prompt_file:
                 prompt_file.write("=== 2D Prompt for Visualization ===\n")
                 prompt_file.write(f"Reconstructed Narrative:\n{narrative}\n")
@@ -99,87 +259,365 @@ class MainAgent:
             raise
     
     def simulation_task(self, narrative):
-        """Task to generate a video simulation using the narrative."""
+        """
+        Task to generate a video simulation using the narrative.
+        :return: Future resolved with the video path, or None if the simulation failed.
+        """
         logging.info("Starting video simulation task...")
-        video_path = self.luma_agent.generate_video(prompt=narrative)
-        if video_path:
-            logging.info(f"Video simulation generated at: {video_path}")
-        else:
-            logging.error("Video simulation task failed.")
-        return video_path
-
 
-    def run_pipeline(self):
-        try:
-            # Step 1: Process images in 'data/input/' folder
-            images_directory = "data/input/"
-            image_files = [f for f in os.listdir(images_directory) if f.endswith(('.jpg', '.png', '.jpeg'))]
-            logging.info(f"Found image files: {image_files}")
-            findings, evidence_data = '', ''
-            for image in image_files:
-                image_path = os.path.join(images_directory, image)
-                results = self.image_analysis_task(image_path)
-                # Image Analysis Task
-                if isinstance(results, tuple):
-                # If it's a tuple, unpack it
-                    findings, evidence_data = results
-                else:    
-                    findings = results.get('findings', {})
-                    evidence_data = results.get('evidence_data', [])
-
-                logging.info(f"Findings: {findings}")
-                logging.info(f"Evidence Data: {evidence_data}")
-
-                # Summarization Task
-                summarized_results = self.summarization_task(findings, evidence_data)
-
-                # Step 2: Encrypt the image files directly from data/input/
-                encrypted_files = self.encryption_task(image_path)
-
-                if encrypted_files is None:
-                    logging.error(f"Encryption failed for {image_path}. Skipping.")
-                    continue
-
-                # Delete the original image file after encryption
-                self.delete_file(image_path)
-
-                # Encrypt the report files directly from data/reports/
-                 # Step 3: Encrypt all files in 'data/reports/'
-            reports_directory = "data/reports/"
-            report_files = [f for f in os.listdir(reports_directory) if f.endswith(('.txt', '.pdf', '.png'))]
-            logging.info(f"Found report files: {report_files}")
+        def report(video_path):
+            if video_path:
+                logging.info(f"Video simulation generated at: {video_path}")
+            else:
+                logging.error("Video simulation task failed.")
+            return video_path
 
-            for report in report_files:
-                report_path = os.path.join(reports_directory, report)
+        return chain(self.luma_agent.generate_video_async(prompt=narrative), report)
 
-                # Encrypt the report file
-                encrypted_files = self.encryption_task(report_path)
+    # Stages of the per-case pipeline; outputs are JSON-serializable so they can be memoized
 
-                if encrypted_files is None:
-                    logging.error(f"Encryption failed for {report_path}. Skipping.")
-                    continue
+    def analysis_stage(self, image_path):
+        """Stage analyzing the representative image of a case; outputs [findings, evidence_data]."""
+        findings, evidence_data = self.image_analysis_task(image_path)
+        if findings is None:
+            logging.error(f"Image analysis failed for {image_path}")
+            return None
+        logging.info(f"Findings for {image_path}: {findings}")
+        logging.info(f"Evidence Data for {image_path}: {evidence_data}")
+        return [findings, evidence_data]
+
+    def encryption_stage(self, image_paths):
+        """Stage encrypting every image of a case directly from data/input/; outputs the encrypted files."""
+        return self.encrypt_files(image_paths) or None
+
+    def summary_stage(self, image_path, case_id, analysis):
+        """Stage rendering the case report, chart and PDF, then encrypting them; outputs (a future of) the encrypted files."""
+        findings, evidence_data = analysis
+
+        def encrypt(summarized_results):
+            if not summarized_results:
+                return None
+
+            self.record_artifact(REPORT, summarized_results["report"], parent=image_path)
+            self.record_artifact(GRAPH, summarized_results["graphs"], parent=image_path)
+            if summarized_results.get("pdf"):
+                self.record_artifact(REPORT, summarized_results["pdf"], parent=image_path)
+
+            report_paths = [
+                summarized_results[output] for output in ("report", "graphs", "pdf") if summarized_results.get(output)
+            ]
+            return self.encrypt_files(report_paths) or None
+
+        # No stage worker waits for the render; the outputs are encrypted in the report pool once it is done
+        return chain(self.summarization_task(findings, evidence_data, case_id=case_id), encrypt,
+                     executor=self.report_pool)
+
+    def narrative_stage(self, image_path, case_id, analysis):
+        """Stage generating the narrative and 2D prompt of a case; outputs the narrative and prompt path."""
+        findings, evidence_data = analysis
+        narrative = self.generate_2d_prompt(findings, evidence_data, case_id=case_id)
+        if not narrative:
+            return None
+        prompt_path = self.prompt_path(case_id)
+        self.record_artifact(NARRATIVE, prompt_path, parent=image_path)
+        return {"narrative": narrative, "prompt": prompt_path}
+
+    def simulation_stage(self, image_path, narrative):
+        """Stage generating the video simulation of a case; outputs (a future of) the video path."""
+        def record(video_path):
+            if video_path:
+                self.record_artifact(VIDEO, video_path, parent=image_path)
+            return video_path
+
+        # The generation is tracked by the shared poller: no stage worker waits for it
+        return chain(self.simulation_task(narrative["narrative"]), record)
+
+    @lazy_property
+    def stage_memo(self):
+        cache_config = load_config().get("cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+        stages_config = cache_config.get("stages", {})
+        return ResultCache(
+            "pipeline_stages",
+            db_path=cache_config.get("db_path", "data/cache/results.db"),
+            max_entries=stages_config.get("max_entries", 5000),
+            ttl_seconds=stages_config.get("ttl_seconds")
+        )
 
-                # Delete the original report file after encryption
-                self.delete_file(report_path)
+    def case_graph(self, prefetched=None, targets=None):
+        """
+        Builds the pipeline run for every case (a cluster of near-duplicate images):
+
+            image ──> analysis ──┬──> summary (report, chart and PDF, encrypted) ──┐
+                                 └──> narrative ──> simulation ────────────────────┼──> encryption
+            images ────────────────────────────────────────────────────────────────┘
+
+        Its sources are "image" (the representative image), "images" (every image of the case) and
+        "case_id". Summary and narrative run in parallel once the analysis is ready. Encrypting the
+        originals deletes them and checkpoints the case in the evidence index, so it runs last: only once
+        every other wanted stage succeeded. Every stage but the encryption of the originals is memoized.
+        All cases share pipeline.max_concurrency workers; a stage waiting on a future holds none.
+        :param prefetched: Optional analyses already obtained for some images (packed requests).
+        :param targets: Optional stages wanted; the encryption waits for those among summary, narrative
+                        and simulation (by default, all of them).
+        :return: StageGraph.
+        """
+        prefetched = prefetched or {}
+        completed_before_encryption = tuple(
+            name for name in ("summary", "narrative", "simulation") if targets is None or name in targets
+        )
 
-                # Step 3: Decrypt the encrypted report when needed
-                decrypted_report = self.decrypt_file(encrypted_files)
+        def files_exist(paths):
+            return all(os.path.isfile(path) for path in paths)
 
-                if decrypted_report is None:
-                    logging.error("Decryption failed. Skipping this file.")
-                    continue  # Skip this file if decryption fails
+        graph = StageGraph(memo=self.stage_memo, max_workers=self.pipeline_config.get("max_concurrency", 4))
+        graph.add(
+            "analysis",
+            lambda image_path: prefetched.get(image_path) or self.analysis_stage(image_path),
+            inputs=("image",),
+            # The cache key of no images fingerprints the analysis settings (model, prompt, preprocessing)
+            settings=lambda: self.image_agent.cache_key([])
+        )
+        # The originals are checkpointed by the evidence index instead; their deletion must never be skipped
+        graph.add(
+            "encryption", lambda image_paths, *completed: self.encryption_stage(image_paths),
+            inputs=("images", "analysis") + completed_before_encryption, memoize=False
+        )
+        graph.add(
+            "summary", self.summary_stage, inputs=("image", "case_id", "analysis"),
+            settings=lambda: list(self.report_service.formats), valid=files_exist
+        )
+        graph.add(
+            "narrative", self.narrative_stage, inputs=("image", "case_id", "analysis"),
+            settings=lambda: [self.narrative_agent.model, load_config()["openai"]["max_tokens"],
+                              load_config()["openai"]["temperature"]],
+            valid=lambda output: os.path.isfile(output["prompt"])
+        )
+        graph.add(
+            "simulation", self.simulation_stage, inputs=("image", "narrative"),
+            valid=lambda video_path: os.path.isfile(video_path)
+        )
+        return graph
+
+    def process_images(self, image_paths, targets=None):
+        """
+        Runs the pipeline of every case in a batch of input images; originals are deleted once encrypted.
+        :param image_paths: Paths of the images.
+        :param targets: Optional stages wanted (see case_graph); by default every stage runs.
+        :return: Dictionary mapping the representative image of each case to its stage outputs.
+        """
+        results = {}
+        image_hashes = {}
+        for image_path in image_paths:
+            try:
+                image_hash = hash_file(image_path)
+            except OSError as e:
+                logging.error(f"Error reading image {image_path}: {e}")
+                continue
+            # Checkpoint: images encrypted by an earlier (possibly interrupted) run are not repeated
+            processed = self.evidence_index.processed_input(image_hash)
+            if processed is not None:
+                logging.warning(f"Skipping {image_path}: already analyzed and encrypted as {processed['path']}")
+                # The copy is recorded as a duplicate of the processed input before it is deleted
+                if processed["path"] != os.path.abspath(image_path):
+                    self.record_artifact(INPUT, image_path, sha256=image_hash, parent=processed["id"])
+                self.delete_file(image_path)
+                continue
+            image_hashes[image_path] = image_hash
+            self.record_artifact(INPUT, image_path, sha256=image_hash)
+        image_paths = list(image_hashes)
+
+        # Only one image per cluster of near-duplicates is sent for analysis
+        clusters, fingerprints = self.near_duplicate_task(image_paths)
+        input_ids = {}
+        for representative, members in list(clusters.items()):
+            if representative in image_hashes:
+                input_ids[representative] = self.record_artifact(
+                    INPUT, representative, sha256=image_hashes[representative],
+                    fingerprint=fingerprints.get(representative)
+                )
+                for duplicate in members[1:]:
+                    self.record_artifact(INPUT, duplicate, sha256=image_hashes[duplicate], parent=representative)
+                continue
+
+            # Near-duplicates of a case processed earlier (represented by the ID of its input) share its
+            # outputs; only their originals are encrypted
+            del clusters[representative]
+            for member in members:
+                self.record_artifact(INPUT, member, sha256=image_hashes[member], parent=representative)
+            encrypted = self.encryption_stage(members) if targets is None or "encryption" in targets else None
+            results[members[0]] = {"encryption": encrypted} if encrypted else {}
+
+        # Packed requests analyze several cases per API call, so they are made up front
+        prefetched = {}
+        if self.pipeline_config.get("pack_images", False):
+            for image_path, (findings, evidence_data) in self.batch_image_analysis_task(list(clusters)):
+                if findings is not None:
+                    prefetched[image_path] = [findings, evidence_data]
+
+        # Cases run concurrently, and the stages of each case run as a DAG
+        representatives = list(clusters)
+        runs = [
+            (
+                {"image": representative, "images": clusters[representative],
+                 "case_id": image_hashes[representative][:16]},
+                {"image": image_hashes[representative],
+                 "images": make_key(sorted(image_hashes[member] for member in clusters[representative]))}
+            )
+            for representative in representatives
+        ]
+        graph = self.case_graph(prefetched, targets=targets)
+        for representative, outputs in zip(representatives, graph.run_many(runs, targets=targets)):
+            results[representative] = outputs
+            logging.info(f"Case of {representative} completed stages: {sorted(outputs)}")
+            # Later batches match their near-duplicates against the completed case
+            if "encryption" in outputs and representative in fingerprints and input_ids[representative]:
+                self.duplicate_detector.remember(
+                    self.duplicate_detector.decode(fingerprints[representative]), input_ids[representative]
+                )
 
-                # Generate 2D Prompt
-                narrative = self.generate_2d_prompt(findings, evidence_data)
+        return results
 
-                # Generate Simulation
-                self.simulation_task(narrative)
+    def encrypt_files(self, file_paths=None):
+        """
+        Encrypts files in parallel and deletes the originals.
+        :param file_paths: Paths of the files; by default every report left in data/reports/.
+        :return: List of paths of the encrypted files.
+        """
+        if file_paths is None:
+            # Step 3: Encrypt all files in 'data/reports/'
+            reports_directory = "data/reports/"
+            report_files = [f for f in os.listdir(reports_directory) if f.endswith(('.txt', '.pdf', '.png'))]
+            logging.info(f"Found report files: {report_files}")
+            file_paths = [os.path.join(reports_directory, report) for report in report_files]
+        encrypted = []
+
+        # Encrypt the files in parallel
+        manifest = self.bulk_encryption_task(file_paths)
+
+        for entry in manifest:
+            file_path = entry["source"]
+            encrypted_files = entry["encrypted"]
+
+            if entry["status"] != "encrypted":
+                logging.error(f"Encryption failed for {file_path}: {entry['error']}. Skipping.")
+                continue
+            self.record_artifact(ENCRYPTED, encrypted_files, parent=file_path)
+
+            # Delete the original file after encryption
+            self.delete_file(file_path)
+            encrypted.append(encrypted_files)
+
+        return encrypted
+
+    def write_run_summary(self, before, started_at, image_paths, results):
+        """
+        Writes the metrics recorded since a registry snapshot as a JSON run summary.
+        :param before: REGISTRY.snapshot() taken when the run started.
+        :param started_at: time.time() when the run started.
+        :param image_paths: Images the run was given.
+        :param results: Stage outputs of the cases, as returned by process_images.
+        :return: Path to the summary, or None on failure.
+        """
+        metrics_config = load_config().get("metrics", {})
+        finished_at = time.time()
+        summary = {
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "wall_seconds": round(finished_at - started_at, 3),
+            "images": len(image_paths),
+            "cases": len(results or {}),
+            **run_summary(diff(REGISTRY.snapshot(), before), metrics_config.get("token_prices"))
+        }
+        try:
+            summary_dir = metrics_config.get("run_summary_dir", "logs/runs/")
+            os.makedirs(summary_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at))
+            summary_path = os.path.join(summary_dir, f"run-{stamp}-{int(started_at * 1000) % 1000:03d}.json")
+            with open(summary_path, "w") as summary_file:
+                json.dump(summary, summary_file, indent=2)
+        except OSError as e:
+            logging.error(f"Error writing the run summary: {e}")
+            return None
+        logging.info(f"Run summary written to {summary_path} "
+                     f"({summary['wall_seconds']} s, ${summary['cost_usd']:.4f})")
+        return summary_path
+
+    def run_pipeline(self, targets=None):
+        """
+        Processes every image in data/input/, then encrypts any report left over from an interrupted run.
+        :param targets: Optional stages wanted (see case_graph); by default every stage runs.
+        :return: Dictionary mapping the representative image of each case to its stage outputs.
+        """
+        before, started_at = REGISTRY.snapshot(), time.time()
+        try:
+            # Step 1: Process images in 'data/input/' folder
+            images_directory = "data/input/"
+            image_files = [f for f in os.listdir(images_directory) if f.endswith(IMAGE_EXTENSIONS)]
+            logging.info(f"Found image files: {image_files}")
+            image_paths = [os.path.join(images_directory, image) for image in image_files]
+            results = self.process_images(image_paths, targets=targets)
+            self.encrypt_files()
+            self.write_run_summary(before, started_at, image_paths, results)
+            return results
 
         except Exception as e:
             logging.error(f"Error during pipeline execution: {e}")
             raise
 
+    def run_daemon(self):
+        """
+        Watches data/input/ and streams new images through the pipeline as they land (by default only
+        analysis, summary and encryption; see daemon.stages). Completed images are checkpointed in the
+        evidence index and stage outputs memoized, so a restart after a crash resumes without repeating
+        finished work.
+        """
+        from utils.folder_watcher import FolderWatcher
+
+        daemon_config = load_config().get("daemon", {})
+        watcher = FolderWatcher(
+            daemon_config.get("watch_dir", "data/input/"),
+            IMAGE_EXTENSIONS,
+            poll_interval=daemon_config.get("poll_interval", 2.0),
+            settle_seconds=daemon_config.get("settle_seconds", 1.0),
+            use_inotify=daemon_config.get("inotify", True)
+        )
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+        logging.info(f"Watching {watcher.directory} for new evidence ({watcher.mode})")
+
+        try:
+            for image_paths in watcher.batches():
+                logging.info(f"New image files: {image_paths}")
+                before, started_at = REGISTRY.snapshot(), time.time()
+                try:
+                    results = self.process_images(image_paths, targets=daemon_config.get("stages"))
+                    self.encrypt_files()
+                    self.write_run_summary(before, started_at, image_paths, results)
+                except Exception as e:
+                    # One bad batch never stops the daemon; its files are retried on the next start
+                    logging.error(f"Error processing {image_paths}: {e}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            if "report_service" in self.__dict__:
+                self.report_service.shutdown()
+            if "report_pool" in self.__dict__:
+                self.report_pool.shutdown()
+            logging.info("Watch-folder daemon stopped")
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the forensic analysis pipeline.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and process images as they land in data/input/.")
+    args = parser.parse_args()
+
+    setup_logging()
     main_agent = MainAgent()
-    main_agent.run_pipeline()
+    if args.watch:
+        main_agent.run_daemon()
+    else:
+        main_agent.run_pipeline()
@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+from agents.encryption_agent import EncryptionAgent
+from utils.evidence_index import EvidenceIndex
+from utils.job_queue import JobQueue
+from utils.plaintext_cache import PlaintextCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK_IMPORT = """
+import logging, runpy, sys
+module = runpy.run_path(sys.argv[1], run_name="__mp_main__")
+assert not logging.getLogger().handlers, logging.getLogger().handlers
+assert module.get("job_queue") is None
+"""
+
+
+@pytest.mark.parametrize("script", ["app.py", "main_agent.py"])
+def test_entry_points_have_no_side_effects_when_reimported_by_a_worker(tmp_path, script):
+    # Spawned worker processes re-import the parent's script as __mp_main__
+    environment = {**os.environ, "PYTHONPATH": ROOT}
+    completed = subprocess.run([sys.executable, "-c", CHECK_IMPORT, os.path.join(ROOT, script)],
+                               cwd=tmp_path, env=environment, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def evidence(tmp_path, monkeypatch):
+    """Test client of the app, serving evidence encrypted into a temporary data directory."""
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "get_absolute_path", lambda relative_path: str(tmp_path / relative_path))
+    monkeypatch.setattr(app_module, "evidence_index", EvidenceIndex(db_path=str(tmp_path / "index.db")))
+    monkeypatch.setattr(app_module, "plaintext_cache", PlaintextCache(max_bytes=64 * 1024, max_item_bytes=16 * 1024))
+    # The services are set up, so setup_services() leaves them alone
+    job_queue = JobQueue(max_workers=1)
+    monkeypatch.setattr(app_module, "job_queue", job_queue)
+    agent = EncryptionAgent(key_path=str(tmp_path / "encryption.key"), chunk_size=1024)
+    monkeypatch.setitem(app_module.main_agent.__dict__, "encryption_agent", agent)
+
+    def store(name, data):
+        source = tmp_path / "plaintext" / name
+        source.parent.mkdir(exist_ok=True)
+        source.write_bytes(data)
+        return agent.encrypt_file(str(source), output_dir=str(tmp_path / "data" / "evidence" / "encrypted"))
+
+    yield types.SimpleNamespace(client=app_module.app.test_client(), store=store, cache=app_module.plaintext_cache)
+    job_queue.shutdown()
+
+
+def test_cached_evidence_is_invalidated_when_the_encrypted_file_changes(evidence):
+    first = bytes(range(256)) * 8
+    encrypted_path = evidence.store("report.txt", first)
+    assert evidence.client.get("/evidence/report.txt").data == first
+    assert evidence.cache.current_bytes == len(first)
+
+    # Re-encrypting the evidence changes the file's modification time and size: the cached copy is not served
+    second = b"revised report" * 10
+    evidence.store("report.txt", second)
+    os.utime(encrypted_path, ns=(os.stat(encrypted_path).st_mtime_ns + 10**9,) * 2)
+    assert evidence.client.get("/evidence/report.txt").data == second
+
+
+# Small files are served from the plaintext cache; larger ones decrypt only the chunks covering a range
+@pytest.mark.parametrize("size", [5000, 40 * 1024])
+def test_evidence_range_requests(evidence, size):
+    data = os.urandom(size)
+    evidence.store("chart.png", data)
+
+    full = evidence.client.get("/evidence/chart.png")
+    assert full.status_code == 200 and full.data == data
+    assert full.headers["Accept-Ranges"] == "bytes" and full.headers["Content-Type"] == "image/png"
+
+    partial = evidence.client.get("/evidence/chart.png", headers={"Range": "bytes=1000-2499"})
+    assert partial.status_code == 206 and partial.data == data[1000:2500]
+    assert partial.headers["Content-Range"] == f"bytes 1000-2499/{size}"
+    assert partial.headers["Content-Length"] == "1500"
+
+    open_ended = evidence.client.get("/evidence/chart.png", headers={"Range": "bytes=3000-"})
+    assert open_ended.status_code == 206 and open_ended.data == data[3000:]
+    assert open_ended.headers["Content-Range"] == f"bytes 3000-{size - 1}/{size}"
+
+    suffix = evidence.client.get("/evidence/chart.png", headers={"Range": "bytes=-100"})
+    assert suffix.status_code == 206 and suffix.data == data[-100:]
+
+    unsatisfiable = evidence.client.get("/evidence/chart.png", headers={"Range": f"bytes={size}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == f"bytes */{size}"
+    assert evidence.cache.current_bytes == (size if evidence.cache.accepts(size) else 0)
+
+
+def test_missing_evidence_is_not_found(evidence):
+    assert evidence.client.get("/evidence/missing.png").status_code == 404
+    assert evidence.client.get("/evidence/../encryption.key").status_code == 404
@@ -0,0 +1,34 @@
+import os
+
+import httpx
+
+from utils.clients import _request_hooks
+
+
+def write_env(text, mtime_ns):
+    with open("config/.env", "w") as env_file:
+        env_file.write(text)
+    os.utime("config/.env", ns=(mtime_ns, mtime_ns))
+
+
+def test_requests_carry_the_api_key_from_the_current_env_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("FORENSIC_API_KEY", raising=False)
+    os.makedirs("config")
+    write_env("FORENSIC_API_KEY=first\n", mtime_ns=1_000_000_000)
+
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers["Authorization"])
+        return httpx.Response(200)
+
+    # Like the SDK clients, the shared client was built with the key of its time
+    with httpx.Client(transport=httpx.MockTransport(handler), headers={"Authorization": "Bearer stale"},
+                      event_hooks=_request_hooks("test", "FORENSIC_API_KEY")) as client:
+        client.get("https://api.example/v1/models")
+        write_env("FORENSIC_API_KEY=second\n", mtime_ns=2_000_000_000)
+        client.get("https://api.example/v1/models")
+
+    assert seen == ["Bearer first", "Bearer second"]
+    monkeypatch.delenv("FORENSIC_API_KEY")
@@ -0,0 +1,87 @@
+import copy
+import json
+import os
+import pickle
+
+import pytest
+
+from utils.config_loader import load_config
+from utils.env_loader import load_env
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_config_is_parsed_once_until_the_file_changes(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    write(config_path, "openai:\n  model: gpt-4o\n", mtime_ns=1_000_000_000)
+    first = load_config(str(config_path))
+    assert first["openai"]["model"] == "gpt-4o"
+    assert load_config(str(config_path)) is first
+
+    # New modification time
+    write(config_path, "openai:\n  model: gpt-4.1\n", mtime_ns=2_000_000_000)
+    assert load_config(str(config_path))["openai"]["model"] == "gpt-4.1"
+
+    # Same modification time, different size
+    write(config_path, "openai:\n  model: gpt-4o-mini\n", mtime_ns=2_000_000_000)
+    assert load_config(str(config_path))["openai"]["model"] == "gpt-4o-mini"
+
+
+def test_invalid_edit_keeps_the_last_good_config(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    write(config_path, "jobs:\n  max_workers: 4\n", mtime_ns=1_000_000_000)
+    assert load_config(str(config_path))["jobs"]["max_workers"] == 4
+    write(config_path, "jobs: [max_workers: 8\n", mtime_ns=2_000_000_000)
+    assert load_config(str(config_path))["jobs"]["max_workers"] == 4
+
+
+def test_snapshot_behaves_like_plain_data_but_is_read_only(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    write(config_path, "reports:\n  formats: [txt, pdf]\n  workers: 2\n")
+    config = load_config(str(config_path))
+    reports = config["reports"]
+
+    assert isinstance(reports, dict) and isinstance(reports["formats"], list)
+    assert reports["formats"] == ["txt", "pdf"]
+    assert json.loads(json.dumps(config)) == {"reports": {"formats": ["txt", "pdf"], "workers": 2}}
+    assert pickle.loads(pickle.dumps(config)) == config
+
+    with pytest.raises(TypeError):
+        reports["workers"] = 8
+    with pytest.raises(TypeError):
+        reports.update(workers=8)
+    with pytest.raises(TypeError):
+        reports["formats"].append("html")
+    assert load_config(str(config_path))["reports"] == {"formats": ["txt", "pdf"], "workers": 2}
+
+    # Copies are regular, modifiable data
+    editable = copy.deepcopy(config)
+    editable["reports"]["formats"].append("html")
+    section = dict(reports)
+    section["workers"] = 8
+    assert type(editable["reports"]) is dict and section["workers"] == 8
+    assert load_config(str(config_path))["reports"]["workers"] == 2
+
+
+def test_env_reload_updates_and_unsets_variables(tmp_path, monkeypatch):
+    env_path = tmp_path / ".env"
+    monkeypatch.setenv("FORENSIC_REAL", "from-environment")
+    monkeypatch.delenv("FORENSIC_KEY", raising=False)
+    monkeypatch.delenv("FORENSIC_REMOVED", raising=False)
+
+    write(env_path, "FORENSIC_KEY=one\nFORENSIC_REMOVED=yes\nFORENSIC_REAL=from-file\n", mtime_ns=1_000_000_000)
+    load_env(str(env_path))
+    assert os.environ["FORENSIC_KEY"] == "one" and os.environ["FORENSIC_REMOVED"] == "yes"
+    assert os.environ["FORENSIC_REAL"] == "from-environment"
+
+    write(env_path, "FORENSIC_KEY=two\n", mtime_ns=2_000_000_000)
+    load_env(str(env_path))
+    assert os.environ["FORENSIC_KEY"] == "two"
+    assert "FORENSIC_REMOVED" not in os.environ
+    # Variables from the real environment are never unset
+    assert os.environ["FORENSIC_REAL"] == "from-environment"
+    monkeypatch.delenv("FORENSIC_KEY")
@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils.downloader import RangedDownloader
+
+DATA = os.urandom(300 * 1024)
+
+
+class VideoHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the video CDN; behavior is configured through server.options."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        options = self.server.options
+        if options["reject_head"]:
+            self.send_error(options["reject_head"])
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(DATA)))
+        if options["ranges"]:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):
+        options = self.server.options
+        byte_range = self.headers.get("Range")
+        with self.server.lock:
+            self.server.requests.append(byte_range)
+
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", byte_range or "")
+        if match and options["ranges"]:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else len(DATA) - 1, len(DATA) - 1)
+            body = DATA[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        else:
+            body = DATA
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        with self.server.lock:
+            drop = options["drops"] > 0 and len(body) > options["drop_after"]
+            if drop:
+                options["drops"] -= 1
+        if drop:
+            # Interrupted transfer: part of the body, then the connection goes away
+            self.wfile.write(body[:options["drop_after"]])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), VideoHandler)
+    httpd.options = {"ranges": True, "reject_head": None, "drops": 0, "drop_after": 0}
+    httpd.requests = []
+    httpd.lock = threading.Lock()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/video.mp4"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_downloader(**options):
+    options = {"segments": 4, "buffer_size": 4096, "min_segment_size": 64 * 1024, "timeout": 5, **options}
+    return RangedDownloader(**options)
+
+
+def read(path):
+    with open(path, "rb") as downloaded:
+        return downloaded.read()
+
+
+def test_segmented_download(server, tmp_path):
+    destination = str(tmp_path / "video.mp4")
+    assert make_downloader().download(server.url, destination) == destination
+    assert read(destination) == DATA
+    assert sorted(server.requests) == sorted(
+        f"bytes={len(DATA) * i // 4}-{len(DATA) * (i + 1) // 4 - 1}" for i in range(4)
+    )
+    assert os.listdir(tmp_path) == ["video.mp4"]
+
+
+def test_server_without_range_support(server, tmp_path):
+    server.options["ranges"] = False
+    destination = str(tmp_path / "video.mp4")
+    make_downloader().download(server.url, destination)
+    assert read(destination) == DATA
+    assert server.requests == [None]
+
+
+def test_interrupted_segments_resume_from_their_offset(server, tmp_path):
+    server.options.update(drops=2, drop_after=8 * 1024)
+    destination = str(tmp_path / "video.mp4")
+    make_downloader(state_interval=0).download(server.url, destination)
+    assert read(destination) == DATA
+    # Two segments were retried from where their transfer stopped, not from their start
+    retried = [byte_range for byte_range in server.requests
+               if int(byte_range[6:].split("-")[0]) % (len(DATA) // 4) == 8 * 1024]
+    assert len(server.requests) == 6 and len(retried) == 2
+
+
+def test_download_resumes_after_a_failed_run(server, tmp_path):
+    server.options.update(drops=4, drop_after=20 * 1024)
+    destination = str(tmp_path / "video.mp4")
+    with pytest.raises(requests.RequestException):
+        make_downloader(retries=1, state_interval=0).download(server.url, destination)
+    assert not os.path.exists(destination)
+    with open(destination + ".part.json") as state_file:
+        assert [segment[2] for segment in json.load(state_file)["segments"]] == [20 * 1024] * 4
+
+    server.requests.clear()
+    make_downloader().download(server.url, destination)
+    assert read(destination) == DATA
+    assert all(int(byte_range[6:].split("-")[0]) % (len(DATA) // 4) == 20 * 1024 for byte_range in server.requests)
+    assert not os.path.exists(destination + ".part.json")
+
+
+@pytest.mark.parametrize("status", [403, 405])
+def test_rejected_head_falls_back_to_a_ranged_get(server, tmp_path, status):
+    server.options["reject_head"] = status
+    destination = str(tmp_path / "video.mp4")
+    make_downloader().download(server.url, destination)
+    assert read(destination) == DATA
+    assert server.requests[0] == "bytes=0-0"
+    assert len(server.requests) == 5
+
+
+def test_rejected_head_without_range_support(server, tmp_path):
+    server.options.update(reject_head=405, ranges=False)
+    destination = str(tmp_path / "video.mp4")
+    make_downloader().download(server.url, destination)
+    assert read(destination) == DATA
+    assert server.requests == ["bytes=0-0", None]
+
+
+def test_progress_file_is_not_rewritten_per_chunk(server, tmp_path, monkeypatch):
+    downloader = make_downloader(buffer_size=1024, state_interval=3600, state_bytes=100 * 1024)
+    saves = []
+    save_state = downloader._save_state
+    monkeypatch.setattr(downloader, "_save_state", lambda *args: (saves.append(1), save_state(*args)))
+    downloader.download(server.url, str(tmp_path / "video.mp4"))
+    # One save when the segments are laid out, one per 100 KB downloaded and one at the end,
+    # where saving per chunk would have been 300
+    assert len(saves) <= 5
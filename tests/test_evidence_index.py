@@ -0,0 +1,120 @@
+import os
+import sqlite3
+
+import pytest
+
+from utils import evidence_index
+from utils.evidence_index import ENCRYPTED, INPUT, REPORT, EvidenceIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return EvidenceIndex(db_path=str(tmp_path / "index.db"))
+
+
+def write(path, data=b"data"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_record_and_get(index, tmp_path):
+    path = write(tmp_path / "input" / "a.jpg", b"x" * 10)
+    artifact_id = index.record(INPUT, path, sha256="abc")
+    artifact = index.get(path)
+    assert artifact["id"] == artifact_id
+    assert (artifact["kind"], artifact["sha256"], artifact["size"]) == (INPUT, "abc", 10)
+
+
+def test_relative_and_absolute_paths_are_one_artifact(index, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = write(tmp_path / "input" / "a.jpg")
+    first = index.record(INPUT, "input/a.jpg")
+    assert index.record(INPUT, path) == first
+    assert len(index.list(INPUT)) == 1
+
+
+def test_children_and_processed_checkpoint(index, tmp_path):
+    image = write(tmp_path / "input" / "a.jpg")
+    encrypted = write(tmp_path / "encrypted" / "a.jpg.enc")
+    index.record(INPUT, image, sha256="abc")
+    assert not index.is_processed("abc")
+
+    index.record(ENCRYPTED, encrypted, parent=image)
+    assert [child["path"] for child in index.children(image)] == [encrypted]
+    assert index.is_processed("abc")
+    assert index.processed_input("abc")["path"] == image
+
+    index.mark_deleted(encrypted)
+    assert not index.is_processed("abc")
+
+
+def test_list_is_newest_first_and_skips_deleted(index, tmp_path):
+    paths = [write(tmp_path / f"report{i}.txt") for i in range(3)]
+    for path in paths:
+        index.record(REPORT, path)
+    index.mark_deleted(paths[1])
+    assert [artifact["path"] for artifact in index.list(REPORT)] == [paths[2], paths[0]]
+    assert index.latest(REPORT)["path"] == paths[2]
+
+
+def test_sync_directory(index, tmp_path):
+    directory = tmp_path / "input"
+    kept = write(directory / "a.jpg")
+    removed = write(directory / "b.png")
+    write(directory / "notes.txt")
+    index.sync_directory(INPUT, str(directory), (".jpg", ".png"))
+    assert {artifact["path"] for artifact in index.list(INPUT)} == {kept, removed}
+
+    os.remove(removed)
+    index.sync_directory(INPUT, str(directory), (".jpg", ".png"))
+    assert [artifact["path"] for artifact in index.list(INPUT)] == [kept]
+
+
+def test_connections_are_closed(index, tmp_path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        opened.append(connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(evidence_index.sqlite3, "connect", tracking_connect)
+    path = write(tmp_path / "a.jpg")
+    index.record(INPUT, path)
+    index.get(path)
+    index.list(INPUT)
+    assert len(opened) == 3
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_fingerprints_of_processed_representatives(index, tmp_path):
+    first = write(tmp_path / "input" / "a.jpg")
+    copy = write(tmp_path / "input" / "a_copy.jpg")
+    pending = write(tmp_path / "input" / "b.jpg")
+    first_id = index.record(INPUT, first, sha256="a", fingerprint="phash8:ff")
+    index.record(INPUT, copy, sha256="c", parent=first, fingerprint="phash8:fe")
+    index.record(INPUT, pending, sha256="b", fingerprint="phash8:0f")
+    index.record(ENCRYPTED, write(tmp_path / "encrypted" / "a.jpg.enc"), parent=first)
+    index.record(ENCRYPTED, write(tmp_path / "encrypted" / "a_copy.jpg.enc"), parent=copy)
+
+    # Only inputs representing a case, once encrypted; refreshing a record keeps its fingerprint
+    index.record(INPUT, first, sha256="a")
+    assert index.processed_fingerprints() == [("phash8:ff", first_id)]
+
+
+def test_indexes_without_fingerprints_are_migrated(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE artifacts (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+            "path TEXT NOT NULL UNIQUE, sha256 TEXT, size INTEGER, parent_id INTEGER REFERENCES artifacts(id), "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, deleted_at REAL)"
+        )
+    conn.close()
+    index = EvidenceIndex(db_path=db_path)
+    path = write(tmp_path / "a.jpg")
+    index.record(INPUT, path, fingerprint="phash8:ff")
+    assert index.get(path)["fingerprint"] == "phash8:ff"
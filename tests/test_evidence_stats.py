@@ -0,0 +1,81 @@
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from utils.evidence_stats import UNKNOWN, aggregate_evidence
+
+
+def label(value):
+    return str(value or UNKNOWN).strip() or UNKNOWN
+
+
+def by_frequency(values):
+    """Distinct values, most frequent first and ties in first-seen order, computed item by item."""
+    counts = Counter(values)
+    first_seen = {value: index for index, value in reversed(list(enumerate(values)))}
+    return sorted(counts, key=lambda value: (-counts[value], first_seen[value]))
+
+
+def aggregate_per_row(evidence_data, case_ids):
+    """Reference aggregation: one dictionary update per evidence item."""
+    counts, crosstab = Counter(), defaultdict(Counter)
+    case_items, case_types = Counter(), defaultdict(Counter)
+    types, locations, cases = [], [], []
+    for item, case in zip(evidence_data, case_ids):
+        if not isinstance(item, dict):
+            continue
+        etype, location = label(item.get("type")), label(item.get("location"))
+        types.append(etype)
+        locations.append(location)
+        cases.append(case)
+        counts[etype] += 1
+        crosstab[etype][location] += 1
+        case_items[case] += 1
+        case_types[case][etype] += 1
+
+    type_order = by_frequency(types)
+    per_case = {}
+    for case in dict.fromkeys(cases):
+        most_common = max(case_types[case].values())
+        per_case[case] = {
+            "items": case_items[case],
+            "distinct_types": len(case_types[case]),
+            "most_common_type": next(etype for etype in type_order if case_types[case][etype] == most_common),
+        }
+    return {
+        "types": type_order,
+        "locations": by_frequency(locations),
+        "counts": {etype: counts[etype] for etype in type_order},
+        "crosstab": {etype: dict(crosstab[etype]) for etype in type_order},
+        "per_case": per_case,
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_aggregation_matches_per_row_aggregation(seed):
+    rng = random.Random(seed)
+    types = ["Knife", "Blood stain", "Footprint", " Glass ", "", None]
+    locations = ["floor", "doorway", "table", None, "  "]
+    evidence_data, case_ids = [], []
+    for _ in range(rng.randint(1, 400)):
+        item = {"type": rng.choice(types), "location": rng.choice(locations)}
+        evidence_data.append(item if rng.random() > 0.05 else "not an item")
+        case_ids.append(f"case-{rng.randint(1, 6)}")
+
+    stats = aggregate_evidence(evidence_data, case_ids=case_ids)
+    expected = aggregate_per_row(evidence_data, case_ids)
+
+    assert stats.types == expected["types"]
+    assert stats.locations == expected["locations"]
+    assert stats.counts() == expected["counts"]
+    assert stats.location_crosstab() == expected["crosstab"]
+    assert stats.per_case() == expected["per_case"]
+    assert stats.total == sum(expected["counts"].values())
+
+
+def test_empty_and_single_case_aggregation():
+    assert aggregate_evidence([]).counts() == {}
+    stats = aggregate_evidence([{"type": "Knife", "location": "floor"}, {"type": "knife"}])
+    assert stats.counts() == {"Knife": 1, "knife": 1}
+    assert stats.per_case() == {"case": {"items": 2, "distinct_types": 2, "most_common_type": "Knife"}}
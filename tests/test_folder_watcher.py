@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+from utils.folder_watcher import FolderWatcher
+
+
+@pytest.fixture
+def watch(tmp_path):
+    """Starts a watcher on tmp_path/input in a thread; batches are collected in a queue."""
+    watchers = []
+
+    def start(**options):
+        options = {"poll_interval": 0.05, "settle_seconds": 0.3, "use_inotify": False, **options}
+        watcher = FolderWatcher(str(tmp_path / "input"), (".jpg", ".png"), **options)
+        batches = queue.Queue()
+        thread = threading.Thread(target=lambda: [batches.put(batch) for batch in watcher.batches()], daemon=True)
+        thread.start()
+        watchers.append((watcher, thread))
+        time.sleep(0.1)  # Let the initial scan of existing files happen
+        return watcher, batches
+
+    yield start
+    for watcher, thread in watchers:
+        watcher.stop()
+        thread.join(timeout=5)
+        watcher.close()
+
+
+def names(batch):
+    return [os.path.basename(path) for path in batch]
+
+
+def test_existing_files_come_first_in_one_batch(tmp_path, watch):
+    (tmp_path / "input").mkdir()
+    for name in ("b.jpg", "a.png", "notes.txt"):
+        (tmp_path / "input" / name).write_bytes(b"image")
+    _, batches = watch()
+    assert names(batches.get(timeout=5)) == ["a.png", "b.jpg"]
+
+
+def test_polled_file_is_reported_once_it_settles(tmp_path, watch):
+    _, batches = watch(settle_seconds=0.5)
+    path = tmp_path / "input" / "scene.jpg"
+    with open(path, "wb") as image_file:
+        # A slow writer: the file keeps changing for a while
+        deadline = time.monotonic() + 0.6
+        while time.monotonic() < deadline:
+            image_file.write(b"x" * 1024)
+            image_file.flush()
+            time.sleep(0.05)
+            assert batches.empty()
+    written_at = time.monotonic()
+    assert names(batches.get(timeout=5)) == ["scene.jpg"]
+    assert time.monotonic() - written_at >= 0.4
+    assert os.path.getsize(path) > 10 * 1024
+
+
+def test_files_settling_together_form_one_batch(tmp_path, watch):
+    _, batches = watch(poll_interval=0.2, settle_seconds=0.2)
+    for name in ("a.jpg", "b.jpg", "c.png"):
+        (tmp_path / "input" / name).write_bytes(b"image")
+    assert names(batches.get(timeout=5)) == ["a.jpg", "b.jpg", "c.png"]
+
+
+def test_replaced_file_is_reported_again(tmp_path, watch):
+    (tmp_path / "input").mkdir()
+    path = tmp_path / "input" / "scene.jpg"
+    path.write_bytes(b"first")
+    _, batches = watch(settle_seconds=0.1)
+    assert names(batches.get(timeout=5)) == ["scene.jpg"]
+
+    # Unchanged files are not reported twice; a new file under the same name is
+    time.sleep(0.3)
+    assert batches.empty()
+    path.unlink()
+    time.sleep(0.2)
+    path.write_bytes(b"second version")
+    assert names(batches.get(timeout=5)) == ["scene.jpg"]
+
+
+def test_inotify_reports_closed_and_moved_files(tmp_path, watch):
+    watcher, batches = watch(use_inotify=True)
+    if watcher.mode != "inotify":
+        pytest.skip("inotify is not available")
+    with open(tmp_path / "input" / "closed.jpg", "wb") as image_file:
+        image_file.write(b"image")
+    assert names(batches.get(timeout=5)) == ["closed.jpg"]
+
+    staged = tmp_path / "moved.jpg"
+    staged.write_bytes(b"image")
+    os.rename(staged, tmp_path / "input" / "moved.jpg")
+    assert names(batches.get(timeout=5)) == ["moved.jpg"]
@@ -0,0 +1,110 @@
+import threading
+import types
+
+import pytest
+
+from utils.generation_poller import GenerationFailed, GenerationPoller
+
+
+class FakeGenerations:
+    """Stand-in for client.generations: each generation goes through a scripted list of states."""
+
+    def __init__(self, scripts):
+        self.scripts = {generation_id: list(states) for generation_id, states in scripts.items()}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, id):
+        with self.lock:
+            self.calls.append(id)
+            states = self.scripts[id]
+            state = states.pop(0) if len(states) > 1 else states[0]
+        if isinstance(state, Exception):
+            raise state
+        return types.SimpleNamespace(
+            id=id, state=state, failure_reason="moderation" if state == "failed" else None,
+            assets=types.SimpleNamespace(video=f"https://videos.example/{id}.mp4")
+        )
+
+
+def make_poller(scripts, **options):
+    generations = FakeGenerations(scripts)
+    options = {"min_interval": 0.01, "max_interval": 0.05, "jitter": 0.0, "expected_seconds": 3600, **options}
+    return GenerationPoller(types.SimpleNamespace(generations=generations), **options), generations
+
+
+def test_completed_generation_resolves_its_future():
+    poller, generations = make_poller({"g1": ["queued", "dreaming", "dreaming", "completed"]})
+    generation = poller.track("g1").result(timeout=5)
+    assert generation.assets.video == "https://videos.example/g1.mp4"
+    assert generations.calls == ["g1"] * 4
+    assert poller.pending() == 0
+    poller.stop()
+
+
+def test_failed_generation_fails_its_future():
+    poller, _ = make_poller({"g1": ["queued", "failed"]})
+    with pytest.raises(GenerationFailed, match="moderation"):
+        poller.track("g1").result(timeout=5)
+    poller.stop()
+
+
+def test_transient_errors_are_retried():
+    poller, generations = make_poller({"g1": [ConnectionError("reset"), ConnectionError("reset"), "completed"]})
+    assert poller.track("g1").result(timeout=5).state == "completed"
+    assert len(generations.calls) == 3
+    poller.stop()
+
+
+def test_persistent_errors_fail_the_future():
+    poller, generations = make_poller({"g1": [ConnectionError("down")]}, max_errors=3)
+    with pytest.raises(ConnectionError):
+        poller.track("g1").result(timeout=5)
+    assert len(generations.calls) == 3
+    poller.stop()
+
+
+def test_one_thread_polls_every_generation():
+    scripts = {f"g{index}": ["queued"] * (index % 5 + 1) + ["completed"] for index in range(100)}
+    poller, _ = make_poller(scripts)
+    before = threading.active_count()
+    futures = [poller.track(generation_id) for generation_id in scripts]
+    assert threading.active_count() <= before + 1
+    assert all(future.result(timeout=10).state == "completed" for future in futures)
+    poller.stop()
+
+
+def test_tracking_twice_shares_the_future_and_calls_back():
+    poller, _ = make_poller({"g1": ["queued", "completed"]})
+    finished = []
+    done = threading.Event()
+
+    def callback(future):
+        finished.append(future.result().id)
+        done.set()
+
+    first = poller.track("g1", callback=callback)
+    assert poller.track("g1") is first
+    assert done.wait(5)
+    assert finished == ["g1"]
+    poller.stop()
+
+
+def test_unchanged_states_back_off():
+    poller, _ = make_poller({}, min_interval=1.0, max_interval=4.0, backoff=2.0)
+    entry = {"interval": 1.0, "started_at": 0.0}
+    poller._tracked["g1"] = entry
+    intervals = []
+    for _ in range(4):
+        poller._reschedule("g1", entry, grow=True)
+        intervals.append(entry["interval"])
+    assert intervals == [2.0, 4.0, 4.0, 4.0]
+    poller._reschedule("g1", entry, grow=False)
+    assert entry["interval"] == 1.0
+
+
+def test_stop_cancels_pending_futures():
+    poller, _ = make_poller({"g1": ["queued"]})
+    future = poller.track("g1")
+    poller.stop()
+    assert future.cancelled()
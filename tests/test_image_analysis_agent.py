@@ -0,0 +1,96 @@
+import time
+import types
+
+import openai
+import pytest
+
+from agents.image_analysis_agent import ImageContentAnalysisAgent, validate_analysis
+from utils.config_loader import load_config
+from utils.response_parser import ANALYSIS_SCHEMA, iter_json_objects, loads
+
+
+def bad_request(param, code=None):
+    response = types.SimpleNamespace(request=None, status_code=400, headers={})
+    body = {"message": "Invalid parameter", "type": "invalid_request_error", "param": param, "code": code}
+    return openai.BadRequestError("Error code: 400", response=response, body=body)
+
+
+class FakeCompletions:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    config = {"openai": {"model": "gpt-4o-mini", "temperature": 0.7},
+              "agents": {"image_analysis": {"response_format": "json_object"}}}
+    monkeypatch.setattr(ImageContentAnalysisAgent, "config", property(lambda self: config))
+
+    def make(*errors):
+        agent = ImageContentAnalysisAgent.__new__(ImageContentAnalysisAgent)
+        agent.json_mode_supported = True
+        completions = FakeCompletions(errors)
+        agent.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+        return agent, completions
+
+    return make
+
+
+def test_rejected_response_format_falls_back_to_text(make_agent):
+    agent, completions = make_agent(bad_request("response_format"))
+    assert agent._create_completion(messages=[]) == "response"
+    assert [call.get("response_format") for call in completions.calls] == [{"type": "json_object"}, None]
+
+    # JSON mode is not asked for again
+    agent._create_completion(messages=[])
+    assert "response_format" not in completions.calls[-1]
+
+
+def test_other_bad_requests_are_raised(make_agent):
+    # The message mentions response_format, but the rejected parameter is another one
+    error = bad_request("messages", code="invalid_value")
+    error.message = "messages: 'response_format' requires the word json in the messages"
+    agent, completions = make_agent(error)
+    with pytest.raises(openai.BadRequestError):
+        agent._create_completion(messages=[])
+    assert len(completions.calls) == 1 and agent.json_mode_supported
+
+
+def test_schema_matches_the_configured_json_format():
+    prompt = load_config()["agents"]["image_analysis"]["description_prompt"]
+    example = loads(next(iter_json_objects(prompt)))
+    properties = ANALYSIS_SCHEMA["properties"]
+
+    assert set(example) == set(properties)
+    assert set(example["evidence"][0]) == set(properties["evidence"]["items"]["properties"])
+    assert set(ANALYSIS_SCHEMA["required"]) <= set(example)
+    assert validate_analysis(example) is example
+
+
+def test_json_objects_are_found_around_prose_and_unbalanced_braces():
+    text = 'Here is {the "analysis"}: ```{"a": "}{", "b": {"c": 1}}``` {broken {"d": 2} and {"e": 3}'
+    assert list(iter_json_objects(text)) == ['{the "analysis"}', '{"a": "}{", "b": {"c": 1}}', '{"d": 2}', '{"e": 3}']
+    assert list(iter_json_objects('} "quote { {"f": 4}')) == ['{"f": 4}']
+    assert list(iter_json_objects("no object")) == []
+
+
+def test_json_object_scan_is_linear():
+    # Every brace is unbalanced: rescanning from each of them would take quadratic time
+    text = "{" * 200_000 + '{"a": 1}'
+    start = time.perf_counter()
+    assert list(iter_json_objects(text)) == ['{"a": 1}']
+    assert time.perf_counter() - start < 2
+
+
+def test_listed_observations_are_joined_into_text(make_agent):
+    agent, _ = make_agent()
+    findings, _ = agent._extract_findings({"scene_description": "A kitchen.",
+                                           "key_observations": ["Broken glass.", "Open window."]})
+    assert findings["Key Observations"] == "Broken glass.\nOpen window."
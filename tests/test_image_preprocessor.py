@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from PIL import Image
+
+from utils.image_preprocessor import ImagePreprocessor
+from utils.result_cache import hash_file
+
+
+def save_jpeg(path, image, orientation=None, quality=90):
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    image.save(path, format="JPEG", quality=quality, exif=exif.tobytes() if orientation else b"")
+
+
+def decode(payload):
+    return Image.open(io.BytesIO(payload))
+
+
+@pytest.fixture
+def preprocessor(tmp_path):
+    return ImagePreprocessor()
+
+
+def test_exif_rotated_image_comes_out_portrait(tmp_path, preprocessor):
+    # Landscape sensor data, left half red, tagged "rotate 90 degrees clockwise to display"
+    image = Image.new("RGB", (4000, 3000), (0, 0, 255))
+    image.paste((255, 0, 0), (0, 0, 2000, 3000))
+    path = tmp_path / "rotated.jpg"
+    save_jpeg(path, image, orientation=6)
+
+    mime_type, payload = preprocessor.prepare(str(path))
+    derived = decode(payload)
+    assert mime_type == "image/jpeg"
+    assert derived.size == (768, 1024)
+    # Rotated clockwise, the left half of the sensor image is the top half
+    red, _, blue = derived.convert("RGB").getpixel((384, 100))
+    assert red > 200 and blue < 50
+    red, _, blue = derived.convert("RGB").getpixel((384, 924))
+    assert blue > 200 and red < 50
+
+
+def test_landscape_image_is_downscaled_and_cached_in_memory(tmp_path, preprocessor):
+    path = tmp_path / "scene.jpg"
+    save_jpeg(path, Image.new("RGB", (4000, 3000), (120, 80, 40)))
+
+    source_hash = hash_file(str(path))
+    first = preprocessor.prepare(str(path), source_hash=source_hash)
+    assert decode(first[1]).size == (1024, 768)
+    assert preprocessor.cache.current_bytes == len(first[1])
+    # Served from memory, without reading the source again; no derived copy is written to disk
+    path.unlink()
+    assert preprocessor.prepare(str(path), source_hash=source_hash) == first
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_small_image_is_uploaded_unchanged(tmp_path, preprocessor):
+    path = tmp_path / "small.jpg"
+    # Already small enough, and more compressed than a re-encoding would be
+    save_jpeg(path, Image.effect_noise((64, 48), 80).convert("RGB"), quality=30)
+    assert preprocessor.prepare(str(path)) == ("image/jpeg", path.read_bytes())
+
+
+def test_unreadable_image_falls_back_to_the_original(tmp_path, preprocessor):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+    assert preprocessor.prepare(str(path)) == ("image/png", b"not an image")
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import Future
+
+from utils.job_queue import COMPLETED, FAILED, RUNNING, JobQueue
+
+
+def wait_for(job_queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job["status"] in (COMPLETED, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_jobs_complete_or_fail():
+    job_queue = JobQueue(max_workers=2)
+    assert wait_for(job_queue, job_queue.submit("sum", sum, [1, 2]))["result"] == 3
+    failed = wait_for(job_queue, job_queue.submit("fail", lambda: 1 / 0))
+    assert failed["status"] == FAILED and "division" in failed["error"]
+    job_queue.shutdown()
+
+
+def test_asynchronous_jobs_release_their_worker():
+    job_queue = JobQueue(max_workers=1)
+    pending = [Future() for _ in range(5)]
+    job_ids = [job_queue.submit("video", lambda future=future: future) for future in pending]
+
+    # A single worker started every job: none of them holds it while its future is pending
+    quick = wait_for(job_queue, job_queue.submit("sum", sum, [1, 2]))
+    assert quick["result"] == 3
+    assert all(job_queue.get(job_id)["status"] == RUNNING for job_id in job_ids)
+
+    for index, future in enumerate(pending[:-1]):
+        future.set_result({"video": index})
+    pending[-1].set_exception(RuntimeError("generation failed"))
+    assert [wait_for(job_queue, job_id)["result"] for job_id in job_ids[:-1]] == [{"video": i} for i in range(4)]
+    assert wait_for(job_queue, job_ids[-1])["error"] == "generation failed"
+    job_queue.shutdown()
+
+
+def test_duplicate_keys_share_a_job_until_it_finishes():
+    job_queue = JobQueue(max_workers=2)
+    future = Future()
+    first = job_queue.submit("video", lambda: future, key=("video", "prompt"))
+    assert job_queue.submit("video", lambda: future, key=("video", "prompt")) == first
+    future.set_result("done")
+    wait_for(job_queue, first)
+    assert job_queue.submit("video", lambda: "again", key=("video", "prompt")) != first
+    job_queue.shutdown()
+
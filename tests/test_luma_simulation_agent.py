@@ -0,0 +1,156 @@
+import itertools
+import os
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("lumaai")
+
+from agents import luma_simulation_agent
+from agents.luma_simulation_agent import LumaSimulationAgent
+from utils.generation_poller import GenerationPoller
+
+
+class FakeLumaClient:
+    """Stand-in for the LumaAI client: generations complete after a few status checks."""
+
+    def __init__(self, polls_until_done=3, fail=()):
+        self.polls_until_done = polls_until_done
+        self.fail = set(fail)
+        self.created = []
+        self.polls = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.generations = types.SimpleNamespace(create=self.create, get=self.get)
+
+    def create(self, prompt):
+        with self.lock:
+            generation_id = f"gen-{next(self.ids)}"
+            self.created.append(prompt)
+            self.polls[generation_id] = 0
+        return types.SimpleNamespace(id=generation_id, state="queued")
+
+    def get(self, id):
+        with self.lock:
+            self.polls[id] += 1
+            done = self.polls[id] >= self.polls_until_done
+        state = ("failed" if id in self.fail else "completed") if done else "dreaming"
+        return types.SimpleNamespace(
+            id=id, state=state, failure_reason="rejected",
+            assets=types.SimpleNamespace(video=f"https://videos.example/{id}.mp4")
+        )
+
+
+class FakeDownloader:
+    def __init__(self):
+        self.urls = []
+
+    def download(self, url, destination):
+        self.urls.append(url)
+        with open(destination, "wb") as video_file:
+            video_file.write(url.encode())
+        return destination
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    agents = []
+
+    def make(client):
+        monkeypatch.setattr(luma_simulation_agent, "get_luma_client", lambda: client)
+        agent = LumaSimulationAgent(output_dir=str(tmp_path / "simulations"), store_path=str(tmp_path / "results.db"))
+        agent.poller = GenerationPoller(client, min_interval=0.01, max_interval=0.02, jitter=0.0,
+                                        expected_seconds=3600)
+        agent.downloader = FakeDownloader()
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.poller.stop()
+        agent.download_pool.shutdown()
+
+
+def test_generation_is_downloaded_and_stored(make_agent):
+    client = FakeLumaClient()
+    agent = make_agent(client)
+    video_path = agent.generate_video("A knife on the kitchen floor.")
+    assert os.path.isfile(video_path)
+    assert agent.downloader.urls == ["https://videos.example/gen-1.mp4"]
+
+    # The same prompt (up to whitespace) is served from the store
+    assert agent.generate_video("A knife on the  kitchen floor.\n") == video_path
+    assert client.created == ["A knife on the kitchen floor."]
+
+
+def test_pending_generations_hold_no_threads(make_agent):
+    client = FakeLumaClient(polls_until_done=20)
+    agent = make_agent(client)
+    before = threading.active_count()
+    futures = [agent.generate_video_async(f"Scene {index}") for index in range(100)]
+
+    # One poller thread tracks the 100 generations; nobody waits on them
+    time.sleep(0.05)
+    assert not any(future.done() for future in futures)
+    assert threading.active_count() <= before + 1
+
+    video_paths = [future.result(timeout=30) for future in futures]
+    assert all(os.path.isfile(path) for path in video_paths)
+    assert len(set(video_paths)) == 100
+    assert agent.poller.pending() == 0
+
+
+def test_concurrent_requests_share_one_generation(make_agent):
+    client = FakeLumaClient(polls_until_done=5)
+    agent = make_agent(client)
+    futures = [agent.generate_video_async("Same scene") for _ in range(10)]
+    assert len({future.result(timeout=10) for future in futures}) == 1
+    assert client.created == ["Same scene"]
+
+
+def test_failed_generation_is_not_resumed(make_agent):
+    client = FakeLumaClient(fail={"gen-1"})
+    agent = make_agent(client)
+    assert agent.generate_video("Scene") is None
+    assert agent.store.get(agent.prompt_key("Scene"))["failed"]
+
+    # The next request starts a new generation instead of resuming the failed one
+    assert os.path.isfile(agent.generate_video("Scene"))
+    assert client.created == ["Scene", "Scene"]
+
+
+def test_interrupted_generation_is_resumed(make_agent):
+    client = FakeLumaClient()
+    agent = make_agent(client)
+    generation = client.create("Scene")
+    agent.store.set(agent.prompt_key("Scene"), {"prompt": "Scene", "generation_id": generation.id,
+                                                "video_path": None, "created_at": 0, "completed_at": None})
+    assert os.path.isfile(agent.generate_video("Scene"))
+    assert client.created == ["Scene"]
+
+
+def test_completed_generation_with_a_deleted_video_is_generated_again(make_agent):
+    client = FakeLumaClient()
+    agent = make_agent(client)
+    video_path = agent.generate_video("Scene")
+    assert agent.store.get(agent.prompt_key("Scene"))["completed_at"] is not None
+    os.remove(video_path)
+
+    # The finished generation is not resumed: its video URL may have expired
+    assert os.path.isfile(agent.generate_video("Scene"))
+    assert client.created == ["Scene", "Scene"]
+    assert agent.downloader.urls == ["https://videos.example/gen-1.mp4", "https://videos.example/gen-2.mp4"]
+
+
+def test_store_errors_do_not_stop_generations(make_agent):
+    client = FakeLumaClient()
+    agent = make_agent(client)
+
+    def unavailable(*args):
+        raise OSError("database is locked")
+
+    agent.store.get = agent.store.set = unavailable
+    assert os.path.isfile(agent.generate_video("Scene"))
+    assert client.created == ["Scene"]
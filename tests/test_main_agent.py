@@ -0,0 +1,179 @@
+import io
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+import yaml
+from PIL import Image
+
+from main_agent import MainAgent
+from utils.evidence_index import INPUT
+from utils.futures import resolved
+
+
+class FakeImageAgent:
+    def __init__(self):
+        self.analyzed = []
+        self.lock = threading.Lock()
+
+    def analyze_images(self, image_paths):
+        with self.lock:
+            self.analyzed.extend(os.path.basename(path) for path in image_paths)
+        return {"Scene Description": "A kitchen."}, [{"type": "Glass", "location": "floor"}]
+
+
+class FakeEncryptionAgent:
+    def __init__(self, output_dir, fail=()):
+        self.output_dir = output_dir
+        self.fail = set(fail)
+
+    def encrypt_files(self, file_paths, max_workers=None):
+        manifest = []
+        for path in file_paths:
+            entry = {"source": path, "encrypted": None, "bytes": 0, "status": "failed", "error": None}
+            if os.path.basename(path) in self.fail:
+                entry["error"] = "disk full"
+            else:
+                entry["encrypted"] = os.path.join(self.output_dir, os.path.basename(path) + ".enc")
+                shutil.copy(path, entry["encrypted"])
+                entry["status"] = "encrypted"
+            manifest.append(entry)
+        return manifest
+
+
+class FakeReportService:
+    formats = ("txt",)
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.fail = False
+
+    def submit(self, case_id, findings, evidence_data):
+        if self.fail:
+            return resolved(None)
+        outputs = {}
+        for output in ("report", "graphs"):
+            outputs[output] = os.path.join(self.output_dir, f"{case_id}-{output}.txt")
+            with open(outputs[output], "w") as output_file:
+                output_file.write(findings["Scene Description"])
+        return resolved(outputs)
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("config")
+    os.makedirs("data/input")
+    os.makedirs("data/evidence/encrypted")
+    os.makedirs("data/reports")
+    config = {
+        "pipeline": {"max_concurrency": 2, "pack_images": False, "near_duplicates": {"enabled": False}},
+        "index": {"db_path": "data/evidence/index.db"},
+        "cache": {"enabled": False},
+    }
+    with open("config/config.yaml", "w") as config_file:
+        yaml.safe_dump(config, config_file)
+
+    main_agent = MainAgent()
+    main_agent.image_agent = FakeImageAgent()
+    main_agent.encryption_agent = FakeEncryptionAgent("data/evidence/encrypted")
+    main_agent.report_service = FakeReportService("data/reports")
+    return main_agent
+
+
+def add_image(name, content):
+    path = os.path.join("data/input", name)
+    with open(path, "wb") as image_file:
+        image_file.write(content)
+    return path
+
+
+def test_interrupted_batch_resumes_with_the_unfinished_images(agent):
+    paths = [add_image("a.jpg", b"image a"), add_image("b.jpg", b"image b")]
+    agent.encryption_agent.fail = {"b.jpg"}
+    results = agent.process_images(paths, targets=["encryption"])
+    assert sorted(os.listdir("data/input")) == ["b.jpg"]
+    assert sorted(stages for outputs in results.values() for stages in outputs) == ["analysis", "analysis", "encryption"]
+
+    # The next run (e.g. after a restart) picks up the image whose encryption failed, and only it
+    agent.encryption_agent.fail = set()
+    paths = [add_image("a.jpg", b"image a"), os.path.join("data/input", "b.jpg")]
+    agent.process_images(paths, targets=["encryption"])
+    assert agent.image_agent.analyzed.count("a.jpg") == 1
+    assert agent.image_agent.analyzed.count("b.jpg") == 2
+    assert agent.evidence_index.get("data/input/a.jpg")["parent_id"] is None
+    assert os.listdir("data/input") == []
+
+
+def test_copies_of_processed_images_are_recorded_before_deletion(agent):
+    agent.process_images([add_image("a.jpg", b"image a")], targets=["encryption"])
+    original = agent.evidence_index.get("data/input/a.jpg")
+
+    copy_path = add_image("a_copy.jpg", b"image a")
+    agent.process_images([copy_path, add_image("c.jpg", b"image c")], targets=["encryption"])
+    assert sorted(agent.image_agent.analyzed) == ["a.jpg", "c.jpg"]
+    assert os.listdir("data/input") == []
+
+    copy = agent.evidence_index.get(copy_path)
+    assert copy["kind"] == INPUT and copy["parent_id"] == original["id"]
+    assert copy["deleted_at"] is not None
+
+
+def test_originals_are_kept_until_every_stage_of_the_case_succeeded(agent):
+    path = add_image("a.jpg", b"image a")
+    agent.report_service.fail = True
+    results = agent.process_images([path], targets=["summary", "encryption"])
+    assert sorted(results[path]) == ["analysis"]
+    assert os.listdir("data/input") == ["a.jpg"]
+    assert agent.evidence_index.processed_input(agent.evidence_index.get(path)["sha256"]) is None
+
+    # The rerun is not skipped as processed: it produces the missing report, then encrypts the original
+    agent.report_service.fail = False
+    results = agent.process_images([path], targets=["summary", "encryption"])
+    assert sorted(results[path]) == ["analysis", "encryption", "summary"]
+    assert os.listdir("data/input") == [] and os.listdir("data/reports") == []
+    case_id = agent.evidence_index.get(path)["sha256"][:16]
+    assert sorted(os.listdir("data/evidence/encrypted")) == [
+        "a.jpg.enc", f"{case_id}-graphs.txt.enc", f"{case_id}-report.txt.enc"
+    ]
+
+
+def scene_bytes(seed, size=(640, 480), quality=90):
+    """JPEG of a smooth synthetic photo; the same seed gives near-duplicates at any size or quality."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize((640, 480), Image.Resampling.BICUBIC).resize(size)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def with_near_duplicates(main_agent):
+    main_agent.pipeline_config = dict(main_agent.pipeline_config, near_duplicates={"enabled": True})
+    return main_agent
+
+
+def test_near_duplicates_of_processed_cases_are_matched_across_batches(agent):
+    with_near_duplicates(agent)
+    first = add_image("a.jpg", scene_bytes(1))
+    agent.process_images([first], targets=["encryption"])
+    first_id = agent.evidence_index.get(first)["id"]
+
+    # A re-saved copy arriving alone in a later batch joins the processed case instead of being analyzed
+    copy = add_image("a_small.jpg", scene_bytes(1, size=(320, 240), quality=40))
+    results = agent.process_images([copy], targets=["encryption"])
+    assert agent.image_agent.analyzed == ["a.jpg"]
+    assert list(results[copy]) == ["encryption"] and os.listdir("data/input") == []
+    assert agent.evidence_index.get(copy)["parent_id"] == first_id
+
+    # After a restart, the processed case is matched from the fingerprint stored in the evidence index
+    restarted = with_near_duplicates(MainAgent())
+    restarted.image_agent = agent.image_agent
+    restarted.encryption_agent = agent.encryption_agent
+    paths = [add_image("a_again.jpg", scene_bytes(1, quality=60)), add_image("b.jpg", scene_bytes(2))]
+    restarted.process_images(paths, targets=["encryption"])
+    assert agent.image_agent.analyzed == ["a.jpg", "b.jpg"]
+    assert restarted.evidence_index.get(paths[0])["parent_id"] == first_id
+    assert os.listdir("data/input") == []
@@ -0,0 +1,115 @@
+import json
+import types
+
+import pytest
+
+from utils.metrics import (OPERATION_SECONDS, REGISTRY, Histogram, MetricsRegistry, diff, record_cache,
+                           record_usage, run_summary, timed)
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs.", ("kind",))
+    registry.histogram("job_seconds", "Job time.", ("kind",), buckets=(1, 2, 4))
+    return registry
+
+
+def test_render_uses_the_prometheus_text_format(registry):
+    registry.get("jobs_total").inc(kind="analysis")
+    registry.get("jobs_total").inc(2, kind='say "hi"\n')
+    for value in (0.5, 1.5, 3, 10):
+        registry.get("job_seconds").observe(value, kind="analysis")
+
+    assert registry.render() == "\n".join([
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="analysis"} 1',
+        'jobs_total{kind="say \\"hi\\"\\n"} 2',
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{kind="analysis",le="1"} 1',
+        'job_seconds_bucket{kind="analysis",le="2"} 2',
+        'job_seconds_bucket{kind="analysis",le="4"} 3',
+        'job_seconds_bucket{kind="analysis",le="+Inf"} 4',
+        'job_seconds_sum{kind="analysis"} 15',
+        'job_seconds_count{kind="analysis"} 4',
+    ]) + "\n"
+
+
+def test_labels_must_match(registry):
+    with pytest.raises(ValueError):
+        registry.get("jobs_total").inc(stage="analysis")
+
+
+def test_quantile_interpolates_inside_buckets():
+    histogram = Histogram("seconds", "Seconds.", buckets=(1, 2, 4))
+    assert histogram.quantile(0.5, [2, 2, 0, 0]) == 1.0
+    assert histogram.quantile(0.75, [2, 2, 0, 0]) == 1.5
+    assert histogram.quantile(0.5, [0, 0, 4, 0]) == 3.0
+    # Observations above the last bound are only known to be above it
+    assert histogram.quantile(0.99, [1, 0, 0, 3]) == 4
+    assert histogram.quantile(0.5, [0, 0, 0, 0]) is None
+
+
+def test_diff_keeps_only_new_observations(registry):
+    registry.get("jobs_total").inc(kind="analysis")
+    registry.get("job_seconds").observe(0.5, kind="analysis")
+    before = registry.snapshot()
+
+    registry.get("jobs_total").inc(kind="summary")
+    registry.get("job_seconds").observe(3, kind="analysis")
+    changes = diff(registry.snapshot(), before)
+    assert changes == {
+        "jobs_total": [{"labels": {"kind": "summary"}, "value": 1}],
+        "job_seconds": [{"labels": {"kind": "analysis"}, "buckets": [0, 0, 1, 0], "count": 1, "sum": 3.0}],
+    }
+    assert diff(registry.snapshot(), registry.snapshot()) == {}
+
+
+def test_diff_merges_into_another_registry(registry):
+    # What a worker process recorded is added to the parent's metrics
+    before = registry.snapshot()
+    registry.get("jobs_total").inc(3, kind="render")
+    registry.get("job_seconds").observe(1.5, kind="render")
+    changes = json.loads(json.dumps(diff(registry.snapshot(), before)))
+
+    parent = MetricsRegistry()
+    parent.counter("jobs_total", "Jobs.", ("kind",)).inc(kind="render")
+    parent.histogram("job_seconds", "Job time.", ("kind",), buckets=(1, 2, 4))
+    parent.merge(changes)
+    parent.merge(changes)
+    assert parent.get("jobs_total").snapshot() == [{"labels": {"kind": "render"}, "value": 7}]
+    assert parent.get("job_seconds").snapshot()[0]["buckets"] == [0, 2, 0, 0]
+
+
+def test_run_summary_condenses_a_run():
+    before = REGISTRY.snapshot()
+    with timed("test_agent", "render") as timer:
+        timer.bytes_in, timer.bytes_out = 100, 40
+    with pytest.raises(RuntimeError):
+        with timed("test_agent", "render"):
+            raise RuntimeError("failed")
+    record_usage("test_agent", "test-model", types.SimpleNamespace(prompt_tokens=1000, completion_tokens=200))
+    record_cache("test_cache", True)
+    record_cache("test_cache", False)
+    record_cache("test_cache", False)
+
+    summary = run_summary(diff(REGISTRY.snapshot(), before),
+                          {"test-model": {"prompt": 2.0, "completion": 10.0}})
+    render = summary["operations"]["test_agent.render"]
+    assert render["calls"] == 2 and render["errors"] == 1
+    assert render["p50_seconds"] <= OPERATION_SECONDS.buckets[0]
+    assert summary["bytes"]["test_agent.render"] == {"in": 100, "out": 40}
+    assert summary["tokens"]["test_agent"] == {"prompt": 1000, "completion": 200}
+    assert summary["cost_usd"] == pytest.approx(1000 * 2.0 / 1e6 + 200 * 10.0 / 1e6)
+    assert summary["cache"]["test_cache"] == {"hit": 1, "miss": 2}
+    json.dumps(summary)
+
+
+def test_timer_can_stop_in_another_thread():
+    before = REGISTRY.snapshot()
+    timer = timed("test_agent", "generation").start()
+    timer.stop("error")
+    changes = diff(REGISTRY.snapshot(), before)[OPERATION_SECONDS.name]
+    assert [entry["labels"]["outcome"] for entry in changes] == ["error"]
@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from utils.perceptual_hash import DuplicateDetector, MultiIndexHashTable, _dct_matrix, dhash, hamming, phash
+
+
+def scene(seed, size=(640, 480)):
+    """Smooth synthetic photo: random low-resolution structure scaled up."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).resize(size, Image.Resampling.BICUBIC)
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = {}
+    for seed in (1, 2):
+        original = scene(seed)
+        paths[f"scene{seed}"] = str(tmp_path / f"scene{seed}.png")
+        original.save(paths[f"scene{seed}"])
+        # Re-saved smaller and more compressed, and a slightly brighter burst shot
+        paths[f"scene{seed}_small"] = str(tmp_path / f"scene{seed}_small.jpg")
+        original.resize((320, 240)).save(paths[f"scene{seed}_small"], quality=40)
+        paths[f"scene{seed}_bright"] = str(tmp_path / f"scene{seed}_bright.jpg")
+        ImageEnhance.Brightness(original).enhance(1.1).save(paths[f"scene{seed}_bright"], quality=85)
+    return paths
+
+
+@pytest.mark.parametrize("hash_function", [phash, dhash])
+def test_hashes_match_copies_and_separate_scenes(images, hash_function):
+    hashes = {name: hash_function(path) for name, path in images.items()}
+    assert all(0 <= value < 2 ** 64 for value in hashes.values())
+    for seed in (1, 2):
+        assert hamming(hashes[f"scene{seed}"], hashes[f"scene{seed}_small"]) <= 6
+        assert hamming(hashes[f"scene{seed}"], hashes[f"scene{seed}_bright"]) <= 6
+    assert hamming(hashes["scene1"], hashes["scene2"]) > 12
+
+
+def test_dct_matrix_is_orthonormal():
+    matrix = _dct_matrix(32).astype(np.float64)
+    assert np.allclose(matrix @ matrix.T, np.eye(32), atol=1e-5)
+
+
+def test_hash_size_sets_the_number_of_bits(images):
+    assert phash(images["scene1"], hash_size=16).bit_length() <= 256
+    assert dhash(images["scene1"], hash_size=4).bit_length() <= 16
+
+
+def test_multi_index_search_matches_a_linear_scan():
+    rng = random.Random(3)
+    table = MultiIndexHashTable(bits=64, max_distance=6)
+    stored = [rng.getrandbits(64) for _ in range(500)]
+    for index, value in enumerate(stored):
+        table.add(value, index)
+    assert len(table) == 500
+
+    queries = [stored[index] ^ sum(1 << bit for bit in rng.sample(range(64), flips))
+               for index, flips in ((rng.randrange(500), rng.randrange(10)) for _ in range(200))]
+    queries += [rng.getrandbits(64) for _ in range(50)]
+    for query in queries:
+        expected = sorted((hamming(query, value), index) for index, value in enumerate(stored)
+                          if hamming(query, value) <= 6)
+        assert sorted(table.search(query)) == expected
+
+
+def test_search_returns_the_closest_first():
+    table = MultiIndexHashTable(bits=64, max_distance=6)
+    table.add(0b111, "three bits")
+    table.add(0b1, "one bit")
+    table.add(0, "zero")
+    assert [item for _, item in table.search(0)] == ["zero", "one bit", "three bits"]
+
+
+def test_detector_groups_near_duplicates(images, tmp_path):
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    order = ["scene1", "scene2_small", "scene1_small", "scene2", "scene1_bright", "scene2_bright"]
+    paths = [images[name] for name in order] + [str(broken)]
+
+    clusters = DuplicateDetector().group(paths)
+    assert clusters == {
+        images["scene1"]: [images["scene1"], images["scene1_small"], images["scene1_bright"]],
+        images["scene2_small"]: [images["scene2_small"], images["scene2"], images["scene2_bright"]],
+        str(broken): [str(broken)],
+    }
+
+
+def test_detector_rejects_unknown_algorithms():
+    with pytest.raises(ValueError):
+        DuplicateDetector(algorithm="ahash")
+
+
+def test_detector_matches_remembered_representatives(images):
+    detector = DuplicateDetector()
+    value = detector.fingerprint(images["scene1"])
+    assert detector.decode(detector.encode(value)) == value
+    # Fingerprints computed with other settings are not comparable
+    assert DuplicateDetector(algorithm="dhash").decode(detector.encode(value)) is None
+
+    detector.remember(value, 42)
+    clusters = detector.group([images["scene1_small"], images["scene2"], images["scene1_bright"]])
+    assert clusters == {
+        42: [images["scene1_small"], images["scene1_bright"]],
+        images["scene2"]: [images["scene2"]],
+    }
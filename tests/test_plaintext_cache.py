@@ -0,0 +1,45 @@
+import pytest
+
+from utils.plaintext_cache import PlaintextCache
+
+
+@pytest.fixture
+def cache():
+    return PlaintextCache(max_bytes=10, max_item_bytes=6)
+
+
+def test_round_trip_and_miss(cache):
+    assert cache.get("missing") is None
+    cache.put("key", b"abc")
+    assert cache.get("key") == b"abc"
+    assert cache.current_bytes == 3
+
+
+def test_least_recently_used_items_are_evicted_to_fit_the_byte_budget(cache):
+    cache.put("a", b"aaa")
+    cache.put("b", b"bbb")
+    cache.put("c", b"ccc")
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", b"dd")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == [b"aaa", b"ccc", b"dd"]
+    assert cache.current_bytes == 8
+
+    # A large item can evict several small ones
+    cache.put("e", b"eeeeee")
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.current_bytes == 8
+
+
+def test_items_over_the_item_limit_are_not_cached(cache):
+    assert cache.accepts(6) and not cache.accepts(7)
+    cache.put("big", b"x" * 7)
+    assert cache.get("big") is None and cache.current_bytes == 0
+
+
+def test_replacing_an_item_and_clear(cache):
+    cache.put("a", b"aaaa")
+    cache.put("a", b"aa")
+    assert cache.get("a") == b"aa" and cache.current_bytes == 2
+    cache.clear()
+    assert cache.get("a") is None and cache.current_bytes == 0
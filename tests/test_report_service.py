@@ -0,0 +1,40 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from utils.futures import chain
+
+
+
+def test_reports_render_in_spawned_workers(tmp_path):
+    pytest.importorskip("matplotlib")
+    from utils.report_service import ReportService
+
+    service = ReportService(report_dir=str(tmp_path), formats=("txt", "png"), max_workers=1)
+    findings = {"Scene Description": "A kitchen.", "Key Observations": "Broken glass.",
+                "Environmental Conditions": "Night."}
+    evidence = [{"type": "Glass", "location": "floor"}, {"type": "Footprint", "location": "doorway"}]
+    try:
+        result = service.submit("case1", findings, evidence).result(timeout=120)
+    finally:
+        service.shutdown()
+    assert os.path.basename(result["report"]).startswith("case1-")
+    assert os.path.isfile(result["report"]) and os.path.isfile(result["graphs"])
+
+
+def test_chain_runs_the_continuation_in_an_executor():
+    source = Future()
+    threads = []
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="continuation") as executor:
+        chained = chain(source, lambda value: threads.append(threading.current_thread().name) or value * 2,
+                        executor=executor)
+        source.set_result(21)
+        assert chained.result(timeout=5) == 42
+    assert threads[0].startswith("continuation")
+
+    failed = Future()
+    failed.set_exception(ValueError("render failed"))
+    with pytest.raises(ValueError):
+        chain(failed, lambda value: value, executor=executor).result(timeout=5)
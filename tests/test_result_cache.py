@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from utils import result_cache
+from utils.result_cache import ResultCache, hash_file, make_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache("analysis", db_path=str(tmp_path / "results.db"), max_entries=3)
+
+
+def test_round_trip_and_miss(cache):
+    assert cache.get("missing") is None
+    cache.set("key", {"findings": {"Scene Description": "s"}, "evidence": [1, 2]})
+    assert cache.get("key") == {"findings": {"Scene Description": "s"}, "evidence": [1, 2]}
+
+
+def test_delete_and_clear(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    assert cache.get("a") is None and cache.get("b") == 2
+    cache.clear()
+    assert cache.get("b") is None
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(result_cache.time, "time", lambda: next(clock))
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("d", "d")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = ResultCache("narrative", db_path=str(tmp_path / "results.db"), ttl_seconds=60)
+    cache.set("key", "value")
+    now[0] += 59
+    assert cache.get("key") == "value"
+    now[0] += 2
+    assert cache.get("key") is None
+
+
+def test_namespaces_share_a_database(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    ResultCache("analysis", db_path=db_path).set("key", "analysis")
+    ResultCache("narrative", db_path=db_path).set("key", "narrative")
+    assert ResultCache("analysis", db_path=db_path).get("key") == "analysis"
+
+
+def test_invalid_namespace_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ResultCache("analysis; DROP TABLE x", db_path=str(tmp_path / "results.db"))
+
+
+def test_connections_are_closed(cache, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        opened.append(connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(result_cache.sqlite3, "connect", tracking_connect)
+    cache.set("key", "value")
+    cache.get("key")
+    cache.delete("key")
+    assert len(opened) == 3
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_writes_are_committed(cache, tmp_path):
+    cache.set("key", "value")
+    with sqlite3.connect(str(tmp_path / "results.db")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM analysis").fetchone() == (1,)
+    conn.close()
+
+
+def test_keys_and_file_hashes_are_stable(tmp_path):
+    assert make_key({"b": 1, "a": 2}, [1]) == make_key({"a": 2, "b": 1}, [1])
+    assert make_key("gpt-4o-mini", 0.7) != make_key("gpt-4o-mini", 0.5)
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"x" * 3_000_000)
+    assert hash_file(str(path), chunk_size=1024) == hash_file(str(path))
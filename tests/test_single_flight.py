@@ -0,0 +1,32 @@
+from concurrent.futures import Future
+
+from utils.single_flight import SingleFlight
+
+
+def test_single_flight_shares_asynchronous_calls():
+    group = SingleFlight()
+    started = []
+    inner = Future()
+
+    def start(value):
+        started.append(value)
+        return inner
+
+    futures = [group.do_async("key", start, index) for index in range(3)]
+    assert started == [0]
+    assert all(future is futures[0] for future in futures)
+    inner.set_result("video.mp4")
+    assert futures[0].result() == "video.mp4"
+
+    # The key is released once the call resolved
+    assert group.do_async("key", lambda: Future()) is not futures[0]
+
+
+def test_single_flight_propagates_start_errors():
+    group = SingleFlight()
+
+    def start():
+        raise ConnectionError("down")
+
+    future = group.do_async("key", start)
+    assert isinstance(future.exception(timeout=1), ConnectionError)
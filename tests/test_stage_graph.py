@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from utils.result_cache import ResultCache
+from utils.stage_graph import StageGraph
+
+
+class Calls:
+    """Counts stage calls, by stage name."""
+
+    def __init__(self):
+        self.names = []
+        self.lock = threading.Lock()
+
+    def __call__(self, name, func):
+        def stage(*arguments):
+            with self.lock:
+                self.names.append(name)
+            return func(*arguments)
+        return stage
+
+    def take(self):
+        names, self.names = sorted(self.names), []
+        return names
+
+
+@pytest.fixture
+def memo(tmp_path):
+    return ResultCache("stages", db_path=str(tmp_path / "memo.db"))
+
+
+def make_graph(memo, calls, settings=None, valid=None):
+    graph = StageGraph(memo=memo, max_workers=2)
+    graph.add("words", calls("words", lambda text: text.split()), inputs=("text",))
+    graph.add("count", calls("count", lambda words: len(words)), inputs=("words",),
+              settings=settings, valid=valid)
+    graph.add("upper", calls("upper", lambda words: [word.upper() for word in words]), inputs=("words",))
+    graph.add("report", calls("report", lambda count, upper: f"{count}: {' '.join(upper)}"),
+              inputs=("count", "upper"))
+    return graph
+
+
+def test_outputs_are_memoized(memo):
+    calls = Calls()
+    graph = make_graph(memo, calls)
+    assert graph.run({"text": "a knife"})["report"] == "2: A KNIFE"
+    assert calls.take() == ["count", "report", "upper", "words"]
+
+    # Same input: every stage is served from the memo
+    assert graph.run({"text": "a knife"}) == {"words": ["a", "knife"], "count": 2, "upper": ["A", "KNIFE"],
+                                              "report": "2: A KNIFE"}
+    assert calls.take() == []
+
+    # New input: the stages run again
+    assert graph.run({"text": "a glove"})["report"] == "2: A GLOVE"
+    assert calls.take() == ["count", "report", "upper", "words"]
+
+
+def test_downstream_stages_are_keyed_by_outputs(memo):
+    calls = Calls()
+    graph = make_graph(memo, calls)
+    graph.run({"text": "a knife"})
+    calls.take()
+
+    # Different input, same words: only the first stage runs again
+    graph.run({"text": "  a   knife "})
+    assert calls.take() == ["words"]
+
+
+def test_settings_are_part_of_the_memo_key(memo):
+    calls = Calls()
+    settings = {"model": "gpt-4o-mini"}
+    graph = make_graph(memo, calls, settings=lambda: settings)
+    graph.run({"text": "a knife"})
+    calls.take()
+
+    settings["model"] = "gpt-4o"
+    graph.run({"text": "a knife"})
+    assert calls.take() == ["count"]
+
+
+def test_invalid_memoized_output_runs_again(memo):
+    calls = Calls()
+    still_valid = {"count": True}
+    graph = make_graph(memo, calls, valid=lambda output: still_valid["count"])
+    graph.run({"text": "a knife"})
+    calls.take()
+
+    still_valid["count"] = False
+    assert graph.run({"text": "a knife"})["report"] == "2: A KNIFE"
+    assert calls.take() == ["count"]
+
+
+@pytest.mark.parametrize("failure", [lambda words: None, lambda words: 1 / 0])
+def test_dependents_of_a_failed_stage_are_skipped(memo, failure):
+    calls = Calls()
+    graph = StageGraph(memo=memo)
+    graph.add("words", calls("words", lambda text: text.split()), inputs=("text",))
+    graph.add("count", calls("count", failure), inputs=("words",))
+    graph.add("upper", calls("upper", lambda words: [word.upper() for word in words]), inputs=("words",))
+    graph.add("report", calls("report", lambda count, upper: "never"), inputs=("count", "upper"))
+
+    outputs = graph.run({"text": "a knife"})
+    assert sorted(outputs) == ["upper", "words"]
+    assert calls.take() == ["count", "upper", "words"]
+
+    # Failures are not memoized
+    graph.run({"text": "a knife"})
+    assert calls.take() == ["count"]
+
+
+def test_targets_prune_the_stages_that_run(memo):
+    calls = Calls()
+    graph = make_graph(memo, calls)
+    assert graph.required(["count"]) == {"words", "count"}
+    assert graph.run({"text": "a knife"}, targets=["count"]) == {"words": ["a", "knife"], "count": 2}
+    assert calls.take() == ["count", "words"]
+
+
+def test_runs_are_independent(memo):
+    calls = Calls()
+    graph = make_graph(memo, calls)
+    results = graph.run_many([({"text": "a knife"}, None), ({"text": "one blood stain"}, None)])
+    assert [result["report"] for result in results] == ["2: A KNIFE", "3: ONE BLOOD STAIN"]
+
+
+def test_asynchronous_stages_hold_no_worker(memo):
+    pending = {}
+
+    def start(text):
+        pending[text] = Future()
+        return pending[text]
+
+    graph = StageGraph(memo=memo, max_workers=1)
+    graph.add("render", start, inputs=("text",))
+    graph.add("length", lambda rendered: len(rendered), inputs=("render",))
+
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(graph.run_many(
+        [({"text": text}, None) for text in ("a", "b", "c")])))
+    thread.start()
+    # One worker started the three renders: none of them holds it while pending
+    for _ in range(500):
+        if len(pending) == 3:
+            break
+        time.sleep(0.01)
+    assert sorted(pending) == ["a", "b", "c"]
+
+    pending["a"].set_result("rendered a")
+    pending["b"].set_result("rendered bb")
+    pending["c"].set_exception(RuntimeError("render failed"))
+    thread.join(timeout=5)
+    assert results == [{"render": "rendered a", "length": 10}, {"render": "rendered bb", "length": 11}, {}]
+
+    # Resolved outputs were memoized
+    assert graph.run({"text": "a"}) == {"render": "rendered a", "length": 10}
+
+
+def test_invalid_graphs_are_rejected():
+    graph = StageGraph()
+    graph.add("a", lambda b: b, inputs=("b",))
+    graph.add("b", lambda a: a, inputs=("a",))
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run({})
+    with pytest.raises(ValueError, match="Duplicate"):
+        graph.add("a", lambda: 1)
+
+    graph = StageGraph()
+    graph.add("a", lambda missing: missing, inputs=("missing",))
+    with pytest.raises(ValueError, match="unknown input"):
+        graph.run({})
@@ -0,0 +1,88 @@
+import io
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from utils.stream_cipher import HEADER_SIZE, TAG_SIZE, StreamCipher, is_stream_encrypted
+
+CHUNK_SIZE = 1024
+
+
+@pytest.fixture
+def cipher():
+    return StreamCipher(Fernet.generate_key(), chunk_size=CHUNK_SIZE)
+
+
+def encrypt(cipher, plaintext):
+    container = io.BytesIO()
+    assert cipher.encrypt_stream(io.BytesIO(plaintext), container) == len(plaintext)
+    return container.getvalue()
+
+
+def decrypt(cipher, container):
+    plaintext = io.BytesIO()
+    cipher.decrypt_stream(io.BytesIO(container), plaintext)
+    return plaintext.getvalue()
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 5 * CHUNK_SIZE, 5 * CHUNK_SIZE + 17])
+def test_round_trip(cipher, size):
+    plaintext = os.urandom(size)
+    container = encrypt(cipher, plaintext)
+    assert is_stream_encrypted(container)
+    assert decrypt(cipher, container) == plaintext
+
+
+@pytest.mark.parametrize("size", [0, CHUNK_SIZE, 3 * CHUNK_SIZE + 5])
+def test_plaintext_size_without_decrypting(cipher, size):
+    container = encrypt(cipher, os.urandom(size))
+    assert cipher.plaintext_size(io.BytesIO(container), len(container)) == (size, CHUNK_SIZE)
+
+
+@pytest.mark.parametrize("start,stop", [(0, 1), (0, 4100), (1000, 1100), (1023, 1025), (2048, 3072), (4000, 9999), (4100, 4200)])
+def test_decrypt_range(cipher, start, stop):
+    plaintext = os.urandom(4 * CHUNK_SIZE + 7)
+    container = encrypt(cipher, plaintext)
+    chunks = cipher.decrypt_range(io.BytesIO(container), len(container), start, stop)
+    assert b"".join(chunks) == plaintext[start:stop]
+
+
+def test_tampered_chunk_is_rejected(cipher):
+    container = bytearray(encrypt(cipher, os.urandom(3 * CHUNK_SIZE)))
+    container[HEADER_SIZE + CHUNK_SIZE + TAG_SIZE + 5] ^= 1
+    with pytest.raises(ValueError, match="chunk 1"):
+        decrypt(cipher, bytes(container))
+
+
+def test_truncation_at_a_chunk_boundary_is_rejected(cipher):
+    container = encrypt(cipher, os.urandom(3 * CHUNK_SIZE))
+    # Dropping the final chunk leaves a well-formed prefix whose last chunk is not flagged as last
+    with pytest.raises(ValueError):
+        decrypt(cipher, container[:HEADER_SIZE + 2 * (CHUNK_SIZE + TAG_SIZE)])
+
+
+def test_reordered_chunks_are_rejected(cipher):
+    container = encrypt(cipher, os.urandom(3 * CHUNK_SIZE))
+    sealed = CHUNK_SIZE + TAG_SIZE
+    body = container[HEADER_SIZE:]
+    swapped = container[:HEADER_SIZE] + body[sealed:2 * sealed] + body[:sealed] + body[2 * sealed:]
+    with pytest.raises(ValueError):
+        decrypt(cipher, swapped)
+
+
+def test_header_tampering_is_rejected(cipher):
+    container = bytearray(encrypt(cipher, os.urandom(100)))
+    container[HEADER_SIZE - 1] ^= 1  # Last byte of the nonce prefix
+    with pytest.raises(ValueError):
+        decrypt(cipher, bytes(container))
+
+
+def test_wrong_key_is_rejected(cipher):
+    container = encrypt(cipher, b"evidence")
+    with pytest.raises(ValueError):
+        decrypt(StreamCipher(Fernet.generate_key()), container)
+
+
+def test_legacy_fernet_tokens_are_not_containers():
+    assert not is_stream_encrypted(Fernet(Fernet.generate_key()).encrypt(b"evidence"))
@@ -0,0 +1,44 @@
+import threading
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+class ChartRenderer:
+    def __init__(self, width=6.4, height=4.8, dpi=100):
+        """
+        Initializes a reusable chart renderer. Charts are drawn on one object-oriented Figure with an
+        Agg canvas, never through pyplot, so there is no global figure state to leak or to contend on,
+        and the axes are cleared and reused instead of building a new figure for every chart.
+        :param width: Figure width in inches.
+        :param height: Figure height in inches.
+        :param dpi: Resolution of the saved images.
+        """
+        self.figure = Figure(figsize=(width, height), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.figure.subplots_adjust(bottom=0.25)  # Room for rotated category labels
+        self._lock = threading.Lock()
+
+    def bar_chart(self, labels, values, path, title="", xlabel="", ylabel="", color="blue"):
+        """
+        Renders a bar chart to a PNG file.
+        :param labels: Bar labels.
+        :param values: Bar heights.
+        :param path: Output file path (or a writable binary file object).
+        :return: The path.
+        """
+        with self._lock:
+            self.axes.clear()
+            draw_bar_chart(self.axes, labels, values, title, xlabel, ylabel, color)
+            self.canvas.print_png(path)
+            return path
+
+
+def draw_bar_chart(axes, labels, values, title="", xlabel="", ylabel="", color="blue"):
+    """Draws a bar chart on existing axes (shared by PNG charts and PDF pages)."""
+    axes.bar(list(labels), list(values), color=color, alpha=0.7)
+    axes.set_title(title)
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+    axes.tick_params(axis="x", labelrotation=45)
@@ -0,0 +1,133 @@
+import os
+import threading
+
+import httpx
+import openai
+import lumaai
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.config_loader import load_config
+from utils.env_loader import load_env
+from utils.metrics import HTTP_REQUESTS, RETRIES
+
+# One pooled client per provider, shared by every agent in the process
+_clients = {}
+_lock = threading.Lock()
+
+
+def _client_config(provider):
+    return load_config().get("clients", {}).get(provider, {})
+
+
+def _limits(config):
+    return httpx.Limits(
+        max_connections=config.get("max_connections", 20),
+        max_keepalive_connections=config.get("max_keepalive_connections", 10),
+        keepalive_expiry=config.get("keepalive_expiry", 30.0)
+    )
+
+
+def _timeout(config):
+    return httpx.Timeout(config.get("timeout", 60.0), connect=config.get("connect_timeout", 10.0))
+
+
+def _request_hooks(provider, key_variable=None):
+    """
+    httpx event hooks counting the requests of a provider, and the retries the SDK makes.
+    :param key_variable: Optional environment variable holding the provider's API key. Every request then
+                         carries its current value: config/.env is checked for changes (a stat, re-read
+                         only when it changed), so an edited key applies without rebuilding the shared client.
+    """
+    def count(request):
+        HTTP_REQUESTS.inc(provider=provider)
+        # The SDKs number their attempts in this header
+        if request.headers.get("x-stainless-retry-count", "0") != "0":
+            RETRIES.inc(component=provider, reason="http")
+
+    def authorize(request):
+        try:
+            load_env()
+        except FileNotFoundError:
+            pass
+        api_key = os.getenv(key_variable)
+        if api_key:
+            request.headers["Authorization"] = f"Bearer {api_key}"
+
+    return {"request": [count] if key_variable is None else [count, authorize]}
+
+
+def _get_or_create(provider, factory):
+    with _lock:
+        if provider not in _clients:
+            _clients[provider] = factory()
+        return _clients[provider]
+
+
+def get_openai_client():
+    """
+    Returns the process-wide OpenAI client with a keep-alive connection pool.
+    The client is thread-safe, so every agent and worker thread shares it, and its requests use the
+    current OPENAI_API_KEY (see _request_hooks).
+    :return: openai.OpenAI instance.
+    """
+    def create():
+        load_env()
+        config = _client_config("openai")
+        return openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=config.get("max_retries", 2),
+            http_client=openai.DefaultHttpxClient(
+                limits=_limits(config), timeout=_timeout(config),
+                event_hooks=_request_hooks("openai", "OPENAI_API_KEY")
+            )
+        )
+    return _get_or_create("openai", create)
+
+
+def get_luma_client():
+    """
+    Returns the process-wide LumaAI client with a keep-alive connection pool; its requests use the
+    current LUMAAI_API_KEY (see _request_hooks).
+    :return: lumaai.LumaAI instance.
+    """
+    def create():
+        load_env()
+        config = _client_config("luma")
+        return lumaai.LumaAI(
+            auth_token=os.getenv("LUMAAI_API_KEY"),
+            max_retries=config.get("max_retries", 2),
+            http_client=lumaai.DefaultHttpxClient(
+                limits=_limits(config), timeout=_timeout(config),
+                event_hooks=_request_hooks("luma", "LUMAAI_API_KEY")
+            )
+        )
+    return _get_or_create("luma", create)
+
+
+def get_http_session():
+    """
+    Returns the process-wide requests.Session used for plain HTTP downloads.
+    :return: requests.Session with a connection pool sized from the config.
+    """
+    def create():
+        config = _client_config("http")
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.get("pool_connections", 10),
+            pool_maxsize=config.get("pool_maxsize", 10),
+            max_retries=config.get("max_retries", 0)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    return _get_or_create("http", create)
+
+
+def close_clients():
+    """Closes every pooled client, e.g. before a worker process exits."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -1,13 +1,97 @@
-import yaml
+import copy
+import logging
 import os
+import threading
+
+import yaml
+
+# Parsed configuration per file: path -> (file signature, frozen snapshot)
+_snapshots = {}
+_lock = threading.Lock()
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Configuration snapshots are shared and read-only; copy the section (dict(...), list(...)) to modify it")
+
+
+class FrozenDict(dict):
+    """A dict that cannot be modified, so callers keep plain dict behavior (isinstance, json.dumps)."""
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+class FrozenList(list):
+    """A list that cannot be modified; copies (list(...), copy.deepcopy) are regular lists."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(item, memo) for item in self]
+
+
+def _signature(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _freeze(value):
+    """Recursively turns parsed YAML into read-only dicts and lists."""
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(_freeze(item) for item in value)
+    return value
+
 
 def load_config(file_path="config/config.yaml"):
     """
     Loads configuration from the specified YAML file.
+    The file is parsed once and re-parsed only when its modification time or size changes,
+    so edits reach callers without a restart. If a changed file fails to parse, the last good
+    configuration keeps being served.
     :param file_path: Path to the YAML configuration file.
-    :return: Parsed configuration dictionary.
+    :return: Configuration snapshot shared between callers. Sections are dicts and lists (JSON-serializable)
+             that raise TypeError when modified; copy a section to change it.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Configuration file not found: {file_path}")
-    with open(file_path, "r") as file:
-        return yaml.safe_load(file)
+    path = os.path.abspath(file_path)
+    signature = _signature(path)
+
+    cached = _snapshots.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _lock:
+        cached = _snapshots.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            with open(path, "r") as file:
+                snapshot = _freeze(yaml.safe_load(file) or {})
+        except yaml.YAMLError as e:
+            if cached is None:
+                raise
+            logging.error(f"Error reloading configuration {path}, keeping the previous version: {e}")
+            snapshot = cached[1]
+        else:
+            if cached is not None:
+                logging.info(f"Configuration reloaded: {path}")
+        _snapshots[path] = (signature, snapshot)
+        return snapshot
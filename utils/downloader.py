@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import RETRIES
+
+
+class RangedDownloader:
+    def __init__(self, session=None, segments=4, buffer_size=1024 * 1024, min_segment_size=4 * 1024 * 1024,
+                 timeout=60, retries=3, state_interval=1.0, state_bytes=16 * 1024 * 1024):
+        """
+        Initializes a resumable downloader that fetches large files as parallel HTTP Range segments.
+        :param session: requests.Session to reuse; a pooled session is created when omitted.
+        :param segments: Maximum number of segments downloaded in parallel.
+        :param buffer_size: Bytes read from the network per write.
+        :param min_segment_size: Files are not split into segments smaller than this.
+        :param timeout: Connect/read timeout of every request, in seconds.
+        :param retries: Attempts per segment before the download fails (progress is kept between attempts).
+        :param state_interval: Seconds between two saves of the progress file.
+        :param state_bytes: Bytes downloaded after which the progress file is saved, whatever the interval.
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=segments, pool_maxsize=segments)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.segments = segments
+        self.buffer_size = buffer_size
+        self.min_segment_size = min_segment_size
+        self.timeout = timeout
+        self.retries = retries
+        self.state_interval = state_interval
+        self.state_bytes = state_bytes
+
+    def download(self, url, destination):
+        """
+        Downloads a URL to a file. Data goes to "<destination>.part" and progress to "<destination>.part.json",
+        so an interrupted download resumes where it stopped; the file only appears under its final name,
+        via an atomic rename, once its size has been verified.
+        :param url: URL to download.
+        :param destination: Final path of the file.
+        :return: The destination path.
+        """
+        part_path = destination + ".part"
+        state_path = part_path + ".json"
+        size, ranges_supported = self._probe(url)
+
+        if size is None or not ranges_supported:
+            self._download_stream(url, part_path, size, resume=ranges_supported)
+        else:
+            self._download_segments(url, part_path, state_path, size)
+
+        actual_size = os.path.getsize(part_path)
+        if size is not None and actual_size != size:
+            raise IOError(f"Downloaded size {actual_size} does not match expected size {size} for {url}")
+
+        os.replace(part_path, destination)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return destination
+
+    def _probe(self, url):
+        """
+        Finds the size of a file and whether the server honors Range requests.
+        :return: Tuple (size or None, whether ranges are supported).
+        """
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            # Presigned and CDN URLs often reject HEAD; a one-byte ranged GET answers the same questions
+            logging.info(f"HEAD failed for {url}, probing with a ranged GET instead: {e}")
+            return self._probe_with_get(url)
+
+        length = response.headers.get("Content-Length")
+        size = int(length) if length is not None and length.isdigit() else None
+        ranges_supported = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return size, ranges_supported
+
+    def _probe_with_get(self, url):
+        with self.session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                # Content-Range: bytes 0-0/<size> (the size may be "*" when unknown)
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                return (int(total) if total.isdigit() else None), True
+            # The whole file is coming back: ranges are not supported, and the body is not read
+            length = response.headers.get("Content-Length")
+            return (int(length) if length is not None and length.isdigit() else None), False
+
+    def _download_stream(self, url, part_path, size, resume):
+        """Single-connection download, resuming from an existing .part file when the server allows it."""
+        offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+        if size is not None and offset >= size:
+            return
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                offset = 0  # Server ignored the range; start over
+            with open(part_path, "r+b" if offset else "wb") as part_file:
+                part_file.seek(offset)
+                for chunk in response.iter_content(chunk_size=self.buffer_size):
+                    part_file.write(chunk)
+
+    def _download_segments(self, url, part_path, state_path, size):
+        """Parallel ranged download with per-segment progress persisted next to the .part file."""
+        state = self._load_state(state_path, size)
+        if state is None or not os.path.exists(part_path):
+            count = max(1, min(self.segments, size // self.min_segment_size))
+            bounds = [size * index // count for index in range(count + 1)]
+            state = {"size": size, "segments": [[bounds[i], bounds[i + 1], 0] for i in range(count)]}
+            with open(part_path, "wb") as part_file:
+                part_file.truncate(size)
+            self._save_state(state_path, state)
+
+        progress = {"path": state_path, "lock": threading.Lock(), "saved_at": time.monotonic(), "unsaved": 0}
+        pending = [segment for segment in state["segments"] if segment[0] + segment[2] < segment[1]]
+        try:
+            if pending:
+                with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="download") as pool:
+                    futures = [
+                        pool.submit(self._download_segment, url, part_path, state, segment, progress)
+                        for segment in pending
+                    ]
+                    for future in futures:
+                        future.result()
+        finally:
+            # Whatever happened, the progress made is kept for the next attempt
+            with progress["lock"]:
+                self._save_state(state_path, state)
+
+    def _record_progress(self, state, segment, done, progress):
+        """Updates a segment's progress; the progress file is saved every state_interval seconds or state_bytes."""
+        with progress["lock"]:
+            progress["unsaved"] += done - segment[2]
+            segment[2] = done
+            if progress["unsaved"] >= self.state_bytes or time.monotonic() - progress["saved_at"] >= self.state_interval:
+                self._save_state(progress["path"], state)
+                progress["saved_at"] = time.monotonic()
+                progress["unsaved"] = 0
+
+    def _download_segment(self, url, part_path, state, segment, progress):
+        start, end, _ = segment
+        for attempt in range(1, self.retries + 1):
+            offset = start + segment[2]
+            if offset >= end:
+                return
+            try:
+                headers = {"Range": f"bytes={offset}-{end - 1}"}
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code != 206:
+                        raise IOError(f"Server did not honor range request (HTTP {response.status_code})")
+                    with open(part_path, "r+b") as part_file:
+                        part_file.seek(offset)
+                        for chunk in response.iter_content(chunk_size=self.buffer_size):
+                            chunk = chunk[:end - offset]
+                            part_file.write(chunk)
+                            offset += len(chunk)
+                            # Data is flushed before the progress that covers it can be saved
+                            part_file.flush()
+                            self._record_progress(state, segment, offset - start, progress)
+                if offset >= end:
+                    return
+                raise IOError(f"Segment {start}-{end} ended early at {offset}")
+            except (requests.RequestException, IOError) as e:
+                logging.warning(f"Segment {start}-{end} of {url} failed (attempt {attempt}/{self.retries}): {e}")
+                if attempt == self.retries:
+                    raise
+                RETRIES.inc(component="downloader", reason="segment")
+
+    def _load_state(self, state_path, size):
+        try:
+            with open(state_path, "r") as state_file:
+                state = json.load(state_file)
+            return state if state.get("size") == size else None
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, state_path, state):
+        temp_path = state_path + ".tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, state_path)
@@ -1,12 +1,37 @@
 import os
-from dotenv import load_dotenv
+import threading
+from dotenv import dotenv_values
+
+# Loaded .env files: path -> (file signature, names of the variables taken from the file)
+_loaded = {}
+_lock = threading.Lock()
+
 
 def load_env(file_path="config/.env"):
     """
     Loads environment variables from the specified .env file.
+    The file is only re-read when its modification time or size changes; variables that came from
+    the file are then updated or unset, while variables set in the real environment keep precedence.
     :param file_path: Path to the .env file.
     :return: None
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f".env file not found: {file_path}")
-    load_dotenv(dotenv_path=file_path)
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        loaded = _loaded.get(path)
+        if loaded is not None and loaded[0] == signature:
+            return
+        previous = loaded[1] if loaded is not None else set()
+        owned = set()
+        for name, value in dotenv_values(path).items():
+            if value is not None and (name in previous or name not in os.environ):
+                os.environ[name] = value
+                owned.add(name)
+        # Variables removed from the file are unset as well
+        for name in previous - owned:
+            os.environ.pop(name, None)
+        _loaded[path] = (signature, owned)
@@ -0,0 +1,229 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+# Artifact kinds recorded by the pipeline
+INPUT = "input"
+ENCRYPTED = "encrypted"
+REPORT = "report"
+GRAPH = "graph"
+NARRATIVE = "narrative"
+VIDEO = "video"
+
+COLUMNS = (
+    "id", "kind", "path", "sha256", "size", "parent_id", "created_at", "updated_at", "deleted_at", "fingerprint"
+)
+
+
+class EvidenceIndex:
+    def __init__(self, db_path="data/evidence/index.db"):
+        """
+        Initializes the persistent evidence index, which records every artifact and how they relate.
+        :param db_path: Path to the SQLite database file.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "kind TEXT NOT NULL, "
+                "path TEXT NOT NULL UNIQUE, "
+                "sha256 TEXT, "
+                "size INTEGER, "
+                "parent_id INTEGER REFERENCES artifacts(id), "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "deleted_at REAL, "
+                "fingerprint TEXT)"
+            )
+            # Indexes created before perceptual fingerprints were recorded
+            if "fingerprint" not in {row[1] for row in conn.execute("PRAGMA table_info(artifacts)")}:
+                conn.execute("ALTER TABLE artifacts ADD COLUMN fingerprint TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, deleted_at, updated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_sha256 ON artifacts (sha256)")
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_parent ON artifacts (parent_id)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # sqlite3's own context manager only commits or rolls back; the connection is closed here
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _row(self, row):
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def record(self, kind, path, sha256=None, parent=None, fingerprint=None):
+        """
+        Records (or refreshes) an artifact.
+        :param kind: Artifact kind (INPUT, ENCRYPTED, REPORT, GRAPH, NARRATIVE or VIDEO).
+        :param path: Path of the artifact on disk.
+        :param sha256: Optional content hash.
+        :param parent: Optional path or ID of the artifact this one was derived from.
+        :param fingerprint: Optional perceptual hash of an input image (see DuplicateDetector.encode).
+        :return: ID of the artifact.
+        """
+        path = os.path.abspath(path)
+        size = os.path.getsize(path) if os.path.isfile(path) else None
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            parent_id = self._resolve(conn, parent)
+            conn.execute(
+                "INSERT INTO artifacts (kind, path, sha256, size, parent_id, created_at, updated_at, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET kind = excluded.kind, "
+                "sha256 = COALESCE(excluded.sha256, sha256), size = excluded.size, "
+                "parent_id = COALESCE(excluded.parent_id, parent_id), "
+                "fingerprint = COALESCE(excluded.fingerprint, fingerprint), "
+                "updated_at = excluded.updated_at, deleted_at = NULL",
+                (kind, path, sha256, size, parent_id, now, now, fingerprint),
+            )
+            return conn.execute("SELECT id FROM artifacts WHERE path = ?", (path,)).fetchone()[0]
+
+    def _resolve(self, conn, artifact):
+        if artifact is None or isinstance(artifact, int):
+            return artifact
+        row = conn.execute("SELECT id FROM artifacts WHERE path = ?", (os.path.abspath(artifact),)).fetchone()
+        return row[0] if row else None
+
+    def get(self, path):
+        """Returns the artifact recorded for a path, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM artifacts WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+            return self._row(row)
+
+    def latest(self, kind):
+        """
+        Returns the most recently recorded live artifact of a kind.
+        :param kind: Artifact kind.
+        :return: Artifact dictionary, or None.
+        """
+        artifacts = self.list(kind, limit=1)
+        return artifacts[0] if artifacts else None
+
+    def list(self, kind, limit=None):
+        """
+        Lists live artifacts of a kind, newest first.
+        :param kind: Artifact kind.
+        :param limit: Optional maximum number of artifacts.
+        :return: List of artifact dictionaries.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM artifacts WHERE kind = ? AND deleted_at IS NULL "
+                "ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (kind, -1 if limit is None else limit),
+            ).fetchall()
+            return [self._row(row) for row in rows]
+
+    def find_by_hash(self, sha256, kind=INPUT):
+        """Returns the newest artifact of a kind with the given content hash, including deleted ones."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM artifacts WHERE sha256 = ? AND kind = ? "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (sha256, kind),
+            ).fetchone()
+            return self._row(row)
+
+    def is_processed(self, sha256):
+        """
+        Tells whether an input with this content hash was already encrypted (and its encrypted copy
+        still exists), which is the last step the pipeline takes for an image.
+        :param sha256: Content hash of the input image.
+        :return: True if the image was processed.
+        """
+        return self.processed_input(sha256) is not None
+
+    def processed_input(self, sha256):
+        """
+        Returns the input artifact with this content hash that was already encrypted (see is_processed).
+        :param sha256: Content hash of the input image.
+        :return: Artifact dictionary, or None.
+        """
+        columns = ", ".join(f"input.{column}" for column in COLUMNS)
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {columns} FROM artifacts AS input JOIN artifacts AS encrypted ON encrypted.parent_id = input.id "
+                "WHERE input.sha256 = ? AND input.kind = ? AND encrypted.kind = ? AND encrypted.deleted_at IS NULL "
+                "ORDER BY encrypted.updated_at DESC LIMIT 1",
+                (sha256, INPUT, ENCRYPTED),
+            ).fetchone()
+            return self._row(row)
+
+    def processed_fingerprints(self):
+        """
+        Lists the perceptual fingerprints of processed case representatives: inputs with no parent whose
+        encrypted copy still exists (see processed_input).
+        :return: List of (fingerprint, artifact ID) tuples, oldest first.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT input.fingerprint, input.id FROM artifacts AS input "
+                "JOIN artifacts AS encrypted ON encrypted.parent_id = input.id "
+                "WHERE input.kind = ? AND input.parent_id IS NULL AND input.fingerprint IS NOT NULL "
+                "AND encrypted.kind = ? AND encrypted.deleted_at IS NULL ORDER BY input.id",
+                (INPUT, ENCRYPTED),
+            ).fetchall()
+            return rows
+
+    def children(self, artifact, kind=None):
+        """
+        Lists live artifacts derived from another one.
+        :param artifact: Path or ID of the parent artifact.
+        :param kind: Optional kind filter.
+        :return: List of artifact dictionaries, newest first.
+        """
+        with self._connect() as conn:
+            parent_id = self._resolve(conn, artifact)
+            query = f"SELECT {', '.join(COLUMNS)} FROM artifacts WHERE parent_id = ? AND deleted_at IS NULL"
+            params = [parent_id]
+            if kind is not None:
+                query += " AND kind = ?"
+                params.append(kind)
+            rows = conn.execute(query + " ORDER BY updated_at DESC", params).fetchall()
+            return [self._row(row) for row in rows]
+
+    def mark_deleted(self, path):
+        """Marks an artifact as deleted from disk while keeping its history."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE artifacts SET deleted_at = ? WHERE path = ?", (time.time(), os.path.abspath(path))
+            )
+
+    def mark_kind_deleted(self, kind):
+        """Marks every artifact of a kind as deleted."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE artifacts SET deleted_at = ? WHERE kind = ? AND deleted_at IS NULL", (time.time(), kind)
+            )
+
+    def sync_directory(self, kind, directory, extensions):
+        """
+        Records files already present in a directory that the index does not know about yet,
+        and marks indexed files of that kind which disappeared from it as deleted.
+        :param kind: Artifact kind for the files.
+        :param directory: Directory to scan.
+        :param extensions: Tuple of accepted file extensions.
+        """
+        if not os.path.exists(directory):
+            return
+        directory = os.path.abspath(directory)
+        present = {
+            os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(extensions)
+        }
+        known = {artifact["path"] for artifact in self.list(kind) if os.path.dirname(artifact["path"]) == directory}
+        for path in present - known:
+            self.record(kind, path)
+        for path in known - present:
+            self.mark_deleted(path)
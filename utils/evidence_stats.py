@@ -0,0 +1,108 @@
+import numpy as np
+
+UNKNOWN = "Unknown"
+
+
+class EvidenceStats:
+    def __init__(self, types, locations, cases, type_counts, location_counts, crosstab, case_counts, case_types):
+        """
+        Aggregated evidence statistics; build instances with aggregate_evidence().
+        :param types: Distinct evidence types, most frequent first.
+        :param locations: Distinct locations, most frequent first.
+        :param cases: Distinct case identifiers, in first-seen order.
+        :param type_counts: Count per type (aligned with types).
+        :param location_counts: Count per location (aligned with locations).
+        :param crosstab: Matrix of counts, rows are types and columns are locations.
+        :param case_counts: Number of evidence items per case (aligned with cases).
+        :param case_types: Matrix of counts, rows are cases and columns are types.
+        """
+        self.types = types
+        self.locations = locations
+        self.cases = cases
+        self.type_counts = type_counts
+        self.location_counts = location_counts
+        self.crosstab = crosstab
+        self.case_counts = case_counts
+        self.case_types = case_types
+
+    @property
+    def total(self):
+        return int(self.type_counts.sum())
+
+    def counts(self):
+        """Returns {type: count}, most frequent first."""
+        return dict(zip(self.types, self.type_counts.tolist()))
+
+    def location_crosstab(self):
+        """Returns {type: {location: count}} with only non-zero cells."""
+        return {
+            etype: {self.locations[j]: int(row[j]) for j in np.flatnonzero(row)}
+            for etype, row in zip(self.types, self.crosstab)
+        }
+
+    def per_case(self):
+        """Returns {case: {"items", "distinct_types", "most_common_type"}} for every case."""
+        summary = {}
+        for case, count, row in zip(self.cases, self.case_counts.tolist(), self.case_types):
+            summary[case] = {
+                "items": count,
+                "distinct_types": int(np.count_nonzero(row)),
+                "most_common_type": self.types[int(row.argmax())] if count else None,
+            }
+        return summary
+
+
+def _factorize(values):
+    """Maps values to integer codes in one pass; returns (distinct values, codes, counts)."""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+    return list(index), codes, np.bincount(codes, minlength=len(index))
+
+
+def _by_frequency(uniques, codes, counts):
+    """Re-labels factorized values so that code 0 is the most frequent (ties keep first-seen order)."""
+    order = np.argsort(-counts, kind="stable")
+    relabel = np.empty_like(order)
+    relabel[order] = np.arange(len(order))
+    return [uniques[i] for i in order], relabel[codes], counts[order]
+
+
+def aggregate_evidence(evidence_data, case_ids=None):
+    """
+    Computes evidence counts, type x location cross-tabulation and per-case statistics in one pass.
+    Every item is factorized once; all tables are then built with bincount over the integer codes.
+    :param evidence_data: List of evidence dictionaries with "type" and "location" keys.
+    :param case_ids: Optional case identifier per item (e.g. the source image); defaults to a single case.
+    :return: EvidenceStats.
+    """
+    items = [item for item in evidence_data if isinstance(item, dict)]
+    if case_ids is None:
+        case_ids = ["case"] * len(items)
+    elif len(case_ids) != len(evidence_data):
+        raise ValueError("case_ids must have one entry per evidence item")
+    else:
+        case_ids = [case for case, item in zip(case_ids, evidence_data) if isinstance(item, dict)]
+
+    if not items:
+        empty = np.zeros(0, dtype=np.int64)
+        return EvidenceStats([], [], [], empty, empty, np.zeros((0, 0), dtype=np.int64), empty,
+                             np.zeros((0, 0), dtype=np.int64))
+
+    types, type_codes, type_counts = _by_frequency(
+        *_factorize([str(item.get("type") or UNKNOWN).strip() or UNKNOWN for item in items])
+    )
+    locations, location_codes, location_counts = _by_frequency(
+        *_factorize([str(item.get("location") or UNKNOWN).strip() or UNKNOWN for item in items])
+    )
+
+    # Cases keep their first-seen order
+    cases, case_codes, _ = _factorize(case_ids)
+
+    n_types, n_locations, n_cases = len(types), len(locations), len(cases)
+    crosstab = np.bincount(type_codes * n_locations + location_codes,
+                           minlength=n_types * n_locations).reshape(n_types, n_locations)
+    case_types = np.bincount(case_codes * n_types + type_codes,
+                             minlength=n_cases * n_types).reshape(n_cases, n_types)
+
+    return EvidenceStats(types, locations, cases, type_counts, location_counts, crosstab,
+                         case_types.sum(axis=1), case_types)
@@ -0,0 +1,184 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class _Inotify:
+    def __init__(self, directory):
+        """Watches a directory for files that were closed after writing or moved into it (Linux only)."""
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout):
+        """
+        Waits for events.
+        :param timeout: Seconds to wait.
+        :return: Tuple (names of the files that became ready, whether the event queue overflowed).
+        """
+        names, overflow = [], False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return names, overflow
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return names, overflow
+                raise
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, length = _EVENT.unpack_from(buffer, offset)
+                offset += _EVENT.size
+                name = buffer[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif name:
+                    names.append(os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    def __init__(self, directory, extensions, poll_interval=2.0, settle_seconds=1.0, use_inotify=True):
+        """
+        Initializes a watcher that reports files landing in a directory once they are completely written.
+        inotify is used where available; elsewhere (or if it fails) the directory is polled, and a file
+        is ready once its size and modification time stop changing.
+        :param directory: Directory to watch.
+        :param extensions: Tuple of accepted file extensions.
+        :param poll_interval: Seconds between directory scans when polling.
+        :param settle_seconds: Seconds a polled file must stay unchanged before it is reported.
+        :param use_inotify: Whether to try inotify before falling back to polling.
+        """
+        self.directory = directory
+        self.extensions = tuple(extensions)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self._stop = threading.Event()
+        self._reported = {}  # name -> signature of the file version that was reported
+        self._pending = {}  # Polled files not settled yet: name -> (signature, first seen unchanged)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(self.directory)
+            except (OSError, AttributeError) as e:
+                logging.warning(f"inotify unavailable, polling {self.directory} instead: {e}")
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify is not None else "polling"
+
+    def stop(self):
+        """Makes batches() return after its current wait."""
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    @staticmethod
+    def _signature(stat):
+        # A new file reusing the name of a processed one has a different signature
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _listing(self):
+        """Accepted files currently in the directory, with their signatures."""
+        files = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.extensions) and entry.is_file():
+                    files[entry.name] = self._signature(entry.stat())
+        return files
+
+    def _forget_removed(self, present):
+        for name in self._reported.keys() - present:
+            del self._reported[name]
+
+    def _scan(self, settle_seconds):
+        """Scans the directory and returns the names of unreported files that have settled."""
+        now = time.monotonic()
+        files = self._listing()
+        self._forget_removed(files.keys())
+        ready = []
+        for name, signature in files.items():
+            if self._reported.get(name) == signature:
+                continue
+            previous = self._pending.get(name)
+            if previous is None or previous[0] != signature:
+                self._pending[name] = (signature, now)
+                previous = self._pending[name]
+            if now - previous[1] >= settle_seconds:
+                ready.append(name)
+        for name in set(self._pending) - files.keys():
+            del self._pending[name]
+        return ready
+
+    def _report(self, names):
+        batch = []
+        for name in sorted(set(names)):
+            if not name.endswith(self.extensions):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                signature = self._signature(os.stat(path))
+            except FileNotFoundError:
+                continue
+            if self._reported.get(name) == signature:
+                continue
+            self._reported[name] = signature
+            self._pending.pop(name, None)
+            batch.append(path)
+        return batch
+
+    def batches(self):
+        """
+        Yields lists of ready file paths until stop() is called. Files already in the directory
+        are yielded first, so work interrupted by a crash or restart is picked up again.
+        """
+        # Existing files were written before the watcher started
+        batch = self._report(self._scan(settle_seconds=0))
+        if batch:
+            yield batch
+
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                names, overflow = self._inotify.read(timeout=self.poll_interval)
+                if overflow:
+                    logging.warning(f"inotify queue overflowed, rescanning {self.directory}")
+                    names.extend(self._scan(settle_seconds=0))
+                elif names:
+                    self._forget_removed(self._listing().keys())
+            else:
+                self._stop.wait(self.poll_interval)
+                names = self._scan(self.settle_seconds)
+
+            batch = self._report(names)
+            if batch:
+                yield batch
@@ -0,0 +1,44 @@
+from concurrent.futures import Future
+
+
+def resolved(value):
+    """Returns a future already resolved with a value."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def chain(future, func, executor=None):
+    """
+    Runs a continuation once a future resolves, without a thread waiting for it.
+    :param future: Source future.
+    :param func: Callable receiving the result of the source. Without an executor it runs in the thread
+                 resolving the source (right away if the source is already done), so it should be short.
+    :param executor: Optional executor the continuation is submitted to instead, for work that would
+                     hold up the thread resolving the source (e.g. a process pool's result thread).
+    :return: Future resolved with what func returns, or failed with the exception of the source or of func.
+    """
+    chained = Future()
+
+    def run(result):
+        try:
+            chained.set_result(func(result))
+        except Exception as e:
+            chained.set_exception(e)
+
+    def resolve(source):
+        try:
+            result = source.result()
+        except Exception as e:
+            chained.set_exception(e)
+            return
+        if executor is None:
+            run(result)
+            return
+        try:
+            executor.submit(run, result)
+        except RuntimeError as e:  # Executor shut down
+            chained.set_exception(e)
+
+    future.add_done_callback(resolve)
+    return chained
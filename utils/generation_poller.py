@@ -0,0 +1,153 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.metrics import RETRIES
+
+
+class GenerationFailed(RuntimeError):
+    """Raised through a tracked future when a generation ends in the failed state."""
+
+
+class GenerationPoller:
+    def __init__(self, client, min_interval=2.0, max_interval=30.0, backoff=1.6, jitter=0.2,
+                 expected_seconds=90.0, max_errors=5):
+        """
+        Initializes a single background poller shared by every outstanding generation.
+        :param client: Client exposing generations.get(id=...) (the LumaAI client or a local fake).
+        :param min_interval: Shortest delay between two polls of one generation, in seconds.
+        :param max_interval: Longest delay between two polls of one generation, in seconds.
+        :param backoff: Factor applied to a generation's poll interval after each unchanged poll.
+        :param jitter: Relative random spread applied to every interval, so polls do not synchronize.
+        :param expected_seconds: Typical generation time; between one and two times it polls use min_interval.
+        :param max_errors: Consecutive status-call errors tolerated before a generation's future fails.
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.expected_seconds = expected_seconds
+        self.max_errors = max_errors
+
+        self._tracked = {}
+        self._schedule = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def track(self, generation_id, callback=None):
+        """
+        Starts tracking a generation.
+        :param generation_id: ID returned by generations.create().
+        :param callback: Optional callable receiving the future once the generation finishes.
+        :return: Future resolved with the completed generation, or failed with GenerationFailed.
+        """
+        with self._condition:
+            if generation_id in self._tracked:
+                future = self._tracked[generation_id]["future"]
+            else:
+                future = Future()
+                self._tracked[generation_id] = {
+                    "future": future,
+                    "started_at": time.monotonic(),
+                    "interval": self.min_interval,
+                    "state": None,
+                    "errors": 0,
+                }
+                heapq.heappush(self._schedule, (time.monotonic(), generation_id))
+                self._ensure_thread()
+                self._condition.notify()
+
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def pending(self):
+        """Returns the number of generations still being tracked."""
+        with self._condition:
+            return len(self._tracked)
+
+    def stop(self):
+        """Stops the poller thread; unresolved futures are cancelled."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+            tracked, self._tracked = self._tracked, {}
+            self._schedule = []
+        for entry in tracked.values():
+            entry["future"].cancel()
+
+    def _ensure_thread(self):
+        self._stopped = False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="generation-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._schedule or self._schedule[0][0] > time.monotonic()):
+                    timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                _, generation_id = heapq.heappop(self._schedule)
+                entry = self._tracked.get(generation_id)
+            if entry is not None:
+                self._poll(generation_id, entry)
+
+    def _poll(self, generation_id, entry):
+        try:
+            generation = self.client.generations.get(id=generation_id)
+            entry["errors"] = 0
+        except Exception as e:
+            entry["errors"] += 1
+            logging.warning(f"Status check failed for generation {generation_id}: {e}")
+            if entry["errors"] >= self.max_errors:
+                self._finish(generation_id, exception=e)
+            else:
+                RETRIES.inc(component="generation_poller", reason="status_check")
+                self._reschedule(generation_id, entry, grow=True)
+            return
+
+        if generation.state == "completed":
+            self._finish(generation_id, result=generation)
+        elif generation.state == "failed":
+            self._finish(generation_id, exception=GenerationFailed(generation.failure_reason))
+        else:
+            # A state change (e.g. queued -> dreaming) means progress: poll quickly again
+            changed = generation.state != entry["state"]
+            entry["state"] = generation.state
+            self._reschedule(generation_id, entry, grow=not changed)
+
+    def _reschedule(self, generation_id, entry, grow):
+        if grow:
+            entry["interval"] = min(entry["interval"] * self.backoff, self.max_interval)
+        else:
+            entry["interval"] = self.min_interval
+
+        interval = entry["interval"]
+        elapsed = time.monotonic() - entry["started_at"]
+        if self.expected_seconds <= elapsed < 2 * self.expected_seconds:
+            # Likely close to completion; overdue generations fall back to the backoff interval
+            interval = self.min_interval
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+
+        with self._condition:
+            if generation_id in self._tracked:
+                heapq.heappush(self._schedule, (time.monotonic() + interval, generation_id))
+                self._condition.notify()
+
+    def _finish(self, generation_id, result=None, exception=None):
+        with self._condition:
+            entry = self._tracked.pop(generation_id, None)
+        if entry is None:
+            return
+        if exception is not None:
+            entry["future"].set_exception(exception)
+        else:
+            entry["future"].set_result(result)
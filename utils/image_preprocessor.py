@@ -0,0 +1,125 @@
+import io
+import logging
+import mimetypes
+import os
+
+from PIL import Image, ImageOps
+
+from utils.metrics import record_cache, timed
+from utils.plaintext_cache import PlaintextCache
+from utils.result_cache import hash_file, make_key
+
+# Output formats the vision API accepts, with their MIME types and file extensions
+FORMATS = {
+    "JPEG": ("image/jpeg", "jpg"),
+    "WEBP": ("image/webp", "webp"),
+}
+
+# EXIF orientation tag, and the orientations that rotate the image by 90 degrees (width and height swap)
+EXIF_ORIENTATION = 0x0112
+SWAPPED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Part of the cache key; bumped when derived payloads change, so older cached ones are not served
+DERIVATION_VERSION = 2
+
+
+class ImagePreprocessor:
+    def __init__(self, max_side=2048, short_side=768, format="JPEG", quality=85,
+                 cache_bytes=64 * 1024 * 1024):
+        """
+        Initializes the image preprocessing stage used before vision uploads.
+        Images are downscaled to the resolution the model actually uses (high detail: fit within
+        max_side, then shortest side at most short_side) and re-encoded compactly.
+        :param max_side: Longest side, in pixels, of the uploaded image.
+        :param short_side: Shortest side, in pixels, of the uploaded image.
+        :param format: Output format, "JPEG" or "WEBP".
+        :param quality: Encoder quality (1-100).
+        :param cache_bytes: Size budget of the in-memory cache of derived payloads, stored by source hash
+                            and settings. They are never written to disk: they are plaintext copies of
+                            evidence that is encrypted and deleted once processed.
+        """
+        format = format.upper()
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported output format: {format}")
+        self.max_side = max_side
+        self.short_side = short_side
+        self.format = format
+        self.quality = quality
+        self.cache = PlaintextCache(max_bytes=cache_bytes)
+
+    @property
+    def settings(self):
+        """Settings that change the derived payload (part of every cache key)."""
+        return [self.max_side, self.short_side, self.format, self.quality, DERIVATION_VERSION]
+
+    def target_size(self, width, height):
+        """
+        Computes the size an image is downscaled to; images are never upscaled.
+        :return: Tuple (width, height).
+        """
+        scale = min(1.0, self.max_side / max(width, height), self.short_side / min(width, height))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def prepare(self, image_path, source_hash=None):
+        """
+        Returns the upload payload of a local image, from the cache when it was already derived.
+        :param image_path: Path to the local image file.
+        :param source_hash: Optional precomputed SHA-256 of the file.
+        :return: Tuple (mime_type, payload bytes).
+        """
+        key = make_key(source_hash or hash_file(image_path), self.settings)
+        for mime_type, extension in FORMATS.values():
+            payload = self.cache.get(f"{key}.{extension}")
+            if payload is not None:
+                record_cache("image_preprocessing", True)
+                return mime_type, payload
+        record_cache("image_preprocessing", False)
+
+        with timed("image_preprocessing", "derive") as timer:
+            timer.bytes_in = os.path.getsize(image_path)
+            mime_type, payload = self._derive(image_path)
+            timer.bytes_out = len(payload)
+        extension = next((ext for mime, ext in FORMATS.values() if mime == mime_type), None)
+        if extension is not None:
+            self.cache.put(f"{key}.{extension}", payload)
+        return mime_type, payload
+
+    def _derive(self, image_path):
+        """Decodes the image once, downsizes it and re-encodes it; falls back to the original bytes."""
+        with open(image_path, "rb") as image_file:
+            original = image_file.read()
+        original_mime = mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+
+        try:
+            with Image.open(io.BytesIO(original)) as image:
+                original_mime = Image.MIME.get(image.format, original_mime)
+                # The target is computed on the displayed (EXIF-oriented) size, e.g. portrait for a
+                # landscape sensor image tagged as rotated
+                swapped = image.getexif().get(EXIF_ORIENTATION) in SWAPPED_ORIENTATIONS
+                width, height = image.size
+                size = self.target_size(*((height, width) if swapped else (width, height)))
+                # JPEG sources are decoded directly at a reduced scale where possible (before rotation)
+                image.draft("RGB", (size[1], size[0]) if swapped else size)
+                image = ImageOps.exif_transpose(image)
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                elif image.mode != "RGB":
+                    image = image.convert("RGB")
+                if image.size != size:
+                    image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+                buffer = io.BytesIO()
+                image.save(buffer, format=self.format, quality=self.quality, optimize=self.format == "JPEG")
+                payload = buffer.getvalue()
+        except Exception as e:
+            logging.warning(f"Could not preprocess {image_path}, uploading it unchanged: {e}")
+            return original_mime, original
+
+        # A small source in an accepted format can be smaller than its re-encoding
+        if len(original) <= len(payload) and original_mime in {mime for mime, _ in FORMATS.values()}:
+            return original_mime, original
+        return FORMATS[self.format][0], payload
+
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, retention_seconds=3600):
+        """
+        Initializes a background job queue backed by a worker thread pool.
+        :param max_workers: Number of jobs that may run at the same time.
+        :param retention_seconds: How long finished jobs are kept for status/result queries.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+        self.retention_seconds = retention_seconds
+        self._jobs = {}
+        self._active_keys = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, key=None, **kwargs):
+        """
+        Schedules a function to run in the worker pool.
+        :param kind: Short label describing the job (e.g. "analysis", "simulation").
+        :param func: Callable executed by the worker. If it returns a future, the job completes when the
+                     future resolves, and the worker is released in the meantime.
+        :param key: Optional deduplication key; while a job with the same key is unfinished its ID is returned instead.
+        :return: ID of the scheduled (or already running) job.
+        """
+        with self._lock:
+            self._prune()
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "status": QUEUED,
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            if key is not None:
+                self._active_keys[key] = job_id
+
+        self.executor.submit(self._run, job_id, key, func, args, kwargs)
+        logging.info(f"Queued {kind} job: {job_id}")
+        return job_id
+
+    def _run(self, job_id, key, func, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._finish(job_id, key, error=e)
+            return
+
+        if isinstance(result, Future):
+            # Asynchronous jobs (e.g. a tracked video generation) finish without holding a worker
+            result.add_done_callback(lambda future: self._finish_future(job_id, key, future))
+        else:
+            self._finish(job_id, key, result=result)
+
+    def _finish_future(self, job_id, key, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            self._finish(job_id, key, error=e)
+        else:
+            self._finish(job_id, key, result=result)
+
+    def _finish(self, job_id, key, result=None, error=None):
+        try:
+            if error is None:
+                self._update(job_id, status=COMPLETED, result=result, finished_at=time.time())
+                logging.info(f"Job completed: {job_id}")
+            else:
+                self._update(job_id, status=FAILED, error=str(error), finished_at=time.time())
+                logging.error(f"Job failed: {job_id}: {error}")
+        finally:
+            if key is not None:
+                with self._lock:
+                    if self._active_keys.get(key) == job_id:
+                        del self._active_keys[key]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        Returns a snapshot of a job's state.
+        :param job_id: ID returned by submit().
+        :return: Dictionary describing the job, or None if it is unknown or expired.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self, wait=True):
+        """Stops accepting jobs and optionally waits for running ones."""
+        self.executor.shutdown(wait=wait)
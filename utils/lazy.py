@@ -0,0 +1,28 @@
+import threading
+
+
+class lazy_property:
+    def __init__(self, factory):
+        """
+        Initializes a thread-safe cached property: the factory runs on first access and its result
+        replaces the property on the instance, so later accesses are plain attribute lookups.
+        :param factory: Method computing the value.
+        """
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+        self._lock = threading.RLock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        values = instance.__dict__
+        if self.name not in values:
+            with self._lock:
+                # Concurrent first accesses (e.g. two job workers) construct the value only once
+                if self.name not in values:
+                    values[self.name] = self.factory(instance)
+        return values[self.name]
@@ -0,0 +1,357 @@
+import bisect
+import threading
+import time
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** exponent for exponent in range(11))  # 1 KiB .. 1 GiB
+TOKEN_BUCKETS = tuple(2 ** exponent for exponent in range(4, 16))  # 16 .. 32768
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        Initializes a monotonically increasing counter.
+        :param name: Metric name.
+        :param documentation: Help text.
+        :param labelnames: Names of the labels every sample carries.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self._values.items()]
+
+    def merge(self, series):
+        for entry in series:
+            self.inc(entry["value"], **entry["labels"])
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for entry in self.snapshot():
+            lines.append(f"{self.name}{_format_labels(entry['labels'])} {_format_value(entry['value'])}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        """
+        Initializes a histogram of observations in cumulative buckets, with their count and sum.
+        :param name: Metric name.
+        :param documentation: Help text.
+        :param labelnames: Names of the labels every sample carries.
+        :param buckets: Increasing bucket upper bounds (+Inf is added).
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [per-bucket counts (last is +Inf), count, sum]
+        self._lock = threading.Lock()
+
+    def _entry(self, key):
+        entry = self._series.get(key)
+        if entry is None:
+            entry = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+        return entry
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._entry(key)
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {"labels": dict(zip(self.labelnames, key)), "buckets": list(counts), "count": count, "sum": total}
+                for key, (counts, count, total) in self._series.items()
+            ]
+
+    def merge(self, series):
+        for other in series:
+            key = _label_key(self.labelnames, other["labels"])
+            with self._lock:
+                entry = self._entry(key)
+                entry[0] = [mine + theirs for mine, theirs in zip(entry[0], other["buckets"])]
+                entry[1] += other["count"]
+                entry[2] += other["sum"]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for entry in self.snapshot():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels({**entry["labels"], "le": le})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(entry["labels"])
+            lines.append(f"{self.name}_sum{labels} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{labels} {entry['count']}")
+        return lines
+
+    def quantile(self, q, buckets):
+        """
+        Estimates a quantile from bucket counts, interpolating linearly inside the bucket
+        (as Prometheus' histogram_quantile does).
+        :param q: Quantile between 0 and 1.
+        :param buckets: Per-bucket counts of one series.
+        :return: The estimate, or None without observations.
+        """
+        total = sum(buckets)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(buckets):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # Beyond the last bound only the bound itself is known
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Initializes an empty set of metrics, rendered in the Prometheus text exposition format."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        """Returns the counter with this name, creating it on first use."""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        """Returns the histogram with this name, creating it on first use."""
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Renders every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def snapshot(self):
+        """
+        Copies the current values of every metric.
+        :return: Dictionary mapping metric names to lists of series (JSON-serializable).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def merge(self, snapshot):
+        """Adds values recorded elsewhere (e.g. a diff() from a worker process) to the metrics."""
+        for name, series in snapshot.items():
+            metric = self.get(name)
+            if metric is not None:
+                metric.merge(series)
+
+
+def diff(after, before):
+    """
+    Computes what was recorded between two snapshots.
+    :param after: Later snapshot.
+    :param before: Earlier snapshot.
+    :return: Snapshot of the differences; series without new observations are left out.
+    """
+    changes = {}
+    for name, series in after.items():
+        previous = {tuple(sorted(entry["labels"].items())): entry for entry in before.get(name, [])}
+        for entry in series:
+            old = previous.get(tuple(sorted(entry["labels"].items())))
+            if "value" in entry:
+                change = {"labels": entry["labels"], "value": entry["value"] - (old["value"] if old else 0)}
+                if not change["value"]:
+                    continue
+            else:
+                change = {
+                    "labels": entry["labels"],
+                    "buckets": [count - (old["buckets"][i] if old else 0) for i, count in enumerate(entry["buckets"])],
+                    "count": entry["count"] - (old["count"] if old else 0),
+                    "sum": entry["sum"] - (old["sum"] if old else 0.0),
+                }
+                if not change["count"]:
+                    continue
+            changes.setdefault(name, []).append(change)
+    return changes
+
+
+REGISTRY = MetricsRegistry()
+
+# Metrics recorded by the agents and the pipeline
+OPERATION_SECONDS = REGISTRY.histogram(
+    "forensic_operation_duration_seconds", "Wall time of agent and pipeline operations.",
+    ("agent", "operation", "outcome")
+)
+OPERATION_BYTES = REGISTRY.histogram(
+    "forensic_operation_bytes", "Bytes consumed (in) and produced (out) by agent operations.",
+    ("agent", "operation", "direction"), SIZE_BUCKETS
+)
+API_TOKENS = REGISTRY.histogram(
+    "forensic_api_tokens", "Tokens used per API call, from the usage reported by the API.",
+    ("agent", "model", "kind"), TOKEN_BUCKETS
+)
+CACHE_LOOKUPS = REGISTRY.counter("forensic_cache_lookups_total", "Cache lookups by result.", ("cache", "result"))
+RETRIES = REGISTRY.counter("forensic_retries_total", "Retried requests and operations.", ("component", "reason"))
+HTTP_REQUESTS = REGISTRY.counter("forensic_http_requests_total", "HTTP requests sent to the APIs.", ("provider",))
+
+
+class timed:
+    def __init__(self, agent, operation):
+        """
+        Context manager recording the wall time of an operation (outcome "error" if it raises),
+        and optionally its bytes in and out.
+        :param agent: Agent (or component) performing the operation.
+        :param operation: Name of the operation.
+        """
+        self.agent = agent
+        self.operation = operation
+        self.outcome = "ok"
+        self.bytes_in = None
+        self.bytes_out = None
+
+    def start(self):
+        """Starts timing; with start() and stop() an operation can finish in another thread (e.g. a callback)."""
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self, outcome=None):
+        """
+        Records the operation.
+        :param outcome: Outcome label; defaults to self.outcome.
+        """
+        elapsed = time.perf_counter() - self._start
+        outcome = outcome or self.outcome
+        OPERATION_SECONDS.observe(elapsed, agent=self.agent, operation=self.operation, outcome=outcome)
+        for direction, size in (("in", self.bytes_in), ("out", self.bytes_out)):
+            if size is not None:
+                OPERATION_BYTES.observe(size, agent=self.agent, operation=self.operation, direction=direction)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop("error" if exc_type is not None else None)
+        return False
+
+
+def record_usage(agent, model, usage):
+    """Records the token usage of an API response (usage may be None, e.g. for some streams)."""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = getattr(usage, kind, None)
+        if tokens is not None:
+            API_TOKENS.observe(tokens, agent=agent, model=model, kind=kind.split("_")[0])
+
+
+def message_bytes(messages):
+    """Approximate request size of chat messages: their text and image data URLs, in characters."""
+    size = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            size += len(content)
+            continue
+        for part in content:
+            size += len(part["text"]) if part["type"] == "text" else len(part["image_url"]["url"])
+    return size
+
+
+def record_cache(cache, hit):
+    """Counts a cache lookup as a hit or a miss."""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def run_summary(changes, token_prices=None):
+    """
+    Condenses what a run recorded into a readable summary.
+    :param changes: diff() of the registry snapshots taken around the run.
+    :param token_prices: Optional {model: {"prompt": usd, "completion": usd}} per million tokens.
+    :return: JSON-serializable dictionary with operations, bytes, tokens, cost, cache lookups and retries.
+    """
+    token_prices = token_prices or {}
+    summary = {"operations": {}, "bytes": {}, "tokens": {}, "cost_usd": 0.0, "cache": {}, "retries": {}}
+
+    for entry in changes.get(OPERATION_SECONDS.name, []):
+        labels = entry["labels"]
+        operation = summary["operations"].setdefault(f"{labels['agent']}.{labels['operation']}", {
+            "calls": 0, "errors": 0, "total_seconds": 0.0, "buckets": [0] * (len(OPERATION_SECONDS.buckets) + 1)
+        })
+        operation["calls"] += entry["count"]
+        operation["total_seconds"] += entry["sum"]
+        if labels["outcome"] == "error":
+            operation["errors"] += entry["count"]
+        operation["buckets"] = [mine + theirs for mine, theirs in zip(operation["buckets"], entry["buckets"])]
+    for operation in summary["operations"].values():
+        buckets = operation.pop("buckets")
+        operation["mean_seconds"] = operation["total_seconds"] / operation["calls"]
+        operation["p50_seconds"] = OPERATION_SECONDS.quantile(0.5, buckets)
+        operation["p95_seconds"] = OPERATION_SECONDS.quantile(0.95, buckets)
+
+    for entry in changes.get(OPERATION_BYTES.name, []):
+        labels = entry["labels"]
+        sizes = summary["bytes"].setdefault(f"{labels['agent']}.{labels['operation']}", {})
+        sizes[labels["direction"]] = sizes.get(labels["direction"], 0) + entry["sum"]
+
+    for entry in changes.get(API_TOKENS.name, []):
+        labels = entry["labels"]
+        tokens = summary["tokens"].setdefault(labels["agent"], {})
+        tokens[labels["kind"]] = tokens.get(labels["kind"], 0) + entry["sum"]
+        price = token_prices.get(labels["model"], {}).get(labels["kind"])
+        if price is not None:
+            summary["cost_usd"] += entry["sum"] * price / 1_000_000
+
+    for entry in changes.get(CACHE_LOOKUPS.name, []):
+        lookups = summary["cache"].setdefault(entry["labels"]["cache"], {"hit": 0, "miss": 0})
+        lookups[entry["labels"]["result"]] += entry["value"]
+
+    for entry in changes.get(RETRIES.name, []):
+        summary["retries"][f"{entry['labels']['component']}.{entry['labels']['reason']}"] = entry["value"]
+
+    return summary
@@ -0,0 +1,212 @@
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+ALGORITHMS = ("phash", "dhash")
+
+
+def _grayscale(image_path, size):
+    """Decodes an image straight to a small grayscale float array of (width, height) size."""
+    with Image.open(image_path) as image:
+        # JPEG sources are decoded at a reduced scale; only the thumbnail is ever needed
+        image.draft("L", (size[0] * 4, size[1] * 4))
+        image = ImageOps.exif_transpose(image).convert("L")
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        return np.asarray(image, dtype=np.float32)
+
+
+def _pack_bits(bits):
+    """Packs a boolean array into an integer hash (row-major, most significant bit first)."""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+@functools.lru_cache(maxsize=8)
+def _dct_matrix(size):
+    """Orthonormal DCT-II matrix, so the 2D transform is two matrix products."""
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+def dhash(image_path, hash_size=8):
+    """
+    Computes the difference hash of an image: whether each pixel of a small grayscale thumbnail
+    is brighter than its right neighbour.
+    :param image_path: Path to the image file.
+    :param hash_size: Hash side; the hash has hash_size ** 2 bits.
+    :return: Hash as an integer.
+    """
+    pixels = _grayscale(image_path, (hash_size + 1, hash_size))
+    return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image_path, hash_size=8, highfreq_factor=4):
+    """
+    Computes the perceptual hash of an image: the signs, relative to their median, of the lowest
+    frequencies of the 2D DCT of a grayscale thumbnail. Robust to rescaling, recompression and
+    small exposure changes.
+    :param image_path: Path to the image file.
+    :param hash_size: Hash side; the hash has hash_size ** 2 bits.
+    :param highfreq_factor: Thumbnail side as a multiple of hash_size.
+    :return: Hash as an integer.
+    """
+    size = hash_size * highfreq_factor
+    pixels = _grayscale(image_path, (size, size))
+    matrix = _dct_matrix(size)
+    low_frequencies = (matrix @ pixels @ matrix.T)[:hash_size, :hash_size]
+    # The DC term only reflects overall brightness, so it is left out of the median
+    median = np.median(low_frequencies.ravel()[1:])
+    return _pack_bits(low_frequencies > median)
+
+
+def hamming(first, second):
+    """Number of differing bits between two hashes."""
+    return (first ^ second).bit_count()
+
+
+class MultiIndexHashTable:
+    def __init__(self, bits=64, max_distance=6):
+        """
+        Initializes an empty multi-index hash table for Hamming range lookups. Hashes are split into
+        max_distance + 1 disjoint chunks, each indexed in its own table: any hash within max_distance
+        of a query equals it exactly on at least one chunk, so a lookup only compares against the
+        few hashes sharing a chunk instead of every stored hash.
+        :param bits: Number of bits of the hashes.
+        :param max_distance: Largest Hamming distance searched for.
+        """
+        self.bits = bits
+        self.max_distance = max_distance
+        chunks = min(max_distance + 1, bits)
+        bounds = [bits * index // chunks for index in range(chunks + 1)]
+        self._chunks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._chunks]
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, value, item):
+        """
+        Adds an item under a hash.
+        :param value: Hash of the item.
+        :param item: Item stored with it.
+        """
+        index = len(self._entries)
+        self._entries.append((value, item))
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((value >> shift) & mask, []).append(index)
+
+    def search(self, value):
+        """
+        Finds every item whose hash is within max_distance of a hash.
+        :param value: Hash to look up.
+        :return: List of (distance, item) tuples, closest first.
+        """
+        if self.max_distance >= self.bits:
+            candidates = range(len(self._entries))
+        else:
+            candidates = set()
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                candidates.update(table.get((value >> shift) & mask, ()))
+
+        matches = []
+        for index in sorted(candidates):
+            candidate, item = self._entries[index]
+            distance = hamming(value, candidate)
+            if distance <= self.max_distance:
+                matches.append((distance, item))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class DuplicateDetector:
+    def __init__(self, algorithm="phash", hash_size=8, max_distance=6):
+        """
+        Initializes a near-duplicate detector for evidence images (burst shots, re-saved or resized
+        copies of the same frame).
+        :param algorithm: "phash" or "dhash".
+        :param hash_size: Hash side; hashes have hash_size ** 2 bits.
+        :param max_distance: Largest Hamming distance at which two images count as duplicates.
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unsupported perceptual hash: {algorithm}")
+        self.algorithm = algorithm
+        self.hash_function = phash if algorithm == "phash" else dhash
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        # Representatives of earlier batches (e.g. of processed cases), searched by every call to group()
+        self.known = MultiIndexHashTable(bits=hash_size ** 2, max_distance=max_distance)
+        self._lock = threading.Lock()
+
+    def encode(self, value):
+        """Serializes a fingerprint for storage, tagged with the settings it was computed with."""
+        return f"{self.algorithm}{self.hash_size}:{value:x}"
+
+    def decode(self, text):
+        """Parses a stored fingerprint; returns None if it was computed with other settings."""
+        tag, _, digits = (text or "").partition(":")
+        return int(digits, 16) if digits and tag == f"{self.algorithm}{self.hash_size}" else None
+
+    def remember(self, value, item):
+        """
+        Adds the representative of a cluster found earlier; images within max_distance of it found by
+        later calls to group() join its cluster.
+        :param value: Fingerprint of the representative.
+        :param item: Item identifying it (e.g. its path).
+        """
+        with self._lock:
+            self.known.add(value, item)
+
+    def fingerprint(self, image_path):
+        """Perceptual hash of an image, or None when it cannot be decoded."""
+        try:
+            return self.hash_function(image_path, hash_size=self.hash_size)
+        except Exception as e:
+            logging.warning(f"Could not compute the perceptual hash of {image_path}: {e}")
+            return None
+
+    def fingerprints(self, image_paths, max_workers=4):
+        """
+        Computes the fingerprints of images in parallel.
+        :param image_paths: Paths of the images.
+        :param max_workers: Threads decoding images.
+        :return: List of fingerprints (None for images that cannot be decoded), in order.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="perceptual-hash") as pool:
+            return list(pool.map(self.fingerprint, image_paths))
+
+    def group(self, image_paths, max_workers=4, fingerprints=None):
+        """
+        Groups images into clusters of near-duplicates. Each image is looked up among the remembered
+        representatives (see remember()), then in a multi-index hash table of the cluster representatives
+        found so far. The first image of a new cluster, in input order, represents it; images that cannot
+        be decoded form clusters of their own.
+        :param image_paths: Paths of the images.
+        :param max_workers: Threads decoding images for their fingerprints.
+        :param fingerprints: Optional fingerprints of the images, in order (see fingerprints()).
+        :return: Dictionary mapping each representative to the list of its cluster members: a new
+                 representative comes first among them, and a remembered one is not one of them.
+        """
+        if fingerprints is None:
+            fingerprints = self.fingerprints(image_paths, max_workers=max_workers)
+
+        clusters = {}
+        representatives = MultiIndexHashTable(bits=self.hash_size ** 2, max_distance=self.max_distance)
+        for image_path, value in zip(image_paths, fingerprints):
+            matches = []
+            if value is not None:
+                with self._lock:
+                    matches = self.known.search(value)
+                matches = matches or representatives.search(value)
+            if matches:
+                clusters.setdefault(matches[0][1], []).append(image_path)
+            else:
+                clusters[image_path] = [image_path]
+                if value is not None:
+                    representatives.add(value, image_path)
+        return clusters
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+
+class PlaintextCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_item_bytes=32 * 1024 * 1024):
+        """
+        Initializes a bounded in-memory LRU cache of decrypted file contents.
+        :param max_bytes: Total size budget of all cached items.
+        :param max_item_bytes: Largest single item that is cached; bigger items are always streamed.
+        """
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def accepts(self, size):
+        """Returns True if an item of the given size may be cached."""
+        return size <= self.max_item_bytes
+
+    def get(self, key):
+        """
+        Fetches an item and marks it as most recently used.
+        :param key: Cache key.
+        :return: Cached bytes, or None on a miss.
+        """
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """
+        Stores an item, evicting least recently used items until the size budget is met.
+        :param key: Cache key.
+        :param data: Decrypted bytes.
+        """
+        if not self.accepts(len(data)):
+            return
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= len(self._items.pop(key))
+            self._items[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self):
+        """Drops every cached item."""
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
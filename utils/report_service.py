@@ -0,0 +1,96 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from utils.metrics import REGISTRY
+from utils.report_worker import init_worker, render_case
+
+def _unwrap(rendered):
+    result, metrics = rendered
+    REGISTRY.merge(metrics)
+    return result
+
+
+class ReportService:
+    def __init__(self, report_dir="data/reports/", formats=("txt", "png", "pdf"), max_workers=None):
+        """
+        Initializes a render service that produces case reports (text, chart, PDF) in worker processes,
+        keeping matplotlib rendering off request threads and spreading it over several cores.
+        Workers are started on first use with the spawn method, which is safe in threaded servers,
+        and each builds its summarizer (and imports matplotlib) once. Spawned workers also re-import
+        the parent's __main__ module, so scripts using the service keep their setup under
+        `if __name__ == "__main__"` (see app.create_app).
+        :param report_dir: Directory the reports are written to.
+        :param formats: Outputs produced for every case (see SummarizerAgent).
+        :param max_workers: Number of render processes (defaults to the CPU count).
+        """
+        self.report_dir = report_dir
+        self.formats = tuple(formats)
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(self.report_dir, self.formats)
+                )
+            return self._executor
+
+    def submit(self, case_id, findings, evidence_data):
+        """
+        Queues the report of one case.
+        :param case_id: Case identifier; it namespaces the output files.
+        :param findings: Findings of the case.
+        :param evidence_data: Evidence of the case.
+        :return: Future resolved with the summarize() result dictionary.
+        """
+        future = Future()
+
+        def resolve(rendered):
+            try:
+                future.set_result(_unwrap(rendered.result()))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._pool().submit(render_case, (case_id, findings, evidence_data)).add_done_callback(resolve)
+        return future
+
+    def submit_batch(self, cases):
+        """
+        Queues many cases at once.
+        :param cases: Iterable of (case_id, findings, evidence_data) tuples.
+        :return: List of futures, in the order of the cases.
+        """
+        return [self.submit(*case) for case in cases]
+
+    def render_batch(self, cases, chunksize=8):
+        """
+        Renders many cases and waits for all of them; cases are sent to the workers in chunks
+        to keep inter-process overhead low with hundreds of cases.
+        :param cases: Iterable of (case_id, findings, evidence_data) tuples.
+        :param chunksize: Cases per worker round trip.
+        :return: Dictionary mapping case IDs to summarize() results (None for failed cases).
+        """
+        cases = list(cases)
+        results = {}
+        try:
+            for (case_id, _, _), rendered in zip(cases, self._pool().map(render_case, cases, chunksize=chunksize)):
+                results[case_id] = _unwrap(rendered)
+        except Exception as e:
+            logging.error(f"Batch report rendering failed: {e}")
+            for case_id, _, _ in cases:
+                results.setdefault(case_id, None)
+        return results
+
+    def shutdown(self, wait=True):
+        """Stops the render processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
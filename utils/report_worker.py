@@ -0,0 +1,19 @@
+from utils.metrics import REGISTRY, diff
+
+# Entry points of the report render processes. The spawned workers import this module, never the
+# app or the pipeline, so starting a worker has no side effects (logging, queues, index scans).
+
+# Per-process summarizer used by the render workers
+_agent = None
+
+def init_worker(report_dir, formats):
+    global _agent
+    from agents.summarizer_agent import SummarizerAgent
+    _agent = SummarizerAgent(report_dir=report_dir, formats=formats)
+
+def render_case(case):
+    # Returns the metrics the render recorded too, to be merged into the parent's registry
+    case_id, findings, evidence_data = case
+    before = REGISTRY.snapshot()
+    result = _agent.summarize(findings, evidence_data, case_id=case_id)
+    return result, diff(REGISTRY.snapshot(), before)
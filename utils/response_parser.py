@@ -0,0 +1,185 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library decoder is the fallback
+    orjson = None
+
+# JSON format requested by agents.image_analysis.description_prompt in config.yaml
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "required": ["scene_description"],
+    "properties": {
+        "scene_description": {"type": "string"},
+        "key_observations": {"type": ("string", "array"), "items": {"type": "string"}},
+        "environmental_conditions": {"type": "string"},
+        "evidence": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string"},
+                    "location": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+
+# Strings (with escapes) and braces: everything the brace matcher has to look at
+_TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]', re.DOTALL)
+
+_TYPES = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+}
+
+
+class ResponseParseError(ValueError):
+    """Raised when a response contains no JSON object matching the expected schema."""
+
+
+def loads(text):
+    """Decodes JSON with orjson when it is installed, otherwise with the json module (both raise ValueError)."""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _types(schema):
+    names = schema.get("type")
+    names = (names,) if isinstance(names, str) else tuple(names or ())
+    return names, tuple(t for name in names for t in _TYPES[name])
+
+
+def _is_leaf(schema):
+    return set(schema) <= {"type"}
+
+
+def _type_error(path, names, value):
+    return ResponseParseError(f"{path}: expected {'/'.join(names)}, got {type(value).__name__}")
+
+
+def compile_schema(schema, path="$"):
+    """
+    Compiles a JSON-schema subset (type, properties, items, required) into a validation function.
+    Properties and items that only declare a type are checked inline instead of through nested calls.
+    :param schema: Schema dictionary.
+    :param path: Location used in error messages.
+    :return: Callable returning the value, or raising ResponseParseError when it does not match.
+    """
+    names, types = _types(schema)
+    required = tuple(schema.get("required", ()))
+    leaves, nested = [], []
+    for key, subschema in schema.get("properties", {}).items():
+        if _is_leaf(subschema):
+            leaves.append((key, *_types(subschema)))
+        else:
+            nested.append((key, compile_schema(subschema, f"{path}.{key}")))
+
+    item_schema = schema.get("items")
+    item_leaf = _types(item_schema) if item_schema is not None and _is_leaf(item_schema) else None
+    item_check = compile_schema(item_schema, f"{path}[]") if item_schema is not None and item_leaf is None else None
+
+    def validate(value):
+        if types and (not isinstance(value, types) or (type(value) is bool and bool not in types)):
+            raise _type_error(path, names, value)
+        if type(value) is dict:
+            for key in required:
+                if key not in value:
+                    raise ResponseParseError(f"{path}: missing required key '{key}'")
+            for key, leaf_names, leaf_types in leaves:
+                if key in value and not isinstance(value[key], leaf_types):
+                    raise _type_error(f"{path}.{key}", leaf_names, value[key])
+            for key, check in nested:
+                if key in value:
+                    check(value[key])
+        elif type(value) is list:
+            if item_leaf is not None:
+                for item in value:
+                    if not isinstance(item, item_leaf[1]):
+                        raise _type_error(f"{path}[]", item_leaf[0], item)
+            elif item_check is not None:
+                for item in value:
+                    item_check(item)
+        return value
+
+    return validate
+
+
+def iter_json_objects(text):
+    """
+    Yields balanced {...} spans of a text, as strings, in order, in a single pass over the text.
+    Braces inside JSON strings are skipped, so prose or code fences around the object do not matter.
+    The closed spans inside a brace that is never closed are yielded when the text ends, so an
+    unbalanced brace does not hide the objects after it.
+    :param text: Raw model output.
+    """
+    # Every open brace: its position and the closed spans directly inside it
+    stack = []
+    position = 0
+    while True:
+        if not stack:
+            # Outside of any object quotes belong to prose, so the scan resumes at the next brace
+            position = text.find("{", position)
+            if position < 0:
+                return
+        token = _TOKENS.search(text, position)
+        if token is None:
+            break
+        position = token.end()
+        if token.group(0) == "{":
+            stack.append((token.start(), []))
+        elif token.group(0) == "}":
+            start, _ = stack.pop()
+            if stack:
+                stack[-1][1].append((start, position))
+            else:
+                yield text[start:position]
+
+    for start, end in sorted(span for _, spans in stack for span in spans):
+        yield text[start:end]
+
+
+def parse_json_object(text, validate=None):
+    """
+    Extracts the first JSON object of a response that decodes and passes validation.
+    The whole response is tried first (JSON mode returns a bare object); otherwise candidate
+    objects found by iter_json_objects() are tried in order.
+    :param text: Raw model output.
+    :param validate: Optional compiled schema from compile_schema().
+    :return: The decoded object.
+    """
+    if not text:
+        raise ResponseParseError("Empty response content.")
+
+    errors = []
+    stripped = text.strip()
+    candidates = iter_json_objects(text)
+    if stripped.startswith("{") and stripped.endswith("}"):
+        candidates = _prepend(stripped, candidates)
+
+    seen = set()
+    for candidate in candidates:
+        if candidate in seen:
+            continue
+        seen.add(candidate)
+        try:
+            data = loads(candidate)
+            if not isinstance(data, dict):
+                raise ResponseParseError("JSON value is not an object.")
+            return validate(data) if validate is not None else data
+        except ValueError as e:
+            errors.append(str(e))
+
+    if errors:
+        raise ResponseParseError(f"No valid JSON object in the response ({errors[-1]}).")
+    raise ResponseParseError("No JSON object found in the response content.")
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
@@ -0,0 +1,131 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """
+    Computes the SHA-256 digest of a file without loading it fully into memory.
+    :param file_path: Path to the file to hash.
+    :param chunk_size: Number of bytes read per iteration.
+    :return: Hex encoded SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """
+    Builds a stable cache key from arbitrary JSON-serializable parts.
+    :param parts: Values that together identify a cached result.
+    :return: Hex encoded SHA-256 digest of the canonical JSON encoding.
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, namespace, db_path="data/cache/results.db", max_entries=1000, ttl_seconds=None):
+        """
+        Initializes a persistent, SQLite-backed result cache with LRU and TTL eviction.
+        :param namespace: Table name separating this cache from others sharing the database.
+        :param db_path: Path to the SQLite database file.
+        :param max_entries: Maximum number of entries kept before least recently used ones are evicted.
+        :param ttl_seconds: Lifetime of an entry in seconds, or None to keep entries until evicted.
+        """
+        if not namespace.isidentifier():
+            raise ValueError(f"Invalid cache namespace: {namespace}")
+
+        self.namespace = namespace
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.namespace} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.namespace}_accessed_at "
+                f"ON {self.namespace} (accessed_at)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # sqlite3's own context manager only commits or rolls back; the connection is closed here
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Fetches a cached value and refreshes its LRU position.
+        :param key: Cache key.
+        :return: The cached value, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.namespace} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                conn.execute(f"DELETE FROM {self.namespace} WHERE key = ?", (key,))
+                return None
+
+            conn.execute(f"UPDATE {self.namespace} SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+
+    def set(self, key, value):
+        """
+        Stores a JSON-serializable value and evicts entries beyond the configured limits.
+        :param key: Cache key.
+        :param value: Value to store.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.namespace} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._evict(conn, now)
+
+    def delete(self, key):
+        """Removes a single entry from the cache."""
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.namespace} WHERE key = ?", (key,))
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.namespace}")
+
+    def _evict(self, conn, now):
+        if self.ttl_seconds is not None:
+            conn.execute(
+                f"DELETE FROM {self.namespace} WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        if self.max_entries is not None:
+            conn.execute(
+                f"DELETE FROM {self.namespace} WHERE key IN ("
+                f"SELECT key FROM {self.namespace} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
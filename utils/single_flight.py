@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Initializes a single-flight group: concurrent calls with the same key share one execution.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Runs func once per key at a time; callers arriving while it runs wait for and share its result.
+        :param key: Hashable key identifying the work.
+        :param func: Callable producing the result.
+        :return: The result of func (exceptions are re-raised in every waiting caller).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if leader:
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+
+        return future.result()
+
+    def do_async(self, key, func, *args, **kwargs):
+        """
+        Like do() for a function returning a future: callers arriving before that future resolves share it.
+        Nobody waits here, so a long asynchronous operation costs no thread per caller.
+        :param key: Hashable key identifying the work.
+        :param func: Callable starting the work and returning a future.
+        :return: Future of the shared result.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._calls[key] = future
+
+        def settle(started):
+            try:
+                future.set_result(started.result())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+
+        try:
+            started = func(*args, **kwargs)
+        except Exception as e:
+            started = Future()
+            started.set_exception(e)
+        started.add_done_callback(settle)
+        return future
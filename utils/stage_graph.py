@@ -0,0 +1,201 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from utils.futures import chain
+from utils.metrics import record_cache, timed
+from utils.result_cache import make_key
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), settings=None, memoize=True, valid=None):
+        """
+        Describes one stage of a pipeline.
+        :param name: Name of the stage; it is also the name of its output.
+        :param func: Callable receiving the values of the inputs, in order. Returning None (or raising)
+                     fails the stage, and the stages depending on it are skipped. It may also return a
+                     future of its output (e.g. work done in another process or a tracked generation):
+                     no worker is held while it resolves.
+        :param inputs: Names of the sources or stages whose outputs the stage consumes.
+        :param settings: Optional callable returning JSON-serializable settings that change the output
+                         (model, prompt, ...); they are part of the memo key.
+        :param memoize: Whether the output is memoized (it must be JSON-serializable).
+        :param valid: Optional callable telling whether a memoized output can still be used
+                      (e.g. that the files it names still exist).
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.settings = settings
+        self.memoize = memoize
+        self.valid = valid
+
+
+class StageGraph:
+    def __init__(self, memo=None, max_workers=4):
+        """
+        Initializes a pipeline of stages forming a DAG. Stages whose inputs are ready run in parallel,
+        and stage outputs are memoized by the hash of the stage settings and of the inputs' contents,
+        so after a change only the stages whose inputs actually changed run again.
+        :param memo: Optional ResultCache storing stage outputs.
+        :param max_workers: Number of stages that may run at the same time, across every run of run_many().
+        """
+        self.memo = memo
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, name, func, inputs=(), **options):
+        """
+        Adds a stage (see Stage for the options).
+        :return: The stage.
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        stage = Stage(name, func, inputs, **options)
+        self.stages[name] = stage
+        return stage
+
+    def required(self, targets):
+        """
+        Lists the stages needed to produce some targets.
+        :param targets: Names of the wanted stages.
+        :return: Set of stage names: the targets and every stage they depend on.
+        """
+        required, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name in required or name not in self.stages:
+                continue
+            required.add(name)
+            pending.extend(self.stages[name].inputs)
+        return required
+
+    def _check(self, names, sources):
+        for name in names:
+            for input_name in self.stages[name].inputs:
+                if input_name not in self.stages and input_name not in sources:
+                    raise ValueError(f"Stage {name} has an unknown input: {input_name}")
+
+        # Kahn's algorithm: every stage must be reachable without going round a cycle
+        remaining = {name: {i for i in self.stages[name].inputs if i in names} for name in names}
+        while remaining:
+            ready = [name for name, inputs in remaining.items() if not inputs]
+            if not ready:
+                raise ValueError(f"Stages form a cycle: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for inputs in remaining.values():
+                inputs.difference_update(ready)
+
+    def run(self, sources, source_keys=None, targets=None):
+        """
+        Runs the pipeline.
+        :param sources: Dictionary of the external inputs (e.g. the image path).
+        :param source_keys: Optional content hashes of sources whose value is not their content
+                            (e.g. the SHA-256 of a file for its path); other sources are hashed as values.
+        :param targets: Optional names of the stages wanted; only they and their dependencies run.
+        :return: Dictionary mapping the names of the stages that succeeded to their outputs.
+        """
+        return self.run_many([(sources, source_keys)], targets=targets)[0]
+
+    def run_many(self, runs, targets=None):
+        """
+        Runs the pipeline for several sets of sources (e.g. one per case), sharing one pool of workers
+        and one scheduler, so waiting on asynchronous stages costs no thread per run.
+        :param runs: List of (sources, source_keys) tuples (see run()).
+        :param targets: Optional names of the stages wanted; only they and their dependencies run.
+        :return: List of output dictionaries (see run()), in the order of the runs.
+        """
+        names = self.required(targets) if targets is not None else set(self.stages)
+        states = []
+        for sources, source_keys in runs:
+            self._check(names, sources)
+            source_keys = source_keys or {}
+            states.append({
+                "keys": {name: source_keys.get(name) or make_key(value) for name, value in sources.items()},
+                "values": dict(sources),
+                "outputs": {},
+                "failed": set(),
+                "pending": [name for name in self.stages if name in names],
+            })
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline-stage") as pool:
+            def launch_ready(index):
+                state = states[index]
+                for name in list(state["pending"]):
+                    stage = self.stages[name]
+                    if any(input_name in state["failed"] for input_name in stage.inputs):
+                        state["pending"].remove(name)
+                        state["failed"].add(name)
+                        logging.warning(f"Skipping stage {name}: an input failed")
+                    elif all(input_name in state["values"] for input_name in stage.inputs):
+                        state["pending"].remove(name)
+                        arguments = [state["values"][input_name] for input_name in stage.inputs]
+                        input_keys = [state["keys"][input_name] for input_name in stage.inputs]
+                        futures[pool.submit(self._execute, stage, arguments, input_keys)] = (index, name)
+
+            for index in range(len(states)):
+                launch_ready(index)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                updated = set()
+                for future in done:
+                    index, name = futures.pop(future)
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        logging.error(f"Stage {name} failed: {e}")
+                        output = None
+                    if isinstance(output, Future):
+                        # Asynchronous stage: waited on here, with the others, instead of in a worker
+                        futures[output] = (index, name)
+                        continue
+                    updated.add(index)
+                    state = states[index]
+                    if output is None:
+                        state["failed"].add(name)
+                        continue
+                    # Downstream stages are keyed by what this stage produced, not by how it got there
+                    state["keys"][name] = make_key(output)
+                    state["values"][name] = state["outputs"][name] = output
+                for index in updated:
+                    launch_ready(index)
+
+        return [state["outputs"] for state in states]
+
+    def _execute(self, stage, arguments, input_keys):
+        memo = self.memo if stage.memoize else None
+        key = None
+        if memo is not None:
+            settings = stage.settings() if stage.settings is not None else None
+            key = make_key(stage.name, settings, input_keys)
+            try:
+                cached = memo.get(key)
+            except Exception as e:
+                logging.error(f"Error reading the memo of stage {stage.name}: {e}")
+                cached = None
+            hit = cached is not None and (stage.valid is None or stage.valid(cached["output"]))
+            record_cache("stage_memo", hit)
+            if hit:
+                logging.info(f"Stage {stage.name} served from memo")
+                return cached["output"]
+
+        timer = timed("pipeline", stage.name).start()
+        try:
+            output = stage.func(*arguments)
+        except Exception:
+            timer.stop("error")
+            raise
+        if isinstance(output, Future):
+            output.add_done_callback(lambda done: done.exception() is not None and timer.stop("error"))
+            return chain(output, lambda value: self._finish(stage, memo, key, timer, value))
+        return self._finish(stage, memo, key, timer, output)
+
+    def _finish(self, stage, memo, key, timer, output):
+        timer.stop("ok" if output is not None else "error")
+        if memo is not None and output is not None:
+            try:
+                memo.set(key, {"output": output})
+            except Exception as e:
+                logging.error(f"Error writing the memo of stage {stage.name}: {e}")
+        return output
@@ -0,0 +1,156 @@
+import base64
+import os
+import struct
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# Container layout:
+#   header: MAGIC (4) | version (1) | chunk_size (4, big-endian) | nonce prefix (7)
+#   body:   one AES-GCM sealed chunk per chunk_size bytes of plaintext, each followed by a 16-byte tag.
+# Chunk nonces are nonce prefix | chunk index (4) | last-chunk flag (1), and the header is authenticated
+# with every chunk, so reordering, truncation and header tampering are all detected.
+MAGIC = b"FSE1"
+VERSION = 1
+HEADER_FORMAT = ">4sBI7s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def is_stream_encrypted(header_bytes):
+    """
+    Checks whether data starts with the chunked container header.
+    :param header_bytes: First bytes of an encrypted file.
+    :return: True for chunked containers, False for anything else (e.g. legacy Fernet tokens).
+    """
+    return header_bytes[:len(MAGIC)] == MAGIC
+
+
+class StreamCipher:
+    def __init__(self, key, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Initializes a chunked AES-GCM cipher derived from a Fernet key.
+        :param key: URL-safe base64 Fernet key (as stored in config/encryption.key).
+        :param chunk_size: Plaintext bytes per authenticated chunk for newly encrypted files.
+        """
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"forensic-stream-v1")
+        self.aead = AESGCM(hkdf.derive(base64.urlsafe_b64decode(key)))
+        self.chunk_size = chunk_size
+
+    def _nonce(self, prefix, index, last):
+        return prefix + struct.pack(">IB", index, 1 if last else 0)
+
+    def encrypt_stream(self, source, destination):
+        """
+        Encrypts a binary stream chunk by chunk using constant memory.
+        :param source: Readable binary file object with the plaintext.
+        :param destination: Writable binary file object for the container.
+        :return: Number of plaintext bytes encrypted.
+        """
+        prefix = os.urandom(7)
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.chunk_size, prefix)
+        destination.write(header)
+
+        total = 0
+        index = 0
+        chunk = source.read(self.chunk_size)
+        while True:
+            # Read ahead so the final chunk can be flagged
+            next_chunk = source.read(self.chunk_size) if len(chunk) == self.chunk_size else b""
+            last = not next_chunk
+            destination.write(self.aead.encrypt(self._nonce(prefix, index, last), chunk, header))
+            total += len(chunk)
+            if last:
+                return total
+            chunk = next_chunk
+            index += 1
+
+    def read_header(self, source):
+        """
+        Reads and validates a container header.
+        :param source: Readable binary file object positioned at the start of the container.
+        :return: Tuple (header bytes, chunk size, nonce prefix).
+        """
+        header = source.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("Encrypted file is truncated.")
+        magic, version, chunk_size, prefix = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported encrypted file format.")
+        return header, chunk_size, prefix
+
+    def decrypt_stream(self, source, destination):
+        """
+        Decrypts a chunked container chunk by chunk using constant memory.
+        :param source: Readable binary file object positioned at the start of the container.
+        :param destination: Writable binary file object for the plaintext.
+        :return: Number of plaintext bytes written.
+        """
+        header, chunk_size, prefix = self.read_header(source)
+        sealed_size = chunk_size + TAG_SIZE
+
+        total = 0
+        index = 0
+        sealed = source.read(sealed_size)
+        while True:
+            next_sealed = source.read(sealed_size) if len(sealed) == sealed_size else b""
+            last = not next_sealed
+            try:
+                chunk = self.aead.decrypt(self._nonce(prefix, index, last), sealed, header)
+            except InvalidTag:
+                raise ValueError(f"Encrypted file is corrupted or truncated at chunk {index}.")
+            destination.write(chunk)
+            total += len(chunk)
+            if last:
+                return total
+            sealed = next_sealed
+            index += 1
+
+    def plaintext_size(self, source, container_size):
+        """
+        Computes the plaintext size of a container from its size, without decrypting it.
+        :param source: Readable binary file object positioned at the start of the container.
+        :param container_size: Total size of the container in bytes.
+        :return: Tuple (plaintext size, chunk size).
+        """
+        _, chunk_size, _ = self.read_header(source)
+        sealed_size = chunk_size + TAG_SIZE
+        body_size = container_size - HEADER_SIZE
+        chunk_count = max(1, -(-body_size // sealed_size))
+        last_sealed = body_size - (chunk_count - 1) * sealed_size
+        if last_sealed < TAG_SIZE:
+            raise ValueError("Encrypted file is truncated.")
+        return (chunk_count - 1) * chunk_size + last_sealed - TAG_SIZE, chunk_size
+
+    def decrypt_range(self, source, container_size, start, stop):
+        """
+        Decrypts only the chunks covering a plaintext byte range.
+        :param source: Seekable binary file object positioned at the start of the container.
+        :param container_size: Total size of the container in bytes.
+        :param start: First plaintext byte offset (inclusive).
+        :param stop: Last plaintext byte offset (exclusive).
+        :return: Generator of plaintext byte strings covering [start, stop).
+        """
+        plaintext_size, chunk_size = self.plaintext_size(source, container_size)
+        source.seek(0)
+        header, _, prefix = self.read_header(source)
+        stop = min(stop, plaintext_size)
+        if start >= stop:
+            return
+
+        sealed_size = chunk_size + TAG_SIZE
+        last_index = max(0, -(-plaintext_size // chunk_size) - 1)
+        first, final = start // chunk_size, (stop - 1) // chunk_size
+
+        source.seek(HEADER_SIZE + first * sealed_size)
+        for index in range(first, final + 1):
+            sealed = source.read(sealed_size)
+            try:
+                chunk = self.aead.decrypt(self._nonce(prefix, index, index == last_index), sealed, header)
+            except InvalidTag:
+                raise ValueError(f"Encrypted file is corrupted or truncated at chunk {index}.")
+            chunk_start = index * chunk_size
+            yield chunk[max(start - chunk_start, 0):stop - chunk_start]